@@ -1,11 +1,16 @@
-import os
 import random
 import time
 import sys
-import select
+from abc import ABC, abstractmethod
+from collections import deque
 from enum import Enum
-from dataclasses import dataclass
-from typing import List, Tuple, Optional
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Tuple, Optional
+
+from instrumentation import STATS, configure as configure_stats
+from event_log import EVENTS, configure as configure_events
+from snapshot import SNAPSHOTS
+from terminal_io import Keyboard, Screen, TTYKeyboard, TTYScreen
 
 # ============== CONSTANTS AND CONFIGURATION ==============
 class Colors:
@@ -26,6 +31,8 @@ class Colors:
     BRIGHT_WHITE = '\033[1;97m'
     RESET = '\033[0m'
     BOLD = '\033[1m'
+    GARBAGE = '\033[90m'
+    CLEAR_SCREEN = '\033[H\033[2J\033[3J'
 
 GAME_CONFIG = {
     'BOARD_WIDTH': 10,
@@ -34,7 +41,13 @@ GAME_CONFIG = {
     'MIN_DROP_INTERVAL': 0.05,
     'LEVEL_SPEED_INCREASE': 0.1,
     'LINES_PER_LEVEL': 10,
-    'SCORE_MULTIPLIERS': [100, 200, 500, 1000]  # 1, 2, 3, 4 lines
+    'TICK_SECONDS': 0.05,       # Length of one simulation tick
+    'LOCK_DELAY_TICKS': 10,     # Ticks a landed piece can still move before it locks (0 = instant)
+    'MAX_LOCK_RESETS': 15,      # Moves that may restart the lock delay, per piece
+    'PREVIEW_COUNT': 3,         # Upcoming pieces shown
+    'SCORE_MULTIPLIERS': [100, 200, 500, 1000],  # 1, 2, 3, 4 lines (classic scoring)
+    'SCORING': 'guideline',  # Key in SCORING_ENGINES
+    'FRAME_BUDGET': 0.2  # Frames slower than this count as dropped (seconds)
 }
 
 # ============== DATA MODELS ==============
@@ -78,6 +91,7 @@ class Piece:
         rotated = [[self.shape[rows - 1 - y][x] for y in range(rows)] 
                   for x in range(cols)]
         self.shape = rotated
+        self.rotation = (self.rotation + 1) % 4
     
     def get_cells(self, position: Position) -> List[Tuple[int, int]]:
         """Get all occupied cells for this piece at given position"""
@@ -96,36 +110,221 @@ class Piece:
         new_piece.rotation = self.rotation
         return new_piece
 
+# ============== SCORING ==============
+@dataclass
+class LockEvent:
+    """What happened when a piece locked, as reported to the scoring engine"""
+    piece_type: PieceType
+    lines: int
+    t_spin: str = ''             # '', 'mini' or 'full'
+    perfect_clear: bool = False
+    level: int = 1
+    points: int = 0              # Filled in by the scoring engine
+    label: str = ''              # e.g. "T-Spin Double, Back-to-Back"
+    back_to_back: bool = False   # Streak bonus applied (guideline scoring)
+    combo: int = -1              # Combo count after this lock (guideline scoring)
+
+class ScoringEngine(ABC):
+    """Turns lock and drop events into points.
+    
+    The board detects T-spins and perfect clears from the merge itself, so
+    engines only apply rules and keep their own streak state.
+    """
+    
+    def reset(self):
+        """Forget streaks, e.g. for a new game"""
+    
+    def state(self):
+        """Streak state, kept so a lock can be undone"""
+        return None
+    
+    def restore(self, state):
+        """Put back a value returned by ``state()``"""
+    
+    @abstractmethod
+    def score_lock(self, event: LockEvent) -> int:
+        """Points for a locked piece; may set ``event.label``"""
+    
+    def score_drop(self, cells: int, hard: bool) -> int:
+        """Points for moving the piece down ``cells`` rows by hand"""
+        return 0
+
+class ClassicScoring(ScoringEngine):
+    """The original rules: ``SCORE_MULTIPLIERS`` by line count, times level"""
+    
+    def score_lock(self, event: LockEvent) -> int:
+        if not event.lines:
+            return 0
+        multipliers = GAME_CONFIG['SCORE_MULTIPLIERS']
+        return multipliers[min(event.lines, len(multipliers)) - 1] * event.level
+
+class GuidelineScoring(ScoringEngine):
+    """Modern guideline scoring with T-spins, combos, back-to-back and perfect clears"""
+    
+    LINE_CLEAR = [0, 100, 300, 500, 800]
+    T_SPIN = [400, 800, 1200, 1600]
+    T_SPIN_MINI = [100, 200, 400]
+    PERFECT_CLEAR = [0, 800, 1200, 1800, 2000]
+    BACK_TO_BACK_PERFECT_TETRIS = 3200
+    COMBO = 50
+    CLEAR_NAMES = ['', 'Single', 'Double', 'Triple', 'Tetris']
+    
+    def __init__(self):
+        self.combo = -1              # Consecutive clearing locks minus one
+        self.back_to_back = False    # Last clear was a Tetris or T-spin
+    
+    def reset(self):
+        self.combo = -1
+        self.back_to_back = False
+    
+    def state(self):
+        return self.combo, self.back_to_back
+    
+    def restore(self, state):
+        self.combo, self.back_to_back = state
+    
+    def score_lock(self, event: LockEvent) -> int:
+        lines = min(event.lines, 4)
+        if event.t_spin == 'full':
+            base = self.T_SPIN[min(lines, 3)]
+            name = 'T-Spin ' + self.CLEAR_NAMES[lines]
+        elif event.t_spin == 'mini':
+            base = self.T_SPIN_MINI[min(lines, 2)]
+            name = 'T-Spin Mini ' + self.CLEAR_NAMES[lines]
+        else:
+            base = self.LINE_CLEAR[lines]
+            name = self.CLEAR_NAMES[lines]
+        labels = [name.strip()] if name.strip() else []
+        
+        if lines:
+            # Tetrises and T-spin clears chain; any other clear breaks the chain
+            difficult = lines == 4 or bool(event.t_spin)
+            if difficult and self.back_to_back:
+                base = base * 3 // 2
+                labels.append('Back-to-Back')
+                event.back_to_back = True
+            self.back_to_back = difficult
+            self.combo += 1
+        else:
+            self.combo = -1
+        event.combo = self.combo
+        
+        points = base * event.level
+        if self.combo > 0:
+            points += self.COMBO * self.combo * event.level
+            labels.append(f'Combo x{self.combo}')
+        if event.perfect_clear:
+            if lines == 4 and event.back_to_back:
+                bonus = self.BACK_TO_BACK_PERFECT_TETRIS
+            else:
+                bonus = self.PERFECT_CLEAR[lines]
+            points += bonus * event.level
+            labels.append('Perfect Clear')
+        
+        event.label = ', '.join(labels)
+        return points
+    
+    def score_drop(self, cells: int, hard: bool) -> int:
+        return cells * (2 if hard else 1)
+
+SCORING_ENGINES = {
+    'classic': ClassicScoring,
+    'guideline': GuidelineScoring,
+}
+
 # ============== GAME LOGIC ==============
+# Grid cell values, indexed by the byte that stands for them in snapshots
+CELL_COLORS = [0] + [color for _, color in Piece.SHAPES.values()] + [Colors.GARBAGE]
+CELL_CODES = {color: code for code, color in enumerate(CELL_COLORS)}
+
+@dataclass
+class LockDelta:
+    """What one lock changed on the board, enough to take it back.
+    
+    Holds the locked piece, the rows its clear removed and the counters it
+    changed; the grid itself is never copied.
+    """
+    piece: Piece                       # As it locked
+    position: Position
+    rotated: bool                      # last_move_rotated at the lock
+    current: Piece                     # Current piece and position to restore on undo
+    current_pos: Position
+    drawn: List[Piece]                 # Pieces taken from the queue since the previous lock
+    hold_piece: Optional[Piece]
+    hold_used: bool
+    score: int                         # When the piece spawned, so drop points are undone too
+    drop_points: int                   # Soft and hard drop points earned by the piece
+    level: int
+    lines_cleared: int
+    last_lock: Optional[LockEvent]
+    scoring: object                    # ScoringEngine.state()
+    cleared: List[Tuple[int, list]] = field(default_factory=list)  # (row index, row), top first
+
 class GameBoard:
     """Manages the Tetris game board and pieces"""
     
-    def __init__(self, width: int, height: int):
+    def __init__(self, width: int, height: int, scoring: Optional[ScoringEngine] = None,
+                 rng: Optional[random.Random] = None):
         self.width = width
         self.height = height
         self.grid = [[0 for _ in range(width)] for _ in range(height)]
         self.current_piece: Optional[Piece] = None
         self.current_pos: Optional[Position] = None
-        self.next_piece: Optional[Piece] = None
+        self.rng = rng or random  # Pass a seeded Random for reproducible piece sequences
+        self.queue = deque()      # Upcoming pieces, extended on demand
+        self.hold_piece: Optional[Piece] = None
+        self.hold_used = False    # Hold is allowed once per piece
+        self.ticks = 0
+        self.gravity_ticks = 0
+        self.lock_ticks: Optional[int] = None  # Ticks until the landed piece locks
+        self.lock_resets = 0
         self.score = 0
         self.level = 1
         self.lines_cleared = 0
         self.game_over = False
+        self.scoring = scoring or SCORING_ENGINES[GAME_CONFIG['SCORING']]()
+        self.filled_cells = 0            # Kept up to date on merge and clear
+        self.last_move_rotated = False   # Needed to recognise T-spins
+        self.last_lock: Optional[LockEvent] = None
+        self.on_lock: Optional[Callable[[LockEvent], None]] = None  # Called after every lock
+        self.undo_log: List[LockDelta] = []  # One delta per lock, newest last
+        self.redo_log: List[LockDelta] = []  # Locks taken back by undo(), newest last
+        self._drawn: List[Piece] = []        # Pieces taken from the queue since the last lock
+        self._spawn_score = 0
+        self.game_id = EVENTS.new_game_id()
+        if EVENTS.enabled:
+            self.log_event('start', width=width, height=height, scoring=type(self.scoring).__name__)
         self._initialize_pieces()
     
     def _initialize_pieces(self):
         """Initialize the first pieces"""
-        self.next_piece = self._create_random_piece()
         self._spawn_new_piece()
     
     def _create_random_piece(self) -> Piece:
         """Create a random Tetris piece"""
-        return Piece(random.choice(list(PieceType)))
+        return Piece(self.rng.choice(list(PieceType)))
+    
+    def preview(self, count: int) -> List[Piece]:
+        """The next ``count`` pieces, generating them only when first needed"""
+        while len(self.queue) < count:
+            self.queue.append(self._create_random_piece())
+        return [self.queue[i] for i in range(count)]
     
-    def _spawn_new_piece(self):
-        """Spawn a new piece at the top center of the board"""
-        self.current_piece = self.next_piece
-        self.next_piece = self._create_random_piece()
+    @property
+    def next_piece(self) -> Piece:
+        return self.preview(1)[0]
+    
+    def _spawn_new_piece(self, piece: Optional[Piece] = None):
+        """Spawn a new piece (the next in the queue by default) at the top center of the board"""
+        if piece is None:
+            self.preview(1)
+            piece = self.queue.popleft()
+            self._drawn.append(piece)
+        self.current_piece = piece
+        self._spawn_score = self.score
+        self.lock_ticks = None
+        self.lock_resets = 0
+        self.last_move_rotated = False
         
         # Start position (top center)
         start_x = self.width // 2 - len(self.current_piece.shape[0]) // 2
@@ -142,6 +341,8 @@ class GameBoard:
             piece = self.current_piece
         if position is None:
             position = self.current_pos
+        if STATS.enabled:
+            STATS.incr('board.collision_checks')
         
         cells = piece.get_cells(position)
         for y, x in cells:
@@ -162,11 +363,63 @@ class GameBoard:
         
         if not self._check_collision(self.current_piece, new_pos):
             self.current_pos = new_pos
+            self.last_move_rotated = False
+            self._moved_while_landed()
+            if SNAPSHOTS.enabled:
+                SNAPSHOTS.touch(self)
             return True
         elif dy > 0:  # Collision while moving down
-            self._merge_piece()
-            self._clear_lines()
-            self._spawn_new_piece()
+            if GAME_CONFIG['LOCK_DELAY_TICKS'] <= 0:
+                self._lock_piece()
+            elif self.lock_ticks is None:
+                self.lock_ticks = GAME_CONFIG['LOCK_DELAY_TICKS']
+        return False
+    
+    def tick(self):
+        """Advance the simulation by one tick: gravity, then the lock delay"""
+        if self.game_over:
+            return
+        self.ticks += 1
+        self.gravity_ticks += 1
+        if SNAPSHOTS.enabled:
+            SNAPSHOTS.touch(self)
+        if self.gravity_ticks >= self.get_drop_ticks():
+            self.gravity_ticks = 0
+            self.move_piece(0, 1)
+        if self.lock_ticks is not None:
+            self.lock_ticks -= 1
+            if self.lock_ticks <= 0:
+                self._lock_piece()
+    
+    def _moved_while_landed(self):
+        """Restart the lock delay after a move, or cancel it if the piece can fall again"""
+        if self.lock_ticks is None:
+            return
+        below = Position(self.current_pos.y + 1, self.current_pos.x)
+        if not self._check_collision(self.current_piece, below):
+            self.lock_ticks = None
+        elif self.lock_resets < GAME_CONFIG['MAX_LOCK_RESETS']:
+            self.lock_resets += 1
+            self.lock_ticks = GAME_CONFIG['LOCK_DELAY_TICKS']
+    
+    def hold(self) -> bool:
+        """Swap the current piece with the held one (once per piece)"""
+        if self.game_over or self.hold_used:
+            return False
+        held = self.hold_piece
+        self.hold_piece = Piece(self.current_piece.type)  # Held pieces return unrotated
+        self.redo_log.clear()
+        self._spawn_new_piece(held)
+        self.hold_used = True
+        if SNAPSHOTS.enabled:
+            SNAPSHOTS.touch(self)
+        return True
+    
+    def soft_drop(self) -> bool:
+        """Move the current piece down one row by hand, scoring drop points"""
+        if self.move_piece(0, 1):
+            self.score += self.scoring.score_drop(1, hard=False)
+            return True
         return False
     
     def rotate_piece(self) -> bool:
@@ -179,16 +432,234 @@ class GameBoard:
         
         if not self._check_collision(rotated_piece, self.current_pos):
             self.current_piece = rotated_piece
+            self.last_move_rotated = True
+            self._moved_while_landed()
+            if SNAPSHOTS.enabled:
+                SNAPSHOTS.touch(self)
             return True
         return False
     
     def drop_piece(self):
-        """Drop the current piece to the bottom"""
+        """Drop the current piece to the bottom and lock it at once"""
         if self.game_over:
             return
         
-        while self.move_piece(0, 1):
-            pass
+        # Score the drop before locking, so the points belong to this piece's LockDelta
+        cells = 0
+        while not self._check_collision(self.current_piece, Position(self.current_pos.y + cells + 1,
+                                                                     self.current_pos.x)):
+            cells += 1
+        if cells:
+            self.move_piece(0, cells)
+        self.score += self.scoring.score_drop(cells, hard=True)
+        self._lock_piece()
+    
+    def _lock_piece(self, replay: bool = False, current: Optional[Piece] = None,
+                    current_pos: Optional[Position] = None) -> LockEvent:
+        """Merge the current piece, clear lines, score the lock and spawn the next piece.
+        
+        Every lock is logged as a ``LockDelta``. A replayed lock (``place`` or
+        ``redo``) keeps the redo log and does not call ``on_lock``.
+        """
+        piece = self.current_piece
+        cells = piece.get_cells(self.current_pos)
+        delta = LockDelta(piece, self.current_pos, self.last_move_rotated,
+                          current or piece, current_pos or self.current_pos, self._drawn,
+                          self.hold_piece, self.hold_used, self._spawn_score,
+                          self.score - self._spawn_score, self.level,
+                          self.lines_cleared, self.last_lock, self.scoring.state())
+        t_spin = self._t_spin_kind() if piece.type == PieceType.T and self.last_move_rotated else ''
+        self._merge_piece()
+        
+        # Only rows the piece landed in can have been completed
+        lines = self._clear_lines({y for y, _ in cells if y >= 0}, delta.cleared)
+        event = LockEvent(piece.type, lines, t_spin, lines > 0 and self.filled_cells == 0, self.level)
+        event.points = self.scoring.score_lock(event)
+        self.score += event.points
+        if lines or t_spin:
+            self.last_lock = event
+        if lines:
+            self.level = self.lines_cleared // GAME_CONFIG['LINES_PER_LEVEL'] + 1
+        self.hold_used = False
+        self._drawn = []
+        self._spawn_new_piece()
+        self.undo_log.append(delta)
+        if SNAPSHOTS.enabled:
+            SNAPSHOTS.touch(self)
+        if not replay:
+            self.redo_log.clear()
+            if EVENTS.enabled:
+                self._log_lock(delta, event)
+            if self.on_lock is not None:
+                self.on_lock(event)
+        return event
+    
+    def log_event(self, kind: str, **fields):
+        """Send an event about this game to the event log"""
+        EVENTS.emit('tetris', self.game_id, kind, **fields)
+    
+    def log_result(self, reason: str):
+        self.log_event('end', reason=reason, score=self.score, lines=self.lines_cleared, level=self.level)
+    
+    def _log_lock(self, delta: LockDelta, event: LockEvent):
+        self.log_event('placement', piece=event.piece_type.value, x=delta.position.x, y=delta.position.y,
+                       rotation=delta.piece.rotation, lines=event.lines, points=event.points)
+        if event.lines or event.t_spin:
+            self.log_event('clear', lines=event.lines, label=event.label, t_spin=event.t_spin,
+                           perfect_clear=event.perfect_clear, combo=event.combo,
+                           back_to_back=event.back_to_back, total_lines=self.lines_cleared,
+                           level=self.level)
+        if self.game_over:
+            self.log_result('top_out')
+    
+    def place(self, piece: Piece, position: Position, rotated: bool = False) -> LockEvent:
+        """Lock ``piece`` at ``position`` in place of the current piece; take it back with unplace().
+        
+        For search and what-if evaluation: there is no collision check,
+        ``on_lock`` is not called and the redo log is left alone.
+        """
+        current, current_pos = self.current_piece, self.current_pos
+        self.current_piece = piece
+        self.current_pos = position
+        self.last_move_rotated = rotated
+        return self._lock_piece(replay=True, current=current, current_pos=current_pos)
+    
+    def unplace(self) -> LockDelta:
+        """Take back the last lock; the piece it replaced becomes current again"""
+        delta = self.undo_log.pop()
+        # Pieces drawn since the lock go back to the front of the queue
+        for piece in reversed(self._drawn):
+            self.queue.appendleft(piece)
+        self._drawn = delta.drawn
+        
+        if delta.cleared:
+            # The clear added one empty row at the top per removed row
+            del self.grid[:len(delta.cleared)]
+            for y, row in delta.cleared:
+                self.grid.insert(y, row)
+            self.filled_cells += len(delta.cleared) * self.width
+        for y, x in delta.piece.get_cells(delta.position):
+            if y >= 0:
+                self.grid[y][x] = 0
+                self.filled_cells -= 1
+        
+        self.current_piece = delta.current
+        self.current_pos = delta.current_pos
+        self.last_move_rotated = delta.rotated
+        self.hold_piece = delta.hold_piece
+        self.hold_used = delta.hold_used
+        self.score = self._spawn_score = delta.score
+        self.level = delta.level
+        self.lines_cleared = delta.lines_cleared
+        self.last_lock = delta.last_lock
+        self.scoring.restore(delta.scoring)
+        self.lock_ticks = None
+        self.lock_resets = 0
+        self.game_over = False
+        return delta
+    
+    def undo(self) -> bool:
+        """Take back the last locked piece and return it to the top of the board"""
+        if not self.undo_log:
+            return False
+        delta = self.unplace()
+        self.redo_log.append(delta)
+        self._spawn_new_piece(Piece(delta.piece.type))
+        if SNAPSHOTS.enabled:
+            SNAPSHOTS.touch(self)
+        if EVENTS.enabled:
+            self.log_event('undo', piece=delta.piece.type.value)
+        return True
+    
+    def redo(self) -> bool:
+        """Lock the last undone piece where it was locked before"""
+        if not self.redo_log or self.game_over:
+            return False
+        delta = self.redo_log.pop()
+        # Replay a hold made while the piece fell: the pieces it drew and what it left held
+        while len(self._drawn) < len(delta.drawn):
+            self._drawn.append(self.queue.popleft())
+        self.hold_piece = delta.hold_piece
+        self.hold_used = delta.hold_used
+        self.current_piece = delta.piece
+        self.current_pos = delta.position
+        self.last_move_rotated = delta.rotated
+        # From the score at its spawn, which counts drop points of a piece it was held for
+        self._spawn_score = delta.score
+        self.score = delta.score + delta.drop_points
+        event = self._lock_piece(replay=True)
+        if EVENTS.enabled:
+            self.log_event('redo', piece=delta.piece.type.value)
+            self._log_lock(delta, event)
+        return True
+    
+    def add_garbage(self, lines: int, hole: int) -> bool:
+        """Push ``lines`` garbage rows, solid except column ``hole``, up from the bottom.
+        
+        The rows scrolled off the top are refilled and moved to the bottom,
+        so no rows are allocated and the grid list is never rebuilt.
+        Returns False if the stack topped out.
+        """
+        lines = min(lines, self.height)
+        if lines <= 0 or self.game_over:
+            return not self.game_over
+        # Locks before the garbage can no longer be taken back
+        self.undo_log.clear()
+        self.redo_log.clear()
+        recycled = self.grid[:lines]
+        del self.grid[:lines]
+        topped_out = False
+        for row in recycled:
+            filled = self.width - row.count(0)
+            if filled:
+                topped_out = True
+                self.filled_cells -= filled
+            row[:] = [Colors.GARBAGE] * self.width
+            row[hole] = 0
+        self.grid.extend(recycled)
+        self.filled_cells += lines * (self.width - 1)
+        
+        # The falling piece rides up on top of the new rows
+        lowest = -len(self.current_piece.shape)
+        while self._check_collision() and self.current_pos.y > lowest:
+            self.current_pos = Position(self.current_pos.y - 1, self.current_pos.x)
+        if topped_out or self._check_collision():
+            self.game_over = True
+            if EVENTS.enabled:
+                self.log_result('top_out')
+        if SNAPSHOTS.enabled:
+            SNAPSHOTS.touch(self)
+        return not self.game_over
+    
+    def _t_spin_kind(self) -> str:
+        """Classify the current T piece by the 3-corner rule: '', 'mini' or 'full'"""
+        shape = self.current_piece.shape
+        filled = {(y, x) for y, row in enumerate(shape) for x, cell in enumerate(row) if cell}
+        # The centre of a T is the cell with three neighbours; the nub points away from the gap
+        for cy, cx in filled:
+            neighbours = [(dy, dx) for dy, dx in ((-1, 0), (1, 0), (0, -1), (0, 1)) if (cy + dy, cx + dx) in filled]
+            if len(neighbours) == 3:
+                break
+        else:
+            return ''
+        ny, nx = next((-dy, -dx) for dy, dx in ((-1, 0), (1, 0), (0, -1), (0, 1)) if (dy, dx) not in neighbours)
+        
+        cy += self.current_pos.y
+        cx += self.current_pos.x
+        corners = [(cy + dy, cx + dx) for dy in (-1, 1) for dx in (-1, 1)]
+        occupied = [self._is_blocked(y, x) for y, x in corners]
+        if sum(occupied) < 3:
+            return ''
+        # Both corners beside the nub filled makes a full T-spin, otherwise a mini
+        front = [self._is_blocked(y, x) for y, x in corners
+                 if (ny and y - cy == ny) or (nx and x - cx == nx)]
+        return 'full' if all(front) else 'mini'
+    
+    def _is_blocked(self, y: int, x: int) -> bool:
+        """Walls and the floor count as filled for T-spin corners"""
+        if x < 0 or x >= self.width or y >= self.height:
+            return True
+        return y >= 0 and bool(self.grid[y][x])
     
     def _merge_piece(self):
         """Merge the current piece into the grid"""
@@ -196,31 +667,35 @@ class GameBoard:
         for y, x in cells:
             if y >= 0:  # Only place if on the board
                 self.grid[y][x] = self.current_piece.color
+                self.filled_cells += 1
     
-    def _clear_lines(self):
-        """Clear completed lines and update score"""
-        lines_to_clear = []
+    def _clear_lines(self, rows: Optional[Iterable[int]] = None,
+                     removed: Optional[List[Tuple[int, list]]] = None) -> int:
+        """Clear completed lines among ``rows`` (default: all) and return how many.
         
-        for y in range(self.height):
-            if all(cell != 0 for cell in self.grid[y]):
-                lines_to_clear.append(y)
+        The removed rows are appended to ``removed`` as (index, row), top first.
+        """
+        if rows is None:
+            rows = range(self.height)
+        lines_to_clear = sorted(y for y in rows if all(self.grid[y]))
+        if not lines_to_clear:
+            return 0
+        if removed is not None:
+            removed.extend((y, self.grid[y]) for y in lines_to_clear)
         
-        # Clear lines from bottom to top
-        for line in reversed(lines_to_clear):
-            del self.grid[line]
-            self.grid.insert(0, [0 for _ in range(self.width)])
+        # Rebuild in one pass so the rows above each cleared line shift down together
+        full = set(lines_to_clear)
+        kept = [row for y, row in enumerate(self.grid) if y not in full]
+        self.grid[:] = [[0] * self.width for _ in full] + kept
         
         # Update game stats
-        if lines_to_clear:
-            lines_count = len(lines_to_clear)
-            self.lines_cleared += lines_count
-            
-            # Calculate score based on number of lines cleared
-            multiplier_index = min(lines_count - 1, len(GAME_CONFIG['SCORE_MULTIPLIERS']) - 1)
-            self.score += GAME_CONFIG['SCORE_MULTIPLIERS'][multiplier_index] * self.level
-            
-            # Update level
-            self.level = self.lines_cleared // GAME_CONFIG['LINES_PER_LEVEL'] + 1
+        lines_count = len(full)
+        self.lines_cleared += lines_count
+        self.filled_cells -= lines_count * self.width
+        if STATS.enabled:
+            STATS.incr('board.line_clears')
+            STATS.incr('board.lines', lines_count)
+        return lines_count
     
     def get_drop_interval(self) -> float:
         """Get current drop interval based on level"""
@@ -231,6 +706,10 @@ class GameBoard:
         interval = max(min_interval, base_interval - (self.level - 1) * speed_increase)
         return interval
     
+    def get_drop_ticks(self) -> int:
+        """Ticks between gravity steps at the current level"""
+        return max(1, round(self.get_drop_interval() / GAME_CONFIG['TICK_SECONDS']))
+    
     def get_game_state(self) -> dict:
         """Get current game state for rendering"""
         return {
@@ -238,38 +717,109 @@ class GameBoard:
             'current_piece': self.current_piece,
             'current_pos': self.current_pos,
             'next_piece': self.next_piece,
+            'preview': self.preview(GAME_CONFIG['PREVIEW_COUNT']),
+            'hold_piece': self.hold_piece,
+            'hold_used': self.hold_used,
+            'lock_ticks': self.lock_ticks,
             'score': self.score,
             'level': self.level,
             'lines_cleared': self.lines_cleared,
             'game_over': self.game_over,
             'width': self.width,
-            'height': self.height
+            'height': self.height,
+            'last_clear': self.last_lock.label if self.last_lock else ''
         }
+    
+    def snapshot_state(self) -> tuple:
+        """Compact copy of the board for snapshot.py.
+        
+        The grid is saved as one byte per cell. The undo and redo logs and
+        the random generator are not saved; a restored board draws new
+        pieces from the ``random`` module once its queue runs out.
+        """
+        grid = bytes([CELL_CODES[cell] for row in self.grid for cell in row])
+        last = self.last_lock
+        if last is not None:
+            last = (last.piece_type.value, last.lines, last.t_spin, last.perfect_clear, last.level,
+                    last.points, last.label, last.back_to_back, last.combo)
+        scoring = next((name for name, engine in SCORING_ENGINES.items() if type(self.scoring) is engine),
+                       GAME_CONFIG['SCORING'])
+        return ('tetris', self.game_id, self.width, self.height, grid,
+                self.current_piece.type.value, self.current_piece.rotation,
+                self.current_pos.y, self.current_pos.x,
+                ''.join(piece.type.value for piece in self.queue),
+                self.hold_piece.type.value if self.hold_piece else '', self.hold_used,
+                self.ticks, self.gravity_ticks, self.lock_ticks, self.lock_resets,
+                self.score, self.level, self.lines_cleared, self.last_move_rotated,
+                last, scoring, self.scoring.state())
+    
+    @classmethod
+    def from_snapshot(cls, state: tuple) -> 'GameBoard':
+        """Rebuild a board from ``snapshot_state()`` without starting a new game"""
+        (_, game_id, width, height, grid, piece_type, rotation, y, x, queue, hold, hold_used,
+         ticks, gravity_ticks, lock_ticks, lock_resets, score, level, lines_cleared, rotated,
+         last, scoring, scoring_state) = state
+        board = cls.__new__(cls)
+        board.width = width
+        board.height = height
+        board.grid = [[CELL_COLORS[code] for code in grid[row:row + width]]
+                      for row in range(0, width * height, width)]
+        board.current_piece = Piece(PieceType(piece_type))
+        for _ in range(rotation):
+            board.current_piece.rotate()
+        board.current_pos = Position(y, x)
+        board.rng = random
+        board.queue = deque(Piece(PieceType(value)) for value in queue)
+        board.hold_piece = Piece(PieceType(hold)) if hold else None
+        board.hold_used = hold_used
+        board.ticks = ticks
+        board.gravity_ticks = gravity_ticks
+        board.lock_ticks = lock_ticks
+        board.lock_resets = lock_resets
+        board.score = score
+        board.level = level
+        board.lines_cleared = lines_cleared
+        board.game_over = False  # Finished games are not saved
+        board.scoring = SCORING_ENGINES[scoring]()
+        board.scoring.restore(scoring_state)
+        board.filled_cells = len(grid) - grid.count(0)
+        board.last_move_rotated = rotated
+        board.last_lock = None
+        if last is not None:
+            board.last_lock = LockEvent(PieceType(last[0]), *last[1:])
+        board.on_lock = None
+        board.undo_log = []
+        board.redo_log = []
+        board._drawn = []
+        board._spawn_score = score
+        board.game_id = game_id
+        return board
 
 # ============== RENDERER ==============
 class GameRenderer:
-    """Handles rendering of the game to the terminal"""
+    """Handles rendering of the game to a screen (the terminal by default)"""
     
-    @staticmethod
-    def clear_screen():
-        """Clear the terminal screen"""
-        os.system('clear' if os.name != 'nt' else 'cls')
+    def __init__(self, screen: Optional[Screen] = None):
+        self.screen = screen or TTYScreen()
     
-    @staticmethod
-    def draw_title():
+    def clear_screen(self):
+        """Clear the screen"""
+        self.screen.clear()
+    
+    def draw_title(self):
         """Draw the Tetris title screen"""
-        print(f"{Colors.BRIGHT_GREEN}{'='*60}{Colors.RESET}")
-        print(f"{Colors.BOLD}{Colors.CYAN}")
-        print("  _______ ______ _______ ___ ___ _______ ______  ")
-        print(" |__   __|  ____|__   __|__ \__ \__   __|  ____| ")
-        print("    | |  | |__     | |     ) | ) | | |  | |__    ")
-        print("    | |  |  __|    | |    / / / /  | |  |  __|   ")
-        print("    | |  | |____   | |   / /_/ /_ _| |_ | |____  ")
-        print("    |_|  |______|  |_|  |____|____|_____|______| ")
-        print(f"{Colors.RESET}")
-        print(f"{Colors.YELLOW}           Programmed by Jeff{Colors.RESET}")
-        print(f"{Colors.BRIGHT_GREEN}{'='*60}{Colors.RESET}")
-        print()
+        self.screen.print(f"{Colors.BRIGHT_GREEN}{'='*60}{Colors.RESET}")
+        self.screen.print(f"{Colors.BOLD}{Colors.CYAN}")
+        self.screen.print("  _______ ______ _______ ___ ___ _______ ______  ")
+        self.screen.print(" |__   __|  ____|__   __|__ \__ \__   __|  ____| ")
+        self.screen.print("    | |  | |__     | |     ) | ) | | |  | |__    ")
+        self.screen.print("    | |  |  __|    | |    / / / /  | |  |  __|   ")
+        self.screen.print("    | |  | |____   | |   / /_/ /_ _| |_ | |____  ")
+        self.screen.print("    |_|  |______|  |_|  |____|____|_____|______| ")
+        self.screen.print(f"{Colors.RESET}")
+        self.screen.print(f"{Colors.YELLOW}           Programmed by Jeff{Colors.RESET}")
+        self.screen.print(f"{Colors.BRIGHT_GREEN}{'='*60}{Colors.RESET}")
+        self.screen.print()
     
     @staticmethod
     def draw_board(game_state: dict):
@@ -282,19 +832,18 @@ class GameRenderer:
         
         board_str = f"{Colors.WHITE}  +{'-' * (width * 2)}+{Colors.RESET}\n"
         
+        # Cells of the falling piece, worked out once per frame
+        piece_cells = set()
+        if current_piece and not game_state['game_over']:
+            piece_cells = set(current_piece.get_cells(current_pos))
+        
         for y in range(height):
             board_str += f"{Colors.WHITE}  |{Colors.RESET}"
             
             for x in range(width):
                 # Check if current piece occupies this cell
-                cell_occupied = False
-                piece_color = None
-                
-                if current_piece and not game_state['game_over']:
-                    cells = current_piece.get_cells(current_pos)
-                    if (y, x) in cells:
-                        cell_occupied = True
-                        piece_color = current_piece.color
+                cell_occupied = (y, x) in piece_cells
+                piece_color = current_piece.color if cell_occupied else None
                 
                 if cell_occupied:
                     board_str += f"{piece_color}██{Colors.RESET}"
@@ -309,21 +858,39 @@ class GameRenderer:
         return board_str
     
     @staticmethod
-    def draw_next_piece(next_piece: Piece):
-        """Draw the next piece preview"""
-        next_piece_str = f"\n{Colors.BOLD}Next piece:{Colors.RESET}\n"
-        shape = next_piece.shape
-        
-        for row in shape:
-            next_piece_str += " " * 8
+    def draw_piece(piece: Piece, color: Optional[str] = None) -> str:
+        """Draw a small piece, indented to sit beside the board"""
+        piece_str = ""
+        for row in piece.shape:
+            piece_str += " " * 8
             for cell in row:
                 if cell:
-                    next_piece_str += f"{next_piece.color}██{Colors.RESET}"
+                    piece_str += f"{color or piece.color}██{Colors.RESET}"
                 else:
-                    next_piece_str += "  "
-            next_piece_str += "\n"
-        
-        return next_piece_str
+                    piece_str += "  "
+            piece_str += "\n"
+        return piece_str
+    
+    @classmethod
+    def draw_next_piece(cls, next_piece: Piece):
+        """Draw the next piece preview"""
+        return f"\n{Colors.BOLD}Next piece:{Colors.RESET}\n" + cls.draw_piece(next_piece)
+    
+    @classmethod
+    def draw_preview(cls, pieces: List[Piece]) -> str:
+        """Draw the queue of upcoming pieces"""
+        preview_str = f"\n{Colors.BOLD}Next:{Colors.RESET}\n"
+        for piece in pieces:
+            preview_str += cls.draw_piece(piece)
+        return preview_str
+    
+    @classmethod
+    def draw_hold(cls, hold_piece: Optional[Piece], hold_used: bool) -> str:
+        """Draw the hold slot; greyed out until the next piece once used"""
+        hold_str = f"{Colors.BOLD}Hold:{Colors.RESET}\n"
+        if hold_piece is None:
+            return hold_str + " " * 8 + "--\n"
+        return hold_str + cls.draw_piece(hold_piece, Colors.WHITE if hold_used else None)
     
     @staticmethod
     def draw_game_info(game_state: dict):
@@ -333,6 +900,7 @@ class GameRenderer:
 {Colors.GREEN}Score: {Colors.BRIGHT_GREEN}{game_state['score']}{Colors.RESET}
 {Colors.BLUE}Level: {Colors.BRIGHT_BLUE}{game_state['level']}{Colors.RESET}
 {Colors.MAGENTA}Lines: {Colors.BRIGHT_MAGENTA}{game_state['lines_cleared']}{Colors.RESET}
+{Colors.BRIGHT_YELLOW}{game_state.get('last_clear', '')}{Colors.RESET}
 
 {Colors.BOLD}Controls:{Colors.RESET}
 {Colors.YELLOW}A / ←{Colors.RESET} - Move Left
@@ -340,33 +908,50 @@ class GameRenderer:
 {Colors.YELLOW}W / ↑{Colors.RESET} - Rotate
 {Colors.YELLOW}S / ↓{Colors.RESET} - Move Down
 {Colors.YELLOW}Space{Colors.RESET} - Drop
+{Colors.YELLOW}C{Colors.RESET} - Hold
+{Colors.YELLOW}U / Y{Colors.RESET} - Undo / Redo
 {Colors.YELLOW}P{Colors.RESET} - Pause
 {Colors.YELLOW}Q{Colors.RESET} - Quit
 """
         return info_str
     
-    @staticmethod
-    def draw_game_over(score: int):
+    def draw_game_over(self, score: int):
         """Draw game over screen"""
-        print(f"\n{Colors.BRIGHT_RED}{'*'*60}{Colors.RESET}")
-        print(f"{Colors.BOLD}{Colors.RED}GAME OVER!{Colors.RESET}")
-        print(f"{Colors.BRIGHT_RED}{'*'*60}{Colors.RESET}")
-        print(f"\n{Colors.YELLOW}Final Score: {Colors.BRIGHT_YELLOW}{score}{Colors.RESET}")
-        print(f"\n{Colors.CYAN}Press any key to exit...{Colors.RESET}")
+        self.screen.print(f"\n{Colors.BRIGHT_RED}{'*'*60}{Colors.RESET}")
+        self.screen.print(f"{Colors.BOLD}{Colors.RED}GAME OVER!{Colors.RESET}")
+        self.screen.print(f"{Colors.BRIGHT_RED}{'*'*60}{Colors.RESET}")
+        self.screen.print(f"\n{Colors.YELLOW}Final Score: {Colors.BRIGHT_YELLOW}{score}{Colors.RESET}")
+        self.screen.print(f"\n{Colors.CYAN}Press any key to exit...{Colors.RESET}")
+        self.screen.flush()
     
     def render(self, game_state: dict):
-        """Render the complete game screen"""
+        """Render the complete game screen as one write"""
+        if STATS.enabled:
+            with STATS.timer('render.frame'):
+                self._render(game_state)
+            if STATS.overlay:
+                self.screen.print(f"{Colors.BLUE}" + "\n".join(STATS.overlay_lines()) + Colors.RESET)
+        else:
+            self._render(game_state)
+        self.screen.flush()
+    
+    def _render(self, game_state: dict):
+        """Draw one frame"""
         self.clear_screen()
         self.draw_title()
         
         # Get all render components
         board = self.draw_board(game_state)
-        next_piece = self.draw_next_piece(game_state['next_piece'])
+        if 'preview' in game_state:
+            pieces = self.draw_hold(game_state['hold_piece'], game_state['hold_used'])
+            pieces += self.draw_preview(game_state['preview'])
+        else:
+            pieces = self.draw_next_piece(game_state['next_piece'])
         game_info = self.draw_game_info(game_state)
         
         # Combine all elements
         left_part = board
-        right_part = next_piece + game_info
+        right_part = pieces + game_info
         
         # Split into lines for side-by-side display
         board_lines = left_part.split('\n')
@@ -377,76 +962,41 @@ class GameRenderer:
         for i in range(max_lines):
             board_line = board_lines[i] if i < len(board_lines) else ""
             info_line = info_lines[i] if i < len(info_lines) else ""
-            print(f"{board_line.ljust(30)}  {info_line}")
+            self.screen.print(f"{board_line.ljust(30)}  {info_line}")
 
 # ============== INPUT HANDLER ==============
 class InputHandler:
     """Handles user input for the game"""
     
-    @staticmethod
-    def get_key():
-        """Get a single key press (works in Termux)"""
-        try:
-            # For Unix-like systems (Linux, macOS, Termux)
-            import termios
-            import tty
-            
-            fd = sys.stdin.fileno()
-            old_settings = termios.tcgetattr(fd)
-            
-            try:
-                tty.setraw(fd)
-                ch = sys.stdin.read(1)
-                
-                # Handle escape sequences (arrow keys)
-                if ch == '\x1b':
-                    # Read more characters for arrow keys
-                    ch2 = sys.stdin.read(1)
-                    if ch2 == '[':
-                        ch3 = sys.stdin.read(1)
-                        if ch3 == 'A': return 'w'    # Up arrow
-                        elif ch3 == 'B': return 's'  # Down arrow
-                        elif ch3 == 'C': return 'd'  # Right arrow
-                        elif ch3 == 'D': return 'a'  # Left arrow
-                elif ch == ' ': return ' '           # Space bar
-                elif ch == '\n': return 'enter'
-                elif ch == '\x03': return 'q'        # Ctrl+C
-                elif ch == '\x1b': return 'q'        # Escape
-                
-                return ch.lower()
-            finally:
-                termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-        except:
-            try:
-                # For Windows
-                import msvcrt
-                return msvcrt.getch().decode('utf-8').lower()
-            except:
-                return ''
+    def __init__(self, keyboard: Optional[Keyboard] = None):
+        self.keyboard = keyboard or TTYKeyboard()
     
-    @staticmethod
-    def wait_for_key(timeout: float = 0.1) -> str:
-        """Wait for key press with timeout"""
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            key = InputHandler.get_key()
-            if key:
-                return key
-            time.sleep(0.01)
-        return ''
+    def get_key(self) -> str:
+        """Wait for a single key press ('q' once input has ended)"""
+        return self.wait_for_key(None)
+    
+    def wait_for_key(self, timeout: Optional[float] = 0.1) -> str:
+        """Wait for key press with timeout; returns '' if none arrived"""
+        try:
+            return self.keyboard.read_key(timeout)
+        except EOFError:
+            return 'q'
 
 # ============== GAME CONTROLLER ==============
 class TetrisGame:
     """Main game controller that coordinates all components"""
     
-    def __init__(self):
-        self.board = GameBoard(
+    def __init__(self, screen: Optional[Screen] = None, keyboard: Optional[Keyboard] = None,
+                 board: Optional[GameBoard] = None):
+        # A restored board keeps its game id; only a new one starts a game
+        self.board = board if board is not None else GameBoard(
             GAME_CONFIG['BOARD_WIDTH'],
             GAME_CONFIG['BOARD_HEIGHT']
         )
-        self.renderer = GameRenderer()
-        self.input_handler = InputHandler()
-        self.last_drop_time = time.time()
+        self.renderer = GameRenderer(screen)
+        self.screen = self.renderer.screen
+        self.input_handler = InputHandler(keyboard)
+        self.last_tick_time = time.time()  # Wall time the board has been simulated up to
         self.paused = False
     
     def handle_input(self, key: str):
@@ -458,9 +1008,15 @@ class TetrisGame:
         elif key == 'w':
             self.board.rotate_piece()
         elif key == 's':
-            self.board.move_piece(0, 1)
+            self.board.soft_drop()
         elif key == ' ':
             self.board.drop_piece()
+        elif key == 'c':
+            self.board.hold()
+        elif key == 'u':
+            self.board.undo()
+        elif key == 'y':
+            self.board.redo()
         elif key == 'p':
             self.toggle_pause()
         elif key == 'q':
@@ -472,21 +1028,31 @@ class TetrisGame:
         self.paused = not self.paused
         if self.paused:
             self.renderer.clear_screen()
-            print(f"\n{Colors.YELLOW}Game Paused. Press any key to continue...{Colors.RESET}")
+            self.screen.print(f"\n{Colors.YELLOW}Game Paused. Press any key to continue...{Colors.RESET}")
+            self.screen.flush()
             self.input_handler.get_key()
             self.paused = False
+            self.last_tick_time = time.time()  # Time spent paused does not count
     
     def update(self):
-        """Update game state (auto-drop)"""
+        """Run the board for the ticks of wall time that have passed"""
         if self.paused or self.board.game_over:
             return
         
-        current_time = time.time()
-        drop_interval = self.board.get_drop_interval()
-        
-        if current_time - self.last_drop_time > drop_interval:
-            self.board.move_piece(0, 1)
-            self.last_drop_time = current_time
+        tick = GAME_CONFIG['TICK_SECONDS']
+        ticks = int((time.time() - self.last_tick_time) / tick)
+        # A stalled frame catches up at most one second of ticks
+        for _ in range(min(ticks, int(1 / tick))):
+            self.board.tick()
+        self.last_tick_time += ticks * tick
+    
+    def record_frame(self, frame_time: float):
+        """Record frame timing and count frames over budget as dropped"""
+        STATS.incr('frames')
+        STATS.observe('frame.time', frame_time)
+        if frame_time > GAME_CONFIG['FRAME_BUDGET']:
+            STATS.incr('frames.dropped')
+        STATS.maybe_dump()
     
     def run(self):
         """Main game loop"""
@@ -494,27 +1060,40 @@ class TetrisGame:
         self.renderer.clear_screen()
         self.renderer.draw_title()
         for i in range(3, 0, -1):
-            print(f"\n{Colors.BRIGHT_YELLOW}Game starts in {i}...{Colors.RESET}")
-            time.sleep(1)
+            self.screen.print(f"\n{Colors.BRIGHT_YELLOW}Game starts in {i}...{Colors.RESET}")
+            self.screen.pause(1)
         
         # Main game loop
+        key_time = None
         while not self.board.game_over:
+            frame_start = time.perf_counter()
+            
             # Update game state
             self.update()
             
             # Render game
             game_state = self.board.get_game_state()
             self.renderer.render(game_state)
+            if key_time is not None:
+                STATS.observe('input.latency', time.perf_counter() - key_time)
+                key_time = None
             
             # Handle input
             key = self.input_handler.wait_for_key(0.1)
             if key:
+                if STATS.enabled:
+                    key_time = time.perf_counter()
                 if not self.handle_input(key):
-                    print(f"\n{Colors.YELLOW}Thanks for playing!{Colors.RESET}")
+                    self.screen.print(f"\n{Colors.YELLOW}Thanks for playing!{Colors.RESET}")
+                    if EVENTS.enabled:
+                        self.board.log_result('quit')
                     break
             
             # Small delay to prevent CPU overuse
-            time.sleep(0.01)
+            self.screen.pause(0.01)
+            
+            if STATS.enabled:
+                self.record_frame(time.perf_counter() - frame_start)
         
         # Game over screen
         game_state = self.board.get_game_state()
@@ -525,6 +1104,7 @@ class TetrisGame:
 # ============== MAIN ENTRY POINT ==============
 def main():
     """Entry point for the Tetris game"""
+    configure_events(configure_stats(sys.argv[1:]))
     try:
         game = TetrisGame()
         game.run()
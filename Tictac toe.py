@@ -1,13 +1,15 @@
+import os
 import random
 import time
-import json
-import threading
-import socket
-import select
 import sys
-import os
+from collections import OrderedDict
 from datetime import datetime
 
+from instrumentation import STATS, configure as configure_stats
+from event_log import EVENTS, configure as configure_events
+from snapshot import SNAPSHOTS
+from terminal_io import TTYKeyboard, TTYScreen
+
 # ANSI color codes for colorful output
 class Colors:
     # Text colors
@@ -38,89 +40,163 @@ class Colors:
     
     # Reset
     RESET = '\033[0m'
+    
+    # Screen control
+    CLEAR_SCREEN = '\033[H\033[2J\033[3J'
+
+# Winning combinations on the 3x3 board
+WIN_PATTERNS = [
+    [0,1,2], [3,4,5], [6,7,8],  # Rows
+    [0,3,6], [1,4,7], [2,5,8],  # Columns
+    [0,4,8], [2,4,6]            # Diagonals
+]
+
+# The winning lines each square is part of; a move can only complete these
+LINES_THROUGH = [[pattern for pattern in WIN_PATTERNS if square in pattern] for square in range(9)]
+
+POSITION_MAP = "\n".join([
+    "╔════════════════════════════════════════════╗",
+    "║           POSITION REFERENCE               ║",
+    "╠═══════════╦═══════════╦═══════════╣",
+    "║    1      ║    2      ║    3      ║",
+    "╠═══════════╬═══════════╬═══════════╣",
+    "║    4      ║    5      ║    6      ║",
+    "╠═══════════╬═══════════╬═══════════╣",
+    "║    7      ║    8      ║    9      ║",
+    "╚═══════════╩═══════════╩═══════════╝"
+])
+
+class BoardRenderCache:
+    """Pre-rendered board frames.
+    
+    The static box pieces and per-cell glyphs are built once, and finished
+    frames are memoized by (board, current player, player names) in a
+    bounded LRU, so repeated redraws (or many spectators of one game) cost
+    a dictionary lookup.
+    """
+    
+    def __init__(self, max_frames=512):
+        self.max_frames = max_frames
+        self.frames = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        
+        self.header = "\n".join([
+            Colors.CYAN + "╔══════════════════════════════════════════════════════════╗" + Colors.RESET,
+            Colors.CYAN + "║" + Colors.BOLD + Colors.MAGENTA + "                    TIC TAC TOE ARENA                  " + Colors.RESET + Colors.CYAN + "║" + Colors.RESET,
+            Colors.CYAN + "╠═══════════╦═══════════╦═══════════╣" + Colors.RESET,
+        ])
+        self.row_start = Colors.CYAN + "║" + Colors.RESET
+        self.separator = Colors.CYAN + "╠═══════════╬═══════════╬═══════════╣" + Colors.RESET
+        self.footer = Colors.CYAN + "╚═══════════╩═══════════╩═══════════╝" + Colors.RESET
+        
+        cell_end = f"{Colors.RESET}{Colors.CYAN}║" + Colors.RESET
+        self.empty_glyph = f"{Colors.WHITE}       {cell_end}"
+        self.glyphs = {
+            'X': f"{Colors.WHITE}{Colors.BOLD}{Colors.CYAN}   X   {Colors.RESET}{cell_end}",
+            'O': f"{Colors.WHITE}{Colors.BOLD}{Colors.YELLOW}   O   {Colors.RESET}{cell_end}",
+        }
+        self.indicator = f"{Colors.BLINK}{Colors.GREEN}➤{Colors.RESET}"
+        self.players_title = f"{Colors.BOLD}Players:{Colors.RESET}"
+    
+    def render(self, board, current_player, players):
+        """Return the frame for this position, building it on a cache miss"""
+        key = (tuple(board), current_player, players['X'], players['O'])
+        frame = self.frames.get(key)
+        if frame is not None:
+            self.hits += 1
+            self.frames.move_to_end(key)
+            return frame
+        
+        self.misses += 1
+        frame = self._compose(board, current_player, players)
+        self.frames[key] = frame
+        if len(self.frames) > self.max_frames:
+            self.frames.popitem(last=False)
+        return frame
+    
+    def _compose(self, board, current_player, players):
+        """Assemble a frame from the pre-built pieces"""
+        glyph = self.glyphs.get
+        rows = [self.row_start + glyph(board[r], self.empty_glyph)
+                + glyph(board[r + 1], self.empty_glyph) + glyph(board[r + 2], self.empty_glyph)
+                for r in (0, 3, 6)]
+        
+        x_mark = self.indicator if current_player == 'X' else " "
+        o_mark = self.indicator if current_player != 'X' else " "
+        return "\n".join([
+            self.header,
+            rows[0], self.separator, rows[1], self.separator, rows[2],
+            self.footer,
+            "",
+            self.players_title,
+            f"{x_mark} {Colors.CYAN}X: {players['X']}{Colors.RESET}",
+            f"{o_mark} {Colors.YELLOW}O: {players['O']}{Colors.RESET}",
+        ])
+
+BOARD_RENDER_CACHE = BoardRenderCache()
 
 class TicTacToeGame:
     """Core Tic Tac Toe Game Logic"""
     
-    def __init__(self, player1="Player 1", player2="Player 2"):
+    def __init__(self, player1="Player 1", player2="Player 2", bots=None):
         self.board = [' ' for _ in range(9)]
         self.players = {'X': player1, 'O': player2}
+        self.bots = bots or {}  # Robot difficulty by mark, for ratings
         self.player_colors = {'X': Colors.CYAN, 'O': Colors.YELLOW}
         self.current_player = 'X'
         self.moves_history = []
         self.game_over = False
         self.winner = None
+        self.result_reason = None  # 'time' when a player lost on time
+        self.clock = None
+        # Undo record per placed mark: the square, plus 9 if O was to move before it
+        self.move_stack = []
+        self.redo_stack = []  # moves_history entries taken back by undo()
+        self.game_id = EVENTS.new_game_id()
+        self.saved_clock = None  # Clock banks of a restored game, applied by attach_clock()
+        self.rated = False
+        if EVENTS.enabled:
+            self.log_event('start', players=self.players, bots=self.bots)
         
+    def attach_clock(self, clock):
+        """Play under a time_control.GameClock, starting the first player's time"""
+        self.clock = clock
+        if self.saved_clock:
+            clock.remaining.update(self.saved_clock)
+            self.saved_clock = None
+        clock.on_flag.append(self.lose_on_time)
+        clock.start(self.current_player)
+    
+    def lose_on_time(self, player):
+        """End the game because ``player`` ran out of time"""
+        if self.game_over:
+            return
+        self.game_over = True
+        self.winner = 'O' if player == 'X' else 'X'
+        self.result_reason = 'time'
+        if SNAPSHOTS.enabled:
+            SNAPSHOTS.touch(self)
+        if EVENTS.enabled:
+            self.log_result()
+        if RATINGS.enabled:
+            RATINGS.record_game(self)
+    
+    def log_event(self, kind, **fields):
+        """Send an event about this game to the event log"""
+        EVENTS.emit('tictactoe', self.game_id, kind, **fields)
+    
+    def log_result(self):
+        self.log_event('end', winner=self.winner, reason=self.result_reason or 'board',
+                       moves=len(self.moves_history), players=self.players, bots=self.bots)
+    
     def get_board_position_map(self):
         """Return visual position map for reference"""
-        position_map = [
-            "╔════════════════════════════════════════════╗",
-            "║           POSITION REFERENCE               ║",
-            "╠═══════════╦═══════════╦═══════════╣",
-            "║    1      ║    2      ║    3      ║",
-            "╠═══════════╬═══════════╬═══════════╣",
-            "║    4      ║    5      ║    6      ║",
-            "╠═══════════╬═══════════╬═══════════╣",
-            "║    7      ║    8      ║    9      ║",
-            "╚═══════════╩═══════════╩═══════════╝"
-        ]
-        return "\n".join(position_map)
+        return POSITION_MAP
     
     def print_board_ascii(self, show_positions=False):
         """Create ASCII art board with colors and no numbers in boxes"""
-        board_display = []
-        
-        # Top border with title
-        board_display.append(Colors.CYAN + "╔══════════════════════════════════════════════════════════╗" + Colors.RESET)
-        board_display.append(Colors.CYAN + "║" + Colors.BOLD + Colors.MAGENTA + "                    TIC TAC TOE ARENA                  " + Colors.RESET + Colors.CYAN + "║" + Colors.RESET)
-        board_display.append(Colors.CYAN + "╠═══════════╦═══════════╦═══════════╣" + Colors.RESET)
-        
-        # Board rows
-        for row in range(3):
-            row_display = Colors.CYAN + "║" + Colors.RESET
-            for col in range(3):
-                idx = row * 3 + col
-                cell = self.board[idx]
-                
-                # Create cell content with colors
-                if cell == 'X':
-                    cell_content = f"{Colors.BOLD}{Colors.CYAN}   X   {Colors.RESET}"
-                elif cell == 'O':
-                    cell_content = f"{Colors.BOLD}{Colors.YELLOW}   O   {Colors.RESET}"
-                else:
-                    cell_content = "       "  # Empty cell
-                
-                row_display += f"{Colors.WHITE}{cell_content}{Colors.RESET}{Colors.CYAN}║" + Colors.RESET
-            
-            board_display.append(row_display)
-            
-            # Add separator between rows (not after last row)
-            if row < 2:
-                board_display.append(Colors.CYAN + "╠═══════════╬═══════════╬═══════════╣" + Colors.RESET)
-        
-        # Bottom border
-        board_display.append(Colors.CYAN + "╚═══════════╩═══════════╩═══════════╝" + Colors.RESET)
-        
-        # Add player info
-        board_display.append("")
-        x_color = Colors.CYAN
-        o_color = Colors.YELLOW
-        
-        # Current player indicator with blinking effect
-        if self.current_player == 'X':
-            current_indicator = f"{Colors.BLINK}{Colors.GREEN}➤{Colors.RESET}"
-            x_display = f"{current_indicator} {x_color}X: {self.players['X']}{Colors.RESET}"
-            o_display = f"  {o_color}O: {self.players['O']}{Colors.RESET}"
-        else:
-            current_indicator = f"{Colors.BLINK}{Colors.GREEN}➤{Colors.RESET}"
-            x_display = f"  {x_color}X: {self.players['X']}{Colors.RESET}"
-            o_display = f"{current_indicator} {o_color}O: {self.players['O']}{Colors.RESET}"
-        
-        board_display.append(f"{Colors.BOLD}Players:{Colors.RESET}")
-        board_display.append(x_display)
-        board_display.append(o_display)
-        
-        return "\n".join(board_display)
+        return BOARD_RENDER_CACHE.render(self.board, self.current_player, self.players)
     
     def make_move(self, position, player=None):
         """Make a move on the board"""
@@ -130,7 +206,14 @@ class TicTacToeGame:
         if self.game_over or position not in self.available_moves():
             return False
             
-        self.board[position] = player
+        elapsed = None
+        if self.clock is not None:
+            elapsed = self.clock.press('O' if player == 'X' else 'X')
+            if elapsed is None:
+                return False  # Flag fell before the move arrived
+            
+        self.place(position, player)
+        self.redo_stack.clear()
         
         # Add visual effect to move
         self.moves_history.append({
@@ -138,30 +221,98 @@ class TicTacToeGame:
             'position': position,
             'time': datetime.now().strftime("%H:%M:%S")
         })
+        if elapsed is not None:
+            self.moves_history[-1]['elapsed'] = round(elapsed, 3)
+        if SNAPSHOTS.enabled:
+            SNAPSHOTS.touch(self)
+        if EVENTS.enabled:
+            self.log_event('move', player=player, position=position, elapsed=elapsed)
         
-        # Check for winner
-        self.check_game_status()
-        
-        # Switch player if game not over
-        if not self.game_over:
-            self.current_player = 'O' if self.current_player == 'X' else 'X'
+        if self.game_over:
+            if self.clock is not None:
+                self.clock.stop()
+            if EVENTS.enabled:
+                self.log_result()
+            if RATINGS.enabled:
+                RATINGS.record_game(self)
             
         return True
     
+    def place(self, position, player=None):
+        """Put a mark down in place and update the result; take it back with unplace()
+        
+        Does no validation and skips the clock and move history. Only for
+        whoever owns the game: robots run on other threads while the clock
+        can end the game, so they search on copies of the board instead.
+        """
+        if player is None:
+            player = self.current_player
+        self.move_stack.append(position + (9 if self.current_player == 'O' else 0))
+        self.board[position] = player
+        
+        # Only lines through the new mark can have been completed
+        for a, b, c in LINES_THROUGH[position]:
+            if self.board[a] == self.board[b] == self.board[c]:
+                self.winner = player
+                self.game_over = True
+                return
+        if ' ' not in self.board:
+            self.game_over = True
+            self.winner = 'Tie'
+        else:
+            self.current_player = 'O' if self.current_player == 'X' else 'X'
+    
+    def unplace(self):
+        """Take back the last place(); returns the square it cleared"""
+        record = self.move_stack.pop()
+        position = record % 9
+        self.board[position] = ' '
+        self.current_player = 'O' if record >= 9 else 'X'
+        self.game_over = False
+        self.winner = None
+        return position
+    
+    def can_undo(self):
+        """Moves can be taken back unless the game is on the clock or was lost on time"""
+        return bool(self.moves_history) and self.clock is None and self.result_reason is None
+    
+    def undo(self):
+        """Take back the last move; returns its position, or None if there is none"""
+        if not self.can_undo():
+            return None
+        self.unplace()
+        entry = self.moves_history.pop()
+        self.redo_stack.append(entry)
+        if SNAPSHOTS.enabled:
+            SNAPSHOTS.touch(self)
+        if EVENTS.enabled:
+            self.log_event('undo', player=entry['player'], position=entry['position'])
+        return entry['position']
+    
+    def redo(self):
+        """Replay the last undone move; returns its position, or None if there is none"""
+        if not self.redo_stack or self.game_over:
+            return None
+        entry = self.redo_stack.pop()
+        self.place(entry['position'], entry['player'])
+        self.moves_history.append(entry)
+        if SNAPSHOTS.enabled:
+            SNAPSHOTS.touch(self)
+        if EVENTS.enabled:
+            self.log_event('redo', player=entry['player'], position=entry['position'])
+            if self.game_over:
+                self.log_result()
+        if RATINGS.enabled and self.game_over:
+            RATINGS.record_game(self)
+        return entry['position']
+    
     def available_moves(self):
         """Get list of available moves"""
         return [i for i, spot in enumerate(self.board) if spot == ' ']
     
     def check_game_status(self):
         """Check if game is won or tied"""
-        # Winning combinations
-        win_patterns = [
-            [0,1,2], [3,4,5], [6,7,8],  # Rows
-            [0,3,6], [1,4,7], [2,5,8],  # Columns
-            [0,4,8], [2,4,6]            # Diagonals
-        ]
-        
-        for pattern in win_patterns:
+        for pattern in WIN_PATTERNS:
             a, b, c = pattern
             if self.board[a] != ' ' and self.board[a] == self.board[b] == self.board[c]:
                 self.winner = self.board[a]
@@ -181,9 +332,47 @@ class TicTacToeGame:
             'players': self.players,
             'game_over': self.game_over,
             'winner': self.winner,
+            'result_reason': self.result_reason,
             'moves_history': self.moves_history
         }
     
+    def snapshot_state(self):
+        """Compact copy of the game for snapshot.py
+        
+        Only the move history is saved, never the board: robots search by
+        placing marks on the board from another thread. History entries are
+        not changed once appended, so they are shared rather than copied.
+        The redo stack is not saved.
+        """
+        banks = self.clock.banks() if self.clock is not None else None
+        return ('tictactoe', self.game_id, self.players['X'], self.players['O'],
+                tuple(self.moves_history), banks)
+    
+    @classmethod
+    def from_snapshot(cls, state):
+        """Rebuild a game from snapshot_state() without replaying it move by move"""
+        _, game_id, player1, player2, history, banks = state
+        game = cls.__new__(cls)
+        game.board = [' '] * 9
+        game.move_stack = []
+        for entry in history:
+            game.board[entry['position']] = entry['player']
+            game.move_stack.append(entry['position'] + (9 if entry['player'] == 'O' else 0))
+        game.players = {'X': player1, 'O': player2}
+        game.bots = {}  # Set by the host from the snapshot tag
+        game.player_colors = {'X': Colors.CYAN, 'O': Colors.YELLOW}
+        game.current_player = 'O' if history and history[-1]['player'] == 'X' else 'X'
+        game.moves_history = list(history)
+        game.game_over = False  # Finished games are not saved
+        game.winner = None
+        game.result_reason = None
+        game.clock = None
+        game.redo_stack = []
+        game.game_id = game_id
+        game.saved_clock = banks
+        game.rated = False
+        return game
+    
     def animate_move(self, position, player):
         """Animate placing a move on the board"""
         original_board = self.board.copy()
@@ -198,27 +387,55 @@ class TicTacToeGame:
         self.board[position] = player
         return original_board
 
+# Robot names by difficulty, also used for the bots on the leaderboard
+DIFFICULTY_LEVELS = {
+    'easy': '🎮 Novice Bot',
+    'medium': '⚡ Pro Bot',
+    'hard': '👑 Master Bot',
+    'impossible': '🤖 Terminator Bot',
+    'mcts': '🎲 Monte Carlo Bot',
+    'oracle': '📚 Oracle Bot'
+}
+
 class RobotAI:
     """AI Player for Tic Tac Toe"""
     
-    def __init__(self, difficulty='medium'):
+    # Minimax results shared by every bot, keyed on (board, player to move)
+    _minimax_cache = {}
+    # Solved 3x3 endgame database, opened on first use by the oracle
+    _endgame_db = None
+    
+    def __init__(self, difficulty='medium', mark='O', think_delay=True, mcts_options=None):
         self.difficulty = difficulty
+        self.mark = mark
+        self.opponent = 'X' if mark == 'O' else 'O'
+        self.think_delay = think_delay
+        # In-process by default; pass {'workers': n} for a pool of n - 1 extra searches
+        self.mcts_options = mcts_options or {'time_budget': 1.0, 'workers': 1}
+        self.mcts = None
+        self.move_budget = None  # seconds allowed by the game clock for this move
         self.name = "🤖 Robot"
-        self.difficulty_levels = {
-            'easy': '🎮 Novice Bot',
-            'medium': '⚡ Pro Bot',
-            'hard': '👑 Master Bot',
-            'impossible': '🤖 Terminator Bot'
-        }
+        self.difficulty_levels = DIFFICULTY_LEVELS
         self.difficulty_colors = {
             'easy': Colors.GREEN,
             'medium': Colors.YELLOW,
             'hard': Colors.MAGENTA,
-            'impossible': Colors.RED
+            'impossible': Colors.RED,
+            'mcts': Colors.BLUE,
+            'oracle': Colors.CYAN
         }
         
     def get_move(self, game):
         """Get AI move based on difficulty"""
+        clock = getattr(game, 'clock', None)
+        self.move_budget = clock.move_budget(self.mark, len(game.available_moves()) // 2 + 1) if clock else None
+        if STATS.enabled:
+            with STATS.timer(f'ai.get_move.{self.difficulty}'):
+                return self.choose_move(game)
+        return self.choose_move(game)
+    
+    def choose_move(self, game):
+        """Dispatch to the move picker for this difficulty"""
         available = game.available_moves()
         
         if self.difficulty == 'easy':
@@ -227,31 +444,36 @@ class RobotAI:
             return self.medium_move(game, available)
         elif self.difficulty == 'hard':
             return self.hard_move(game, available)
+        elif self.difficulty == 'mcts':
+            return self.mcts_move(game)
+        elif self.difficulty == 'oracle':
+            return self.oracle_move(game)
         else:  # impossible
             return self.impossible_move(game, available)
     
+    def think(self, seconds):
+        """Pause to simulate thinking (skipped for headless play)"""
+        if self.move_budget is not None:
+            seconds = min(seconds, self.move_budget / 2)  # Never lose on time for show
+        if self.think_delay:
+            time.sleep(seconds)
+    
     def easy_move(self, available):
         """Random moves"""
-        time.sleep(1)  # Think time
+        self.think(1)  # Think time
         return random.choice(available)
     
     def medium_move(self, game, available):
         """Try to win or block"""
-        time.sleep(1.5)  # Think time
-        
-        # Try to win
-        for move in available:
-            test_board = game.board.copy()
-            test_board[move] = 'O'
-            if self.check_win(test_board, 'O'):
-                return move
+        self.think(1.5)  # Think time
         
-        # Block player
-        for move in available:
-            test_board = game.board.copy()
-            test_board[move] = 'X'
-            if self.check_win(test_board, 'X'):
-                return move
+        # Try to win, then block the player: a square wins if it completes a line through it.
+        # The live game is never touched, since the clock may end it meanwhile.
+        board = list(game.board)
+        for mark in (self.mark, self.opponent):
+            for move in available:
+                if any(all(board[i] == mark for i in line if i != move) for line in LINES_THROUGH[move]):
+                    return move
         
         # Prefer center
         if 4 in available:
@@ -268,16 +490,54 @@ class RobotAI:
     
     def hard_move(self, game, available):
         """More strategic AI"""
-        time.sleep(2)  # Think time
-        return self.minimax(game.board, 'O', available)['position']
+        self.think(2)  # Think time
+        return self.minimax(list(game.board), self.mark, available)['position']
     
     def impossible_move(self, game, available):
         """Perfect AI using minimax"""
-        time.sleep(0.5)  # Quick thinking for Terminator
-        return self.minimax(game.board, 'O', available, True)['position']
+        self.think(0.5)  # Quick thinking for Terminator
+        return self.minimax(list(game.board), self.mark, available, True)['position']
+    
+    def mcts_move(self, game):
+        """Monte Carlo Tree Search within a fixed time or iteration budget"""
+        if self.mcts is None:
+            from mcts import MonteCarloTreeSearch
+            self.mcts = MonteCarloTreeSearch(patterns=WIN_PATTERNS, **self.mcts_options)
+        if len(game.moves_history) < 2:
+            self.mcts.reset()  # New game, old tree is useless
+        return self.mcts.search(game.board, self.mark, self.move_budget)
+    
+    def close(self):
+        """Shut down the MCTS process pool, if one was started"""
+        if self.mcts is not None:
+            self.mcts.close()
+    
+    def oracle_move(self, game):
+        """Perfect play looked up in the solved endgame database"""
+        self.think(0.5)
+        if RobotAI._endgame_db is None:
+            from endgame_db import open_database
+            RobotAI._endgame_db = open_database(3, 3, 3)
+        return RobotAI._endgame_db.best_move(game.board)[0]
     
     def minimax(self, board, player, available, perfect=False):
         """Minimax algorithm for optimal moves"""
+        # Every node searches all empty squares, so the board alone decides the result
+        key = (''.join(board), player)
+        cached = RobotAI._minimax_cache.get(key)
+        if cached is not None:
+            if STATS.enabled:
+                STATS.incr('ai.minimax_cache_hits')
+            return dict(cached)
+        
+        if STATS.enabled:
+            STATS.incr('ai.minimax_nodes')
+        result = self._minimax_search(board, player, available, perfect)
+        RobotAI._minimax_cache[key] = result
+        return dict(result)
+    
+    def _minimax_search(self, board, player, available, perfect):
+        """Uncached minimax step"""
         # Check terminal states
         if self.check_win(board, 'O'):
             return {'score': 10}
@@ -315,35 +575,99 @@ class RobotAI:
     
     def check_win(self, board, player):
         """Check if player has won"""
-        win_patterns = [
-            [0,1,2], [3,4,5], [6,7,8],
-            [0,3,6], [1,4,7], [2,5,8],
-            [0,4,8], [2,4,6]
-        ]
-        return any(all(board[i] == player for i in pattern) for pattern in win_patterns)
+        return any(all(board[i] == player for i in pattern) for pattern in WIN_PATTERNS)
     
     def get_difficulty_display(self):
-        """Get colored difficulty display"""
+        """Get colored difficulty display, with the measured rating when ratings are on"""
         color = self.difficulty_colors.get(self.difficulty, Colors.WHITE)
-        return f"{color}{self.difficulty_levels[self.difficulty]}{Colors.RESET}"
+        label = self.difficulty_levels[self.difficulty]
+        if RATINGS.enabled:
+            rating = RATINGS.bot_rating(self.difficulty)
+            if rating is not None:
+                label += f" ({rating.rating:.0f})"
+        return f"{color}{label}{Colors.RESET}"
+
+# Post-game analysis verdicts shown under the moves history
+VERDICT_COLORS = {'blunder': Colors.RED, 'missed win': Colors.YELLOW, 'inaccuracy': Colors.WHITE}
+
+# Players shown on the ratings leaderboard
+LEADERBOARD_SIZE = 10
+
+# Menu choices for the robot difficulty
+DIFFICULTY_CHOICES = {'1': 'easy', '2': 'medium', '3': 'hard', '4': 'impossible', '5': 'mcts', '6': 'oracle'}
+
+class RatingsOff:
+    """Stands in for ``ratings.RATINGS`` while ratings are off"""
+    enabled = False
+
+# ratings.py is only imported once configure_ratings turns ratings on
+RATINGS = RatingsOff()
+BOT_PREFIX = 'bot:'  # Rating id prefixes, as in ratings.py
+HUMAN_PREFIX = 'human:'
+
+def configure_ratings(argv):
+    """Turn ratings on for --ratings=PATH or GAME_RATINGS_FILE; returns the remaining arguments"""
+    global RATINGS
+    if not os.environ.get('GAME_RATINGS_FILE') and not any(arg.startswith('--ratings=') for arg in argv):
+        return argv
+    import ratings
+    RATINGS = ratings.RATINGS
+    return ratings.configure(argv)
+
+def rating_name(player_id):
+    """Leaderboard name of a rated player, rated as human:<name> or bot:<difficulty>"""
+    if player_id.startswith(BOT_PREFIX):
+        return DIFFICULTY_LEVELS.get(player_id[len(BOT_PREFIX):], player_id)
+    if player_id.startswith(HUMAN_PREFIX):
+        return player_id[len(HUMAN_PREFIX):]
+    return player_id
+
+# Prompts shared by the blocking and asyncio interfaces
+NAME_PROMPT = f"{Colors.CYAN}Enter your name: {Colors.RESET}"
+PLAYER1_PROMPT = f"{Colors.CYAN}Enter {Colors.BOLD}Player 1{Colors.RESET}{Colors.CYAN} name (X): {Colors.RESET}"
+PLAYER2_PROMPT = f"{Colors.YELLOW}Enter {Colors.BOLD}Player 2{Colors.RESET}{Colors.YELLOW} name (O): {Colors.RESET}"
+MOVE_PROMPT = f"\n{Colors.YELLOW}Enter position (1-9) or command (r/m/q/p/u/y): {Colors.RESET}"
+GAME_OVER_PROMPT = f"\n{Colors.YELLOW}Press '{Colors.GREEN}r{Colors.YELLOW}' to restart, '{Colors.GREEN}u{Colors.YELLOW}' to undo, '{Colors.GREEN}m{Colors.YELLOW}' for menu, or any key to quit: {Colors.RESET}"
+ANALYSIS_GAME_OVER_PROMPT = f"\n{Colors.YELLOW}Press '{Colors.GREEN}r{Colors.YELLOW}' to restart, '{Colors.GREEN}u{Colors.YELLOW}' to undo, '{Colors.GREEN}a{Colors.YELLOW}' to analyze, '{Colors.GREEN}m{Colors.YELLOW}' for menu, or any key to quit: {Colors.RESET}"
+RETURN_PROMPT = f"\n{Colors.CYAN}Press Enter to return to main menu...{Colors.RESET}"
+SETTINGS_PROMPT = f"\n{Colors.YELLOW}Choose option (1-3): {Colors.RESET}"
+NEW_NAME_PROMPT = f"\n{Colors.CYAN}Enter new player name: {Colors.RESET}"
+DIFFICULTY_PROMPT = f"\n{Colors.YELLOW}Choose difficulty (1-6): {Colors.RESET}"
 
 class TicTacToeTerminal:
     """Main Terminal Interface"""
     
-    def __init__(self):
+    offer_analysis = True  # 'a' after a game grades its moves against the endgame database
+    
+    def __init__(self, screen=None, keyboard=None):
+        self.screen = screen or TTYScreen()
+        self.keyboard = keyboard or TTYKeyboard()
         self.game = None
         self.ai = None
         self.online_client = None
         self.player_name = "Player"
         self.show_positions = True  # Toggle for showing position numbers
+        self.time_control = None    # time_control.TimeControl for new games
+        self.timer_wheel = None     # shared TimerWheel; None checks clocks on each move
+        self.analyzed_game = None   # Game whose result screen shows the analysis
         
     def clear_screen(self):
         """Clear terminal screen"""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        self.screen.clear()
+    
+    def ask(self, prompt):
+        """Show a prompt and read the reply (replaces ``input``)"""
+        self.screen.write(prompt)
+        self.screen.flush()
+        return self.keyboard.read_line()
     
     def print_header(self):
         """Print game header with colors and ASCII art"""
-        header = f"""
+        self.screen.print(self.header_text())
+    
+    def header_text(self):
+        """Game header with colors and ASCII art"""
+        return f"""
 {Colors.MAGENTA}{Colors.BOLD}
     ╔═══════════════════════════════════════════════════════════════════════════╗
     ║                                                                           ║
@@ -367,15 +691,10 @@ class TicTacToeTerminal:
     ║                 {Colors.BOLD}{Colors.GREEN}Created and Hosted by Jeff{Colors.RESET}{Colors.MAGENTA}                      ║
     ╚═══════════════════════════════════════════════════════════════════════════╝{Colors.RESET}
         """
-        print(header)
     
-    def main_menu(self):
-        """Display main menu"""
-        while True:
-            self.clear_screen()
-            self.print_header()
-            
-            menu = f"""
+    def main_menu_text(self):
+        """Main menu screen, ending with the choice prompt"""
+        return f"""
     {Colors.CYAN}╔═══════════════════════════════════════════════════════════╗{Colors.RESET}
     {Colors.CYAN}║{Colors.BOLD}{Colors.MAGENTA}                    MAIN MENU                      {Colors.RESET}{Colors.CYAN}║{Colors.RESET}
     {Colors.CYAN}╠═══════════════════════════════════════════════════════════╣{Colors.RESET}
@@ -391,32 +710,45 @@ class TicTacToeTerminal:
     {Colors.CYAN}╚═══════════════════════════════════════════════════════════╝{Colors.RESET}
     
     {Colors.YELLOW}{Colors.BOLD}Choose option (1-7):{Colors.RESET} """
+    
+    def main_menu(self):
+        """Display main menu"""
+        while True:
+            self.clear_screen()
+            self.print_header()
             
-            choice = input(menu).strip()
+            try:
+                choice = self.ask(self.main_menu_text()).strip()
+                
+                result = None
+                if choice == '1':
+                    result = self.play_vs_robot()
+                elif choice == '2':
+                    result = self.play_vs_friend()
+                elif choice == '3':
+                    self.play_online()
+                elif choice == '4':
+                    self.game_settings()
+                elif choice == '5':
+                    self.how_to_play()
+                elif choice == '6':
+                    self.view_leaderboard()
+                elif choice == '7':
+                    self.screen.print(f"\n{Colors.GREEN}Thanks for playing! Goodbye! 👋{Colors.RESET}\n")
+                    break
+                else:
+                    self.screen.print(f"{Colors.RED}Invalid choice. Please try again.{Colors.RESET}")
+                    self.screen.pause(1)
+            except EOFError:
+                break  # Input closed
             
-            if choice == '1':
-                self.play_vs_robot()
-            elif choice == '2':
-                self.play_vs_friend()
-            elif choice == '3':
-                self.play_online()
-            elif choice == '4':
-                self.game_settings()
-            elif choice == '5':
-                self.how_to_play()
-            elif choice == '6':
-                self.view_leaderboard()
-            elif choice == '7':
-                print(f"\n{Colors.GREEN}Thanks for playing! Goodbye! 👋{Colors.RESET}\n")
+            if result == 'quit':
                 break
-            else:
-                print(f"{Colors.RED}Invalid choice. Please try again.{Colors.RESET}")
-                time.sleep(1)
+        self.screen.flush()
     
-    def game_settings(self):
-        """Game settings menu"""
-        self.clear_screen()
-        print(f"""
+    def settings_text(self):
+        """Settings menu screen"""
+        return f"""
     {Colors.CYAN}╔═══════════════════════════════════════════════════════════╗{Colors.RESET}
     {Colors.CYAN}║{Colors.BOLD}{Colors.MAGENTA}                   GAME SETTINGS                    {Colors.RESET}{Colors.CYAN}║{Colors.RESET}
     {Colors.CYAN}╠═══════════════════════════════════════════════════════════╣{Colors.RESET}
@@ -426,27 +758,40 @@ class TicTacToeTerminal:
     {Colors.CYAN}║  {Colors.GREEN}3.{Colors.RESET} Back to Main Menu                             {Colors.CYAN}║{Colors.RESET}
     {Colors.CYAN}║                                                           ║{Colors.RESET}
     {Colors.CYAN}╚═══════════════════════════════════════════════════════════╝{Colors.RESET}
-        """)
+        """
+    
+    def game_settings(self):
+        """Game settings menu"""
+        self.clear_screen()
+        self.screen.print(self.settings_text())
         
-        choice = input(f"\n{Colors.YELLOW}Choose option (1-3): {Colors.RESET}").strip()
+        choice = self.ask(SETTINGS_PROMPT).strip()
         
         if choice == '1':
-            self.show_positions = not self.show_positions
-            print(f"\n{Colors.GREEN}Position numbers are now {'ON' if self.show_positions else 'OFF'}{Colors.RESET}")
-            time.sleep(1)
+            self.toggle_positions_setting()
+            self.screen.pause(1)
         elif choice == '2':
-            new_name = input(f"\n{Colors.CYAN}Enter new player name: {Colors.RESET}").strip()
-            if new_name:
-                self.player_name = new_name
-                print(f"{Colors.GREEN}Player name updated to {new_name}{Colors.RESET}")
-                time.sleep(1)
+            if self.rename_player(self.ask(NEW_NAME_PROMPT).strip()):
+                self.screen.pause(1)
         elif choice == '3':
             return
     
-    def how_to_play(self):
-        """Display game instructions"""
-        self.clear_screen()
-        print(f"""
+    def toggle_positions_setting(self):
+        """Flip the position number display from the settings menu"""
+        self.show_positions = not self.show_positions
+        self.screen.print(f"\n{Colors.GREEN}Position numbers are now {'ON' if self.show_positions else 'OFF'}{Colors.RESET}")
+    
+    def rename_player(self, new_name):
+        """Change the player name; returns False when the name is empty"""
+        if not new_name:
+            return False
+        self.player_name = new_name
+        self.screen.print(f"{Colors.GREEN}Player name updated to {new_name}{Colors.RESET}")
+        return True
+    
+    def how_to_play_text(self):
+        """Instructions screen"""
+        return f"""
     {Colors.CYAN}╔═══════════════════════════════════════════════════════════╗{Colors.RESET}
     {Colors.CYAN}║{Colors.BOLD}{Colors.MAGENTA}                    HOW TO PLAY                     {Colors.RESET}{Colors.CYAN}║{Colors.RESET}
     {Colors.CYAN}╠═══════════════════════════════════════════════════════════╣{Colors.RESET}
@@ -469,15 +814,23 @@ class TicTacToeTerminal:
     {Colors.CYAN}║     • {Colors.YELLOW}m{Colors.RESET}   - Main Menu                          {Colors.CYAN}║{Colors.RESET}
     {Colors.CYAN}║     • {Colors.YELLOW}q{Colors.RESET}   - Quit game                          {Colors.CYAN}║{Colors.RESET}
     {Colors.CYAN}║     • {Colors.YELLOW}p{Colors.RESET}   - Toggle position display            {Colors.CYAN}║{Colors.RESET}
+    {Colors.CYAN}║     • {Colors.YELLOW}u{Colors.RESET}   - Undo move                          {Colors.CYAN}║{Colors.RESET}
+    {Colors.CYAN}║     • {Colors.YELLOW}y{Colors.RESET}   - Redo move                          {Colors.CYAN}║{Colors.RESET}
     {Colors.CYAN}║                                                           ║{Colors.RESET}
     {Colors.CYAN}╚═══════════════════════════════════════════════════════════╝{Colors.RESET}
-        """)
-        input(f"\n{Colors.CYAN}Press Enter to return to main menu...{Colors.RESET}")
+        """
     
-    def view_leaderboard(self):
-        """Display leaderboard with colors"""
+    def how_to_play(self):
+        """Display game instructions"""
         self.clear_screen()
-        print(f"""
+        self.screen.print(self.how_to_play_text())
+        self.ask(RETURN_PROMPT)
+    
+    def leaderboard_text(self):
+        """Leaderboard screen, from the ratings when they are on"""
+        if RATINGS.enabled and RATINGS.leaderboard(1):
+            return self.ratings_leaderboard_text()
+        return f"""
     {Colors.CYAN}╔═══════════════════════════════════════════════════════════╗{Colors.RESET}
     {Colors.CYAN}║{Colors.BOLD}{Colors.MAGENTA}                   LEADERBOARD                      {Colors.RESET}{Colors.CYAN}║{Colors.RESET}
     {Colors.CYAN}╠═══════════════════════════════════════════════════════════╣{Colors.RESET}
@@ -489,13 +842,40 @@ class TicTacToeTerminal:
     {Colors.CYAN}║  {Colors.BOLD}5. 👑 King of Tic Tac{Colors.RESET}                  {Colors.GREEN}W: 30{Colors.RESET}   {Colors.RED}L: 15{Colors.RESET}  {Colors.CYAN}║{Colors.RESET}
     {Colors.CYAN}║                                                           ║{Colors.RESET}
     {Colors.CYAN}╚═══════════════════════════════════════════════════════════╝{Colors.RESET}
-        """)
-        input(f"\n{Colors.CYAN}Press Enter to return to main menu...{Colors.RESET}")
+        """
     
-    def choose_difficulty(self):
-        """Let player choose AI difficulty with colors"""
+    def ratings_leaderboard_text(self):
+        """Leaderboard of measured Glicko-2 ratings"""
+        medals = [f"{Colors.YELLOW}🥇 ", f"{Colors.WHITE}🥈 ", f"{Colors.MAGENTA}🥉 "]
+        rows = []
+        for rank, (player_id, rating) in enumerate(RATINGS.leaderboard(LEADERBOARD_SIZE), 1):
+            medal = medals[rank - 1] if rank <= len(medals) else '   '
+            name = rating_name(player_id)[:20]
+            record = f"{rating.wins}W {rating.draws}D {rating.losses}L"
+            rows.append(f"    {Colors.CYAN}║  {medal}{Colors.BOLD}{rank:>2}. {name:<20}{Colors.RESET} "
+                        f"{Colors.GREEN}{rating.rating:5.0f}{Colors.RESET} ±{rating.rd:<4.0f}"
+                        f"{record:>16}  {Colors.CYAN}║{Colors.RESET}")
+        rows = '\n'.join(rows)
+        return f"""
+    {Colors.CYAN}╔═══════════════════════════════════════════════════════════╗{Colors.RESET}
+    {Colors.CYAN}║{Colors.BOLD}{Colors.MAGENTA}                   LEADERBOARD                      {Colors.RESET}{Colors.CYAN}║{Colors.RESET}
+    {Colors.CYAN}╠═══════════════════════════════════════════════════════════╣{Colors.RESET}
+    {Colors.CYAN}║                                                           ║{Colors.RESET}
+{rows}
+    {Colors.CYAN}║                                                           ║{Colors.RESET}
+    {Colors.CYAN}║  {Colors.WHITE}Glicko-2 ratings, ranked by rating minus twice the RD{Colors.RESET}    {Colors.CYAN}║{Colors.RESET}
+    {Colors.CYAN}╚═══════════════════════════════════════════════════════════╝{Colors.RESET}
+        """
+    
+    def view_leaderboard(self):
+        """Display leaderboard with colors"""
         self.clear_screen()
-        print(f"""
+        self.screen.print(self.leaderboard_text())
+        self.ask(RETURN_PROMPT)
+    
+    def difficulty_text(self):
+        """Difficulty selection screen"""
+        return f"""
     {Colors.CYAN}╔═══════════════════════════════════════════════════════════╗{Colors.RESET}
     {Colors.CYAN}║{Colors.BOLD}{Colors.MAGENTA}               CHOOSE AI DIFFICULTY                {Colors.RESET}{Colors.CYAN}║{Colors.RESET}
     {Colors.CYAN}╠═══════════════════════════════════════════════════════════╣{Colors.RESET}
@@ -504,70 +884,103 @@ class TicTacToeTerminal:
     {Colors.CYAN}║  {Colors.YELLOW}2.{Colors.RESET} {Colors.YELLOW}😐 MEDIUM{Colors.RESET} - Pro Bot (Basic strategy)       {Colors.CYAN}║{Colors.RESET}
     {Colors.CYAN}║  {Colors.MAGENTA}3.{Colors.RESET} {Colors.MAGENTA}🤔 HARD{Colors.RESET}   - Master Bot (Advanced strategy) {Colors.CYAN}║{Colors.RESET}
     {Colors.CYAN}║  {Colors.RED}4.{Colors.RESET} {Colors.RED}😱 IMPOSSIBLE{Colors.RESET} - Terminator Bot (Unbeatable)   {Colors.CYAN}║{Colors.RESET}
+    {Colors.CYAN}║  {Colors.BLUE}5.{Colors.RESET} {Colors.BLUE}🎲 MCTS{Colors.RESET}   - Monte Carlo Bot (Tree search)   {Colors.CYAN}║{Colors.RESET}
+    {Colors.CYAN}║  {Colors.CYAN}6.{Colors.RESET} {Colors.CYAN}📚 ORACLE{Colors.RESET} - Oracle Bot (Solved database)  {Colors.CYAN}║{Colors.RESET}
     {Colors.CYAN}║                                                           ║{Colors.RESET}
     {Colors.CYAN}╚═══════════════════════════════════════════════════════════╝{Colors.RESET}
-        """)
+        {self.bot_ratings_text()}"""
+    
+    def bot_ratings_text(self):
+        """Measured bot ratings under the difficulty menu, when ratings are on"""
+        if not RATINGS.enabled:
+            return ''
+        ratings = {number: RATINGS.bot_rating(difficulty) for number, difficulty in DIFFICULTY_CHOICES.items()}
+        measured = [f"{number}. {rating.rating:.0f}" for number, rating in ratings.items() if rating is not None]
+        if not measured:
+            return ''
+        return f"{Colors.WHITE}Measured ratings: {'  '.join(measured)}{Colors.RESET}\n"
+    
+    def choose_difficulty(self):
+        """Let player choose AI difficulty with colors"""
+        self.clear_screen()
+        self.screen.print(self.difficulty_text())
         
         while True:
-            choice = input(f"\n{Colors.YELLOW}Choose difficulty (1-4): {Colors.RESET}").strip()
-            if choice == '1':
-                return 'easy'
-            elif choice == '2':
-                return 'medium'
-            elif choice == '3':
-                return 'hard'
-            elif choice == '4':
-                return 'impossible'
-            else:
-                print(f"{Colors.RED}Invalid choice. Please enter 1-4.{Colors.RESET}")
+            choice = self.ask(DIFFICULTY_PROMPT).strip()
+            if choice in DIFFICULTY_CHOICES:
+                return DIFFICULTY_CHOICES[choice]
+            self.screen.print(f"{Colors.RED}Invalid choice. Please enter 1-6.{Colors.RESET}")
     
-    def play_vs_robot(self):
-        """Play against AI robot"""
+    def print_mode_banner(self, title):
+        """Clear the screen and show the title of a game mode"""
         self.clear_screen()
-        print(f"\n{Colors.CYAN}{'═' * 60}{Colors.RESET}")
-        print(f"{Colors.BOLD}{Colors.MAGENTA}🤖 PLAY VS ROBOT 🤖{Colors.RESET}")
-        print(f"{Colors.CYAN}{'═' * 60}{Colors.RESET}\n")
-        
-        # Get player name
-        self.player_name = input(f"{Colors.CYAN}Enter your name: {Colors.RESET}").strip() or "Player"
+        self.screen.print(f"\n{Colors.CYAN}{'═' * 60}{Colors.RESET}")
+        self.screen.print(f"{Colors.BOLD}{Colors.MAGENTA}{title}{Colors.RESET}")
+        self.screen.print(f"{Colors.CYAN}{'═' * 60}{Colors.RESET}\n")
+    
+    def create_ai(self, difficulty):
+        """Build the robot opponent for a new game, retiring the previous one"""
+        if self.ai is not None:
+            self.ai.close()
+        return RobotAI(difficulty, think_delay=self.screen.interactive)
+    
+    def new_game(self, player1, player2, bots=None):
+        """Create a game, on the clock if a time control is set"""
+        game = TicTacToeGame(player1, player2, bots)
+        self.start_clock(game)
+        return game
+    
+    def start_clock(self, game):
+        """Put ``game`` on the clock if a time control is set"""
+        if self.time_control is not None:
+            from time_control import GameClock
+            game.attach_clock(GameClock(self.time_control, self.timer_wheel))
+    
+    def start_robot_game(self, difficulty):
+        """Create a game against the robot and announce it"""
+        self.game = self.new_game(self.player_name, "🤖 Robot", {'O': difficulty})
+        self.ai = self.create_ai(difficulty)
         
-        # Choose difficulty
-        difficulty = self.choose_difficulty()
+        self.screen.print(f"\n{Colors.GREEN}{'═' * 60}{Colors.RESET}")
+        self.screen.print(f"{Colors.BOLD}Starting game: {Colors.CYAN}{self.player_name} (X){Colors.RESET} vs {self.ai.get_difficulty_display()} (O)")
+        self.screen.print(f"{Colors.GREEN}{'═' * 60}{Colors.RESET}\n")
+    
+    def start_friend_game(self, player1, player2):
+        """Create a local two-player game and announce it"""
+        if self.ai is not None:
+            self.ai.close()
+        self.ai = None
+        self.game = self.new_game(player1, player2)
         
-        # Create game and AI
-        self.game = TicTacToeGame(self.player_name, "🤖 Robot")
-        self.ai = RobotAI(difficulty)
+        self.screen.print(f"\n{Colors.GREEN}{'═' * 60}{Colors.RESET}")
+        self.screen.print(f"{Colors.BOLD}Starting game: {Colors.CYAN}{player1} (X){Colors.RESET} vs {Colors.YELLOW}{player2} (O){Colors.RESET}")
+        self.screen.print(f"{Colors.GREEN}{'═' * 60}{Colors.RESET}\n")
+    
+    def play_vs_robot(self):
+        """Play against AI robot"""
+        self.print_mode_banner("🤖 PLAY VS ROBOT 🤖")
         
-        print(f"\n{Colors.GREEN}{'═' * 60}{Colors.RESET}")
-        print(f"{Colors.BOLD}Starting game: {Colors.CYAN}{self.player_name} (X){Colors.RESET} vs {self.ai.get_difficulty_display()} (O)")
-        print(f"{Colors.GREEN}{'═' * 60}{Colors.RESET}\n")
+        # Get player name
+        self.player_name = self.ask(NAME_PROMPT).strip() or "Player"
         
-        self.play_game()
+        # Choose difficulty and create game and AI
+        self.start_robot_game(self.choose_difficulty())
+        return self.play_game()
     
     def play_vs_friend(self):
         """Local multiplayer"""
-        self.clear_screen()
-        print(f"\n{Colors.CYAN}{'═' * 60}{Colors.RESET}")
-        print(f"{Colors.BOLD}{Colors.MAGENTA}👥 PLAY VS FRIEND 👥{Colors.RESET}")
-        print(f"{Colors.CYAN}{'═' * 60}{Colors.RESET}\n")
+        self.print_mode_banner("👥 PLAY VS FRIEND 👥")
         
         # Get player names with colors
-        player1 = input(f"{Colors.CYAN}Enter {Colors.BOLD}Player 1{Colors.RESET}{Colors.CYAN} name (X): {Colors.RESET}").strip() or "Player 1"
-        player2 = input(f"{Colors.YELLOW}Enter {Colors.BOLD}Player 2{Colors.RESET}{Colors.YELLOW} name (O): {Colors.RESET}").strip() or "Player 2"
+        player1 = self.ask(PLAYER1_PROMPT).strip() or "Player 1"
+        player2 = self.ask(PLAYER2_PROMPT).strip() or "Player 2"
         
-        # Create game
-        self.game = TicTacToeGame(player1, player2)
-        
-        print(f"\n{Colors.GREEN}{'═' * 60}{Colors.RESET}")
-        print(f"{Colors.BOLD}Starting game: {Colors.CYAN}{player1} (X){Colors.RESET} vs {Colors.YELLOW}{player2} (O){Colors.RESET}")
-        print(f"{Colors.GREEN}{'═' * 60}{Colors.RESET}\n")
-        
-        self.play_game()
+        self.start_friend_game(player1, player2)
+        return self.play_game()
     
-    def play_online(self):
-        """Online multiplayer placeholder"""
-        self.clear_screen()
-        print(f"""
+    def online_text(self):
+        """Online play screen"""
+        return f"""
     {Colors.CYAN}╔═══════════════════════════════════════════════════════════╗{Colors.RESET}
     {Colors.CYAN}║{Colors.BOLD}{Colors.MAGENTA}                    ONLINE PLAY                     {Colors.RESET}{Colors.CYAN}║{Colors.RESET}
     {Colors.CYAN}╠═══════════════════════════════════════════════════════════╣{Colors.RESET}
@@ -583,120 +996,220 @@ class TicTacToeTerminal:
     {Colors.CYAN}║  • Tournament mode                                        {Colors.CYAN}║{Colors.RESET}
     {Colors.CYAN}║                                                           ║{Colors.RESET}
     {Colors.CYAN}╚═══════════════════════════════════════════════════════════╝{Colors.RESET}
-        """)
-        input(f"\n{Colors.CYAN}Press Enter to return to main menu...{Colors.RESET}")
+        """
+    
+    def play_online(self):
+        """Online multiplayer placeholder"""
+        self.clear_screen()
+        self.screen.print(self.online_text())
+        self.ask(RETURN_PROMPT)
+    
+    def record_frame(self, frame_start, input_received):
+        """Record render and input latency stats, and show the debug overlay"""
+        now = time.perf_counter()
+        STATS.observe('render.frame', now - frame_start)
+        if input_received is not None:
+            STATS.observe('input.latency', now - input_received)
+        STATS.maybe_dump()
+        if STATS.overlay:
+            self.screen.print(f"\n{Colors.BLUE}" + "\n".join(STATS.overlay_lines()) + Colors.RESET)
+    
+    def draw_game_screen(self):
+        """Draw the position reference (if enabled) and the current board"""
+        self.clear_screen()
+        
+        # Show position reference if enabled
+        if self.show_positions:
+            self.screen.print(self.game.get_board_position_map())
+            self.screen.print(f"\n{Colors.CYAN}{'═' * 50}{Colors.RESET}\n")
+        
+        # Show current game board
+        self.screen.print(self.game.print_board_ascii())
+    
+    def print_turn_banner(self):
+        """Show whose turn it is"""
+        current_player_name = self.game.players[self.game.current_player]
+        player_color = Colors.CYAN if self.game.current_player == 'X' else Colors.YELLOW
+        
+        self.screen.print(f"\n{player_color}╔═══════════════════════════════════════════════════════╗{Colors.RESET}")
+        self.screen.print(f"{player_color}║ {Colors.BOLD}{current_player_name}'s turn ({self.game.current_player}) - Make your move!{Colors.RESET} {player_color}║{Colors.RESET}")
+        self.screen.print(f"{player_color}╚═══════════════════════════════════════════════════════╝{Colors.RESET}")
+        if self.game.clock is not None:
+            self.print_clocks()
+    
+    def print_clocks(self):
+        """Show both players' remaining time"""
+        clock = self.game.clock
+        self.screen.print(f"{Colors.WHITE}⏱  {Colors.CYAN}X {clock.display('X')}{Colors.RESET}   "
+                          f"{Colors.YELLOW}O {clock.display('O')}{Colors.RESET}   "
+                          f"{Colors.WHITE}({clock.control.describe()}){Colors.RESET}")
+    
+    def is_robot_turn(self):
+        """Check whether the robot should move now"""
+        return self.ai is not None and self.game.current_player == self.ai.mark
+    
+    def announce_robot_thinking(self):
+        """Show that the robot is working on its move"""
+        ai_display = self.ai.get_difficulty_display()
+        self.screen.print(f"\n{Colors.MAGENTA}{ai_display} {Colors.BLINK}is thinking...{Colors.RESET}")
+        self.screen.flush()
+    
+    def apply_robot_move(self, move):
+        """Play the robot's move and announce it"""
+        if self.game.make_move(move):
+            self.screen.print(f"\n{Colors.GREEN}🤖 Robot placed {self.ai.mark} at position {move + 1}{Colors.RESET}")
+    
+    def restart_game(self):
+        """Start a new game in the same mode"""
+        if self.ai:
+            difficulty = self.ai.difficulty
+            self.game = self.new_game(self.player_name, "🤖 Robot", {'O': difficulty})
+            self.ai = self.create_ai(difficulty)
+        else:
+            player1 = self.game.players['X']
+            player2 = self.game.players['O']
+            self.game = self.new_game(player1, player2)
+    
+    def handle_command(self, cmd):
+        """Apply a typed move or command.
+        
+        Returns 'moved' after a valid move, 'redraw' when the screen needs
+        redrawing, 'menu' or 'quit' to leave the game, or None to ask again.
+        """
+        if cmd == 'p':
+            # Toggle position display
+            self.show_positions = not self.show_positions
+            self.screen.print(f"{Colors.GREEN}Position numbers {'enabled' if self.show_positions else 'disabled'}{Colors.RESET}")
+            return 'redraw'
+        elif cmd == 'r':
+            self.restart_game()
+            return 'redraw'
+        elif cmd == 'm':
+            return 'menu'
+        elif cmd == 'q':
+            self.screen.print(f"\n{Colors.GREEN}Thanks for playing! 👋{Colors.RESET}")
+            return 'quit'
+        elif cmd == 'u':
+            return self.undo_move()
+        elif cmd == 'y':
+            return self.redo_move()
+        
+        # Try to parse as move
+        try:
+            position = int(cmd) - 1
+        except ValueError:
+            self.screen.print(f"{Colors.RED}❌ Invalid input! Please enter 1-9, 'r', 'm', 'q', 'p', 'u' or 'y'.{Colors.RESET}")
+            return None
+        if not 0 <= position <= 8:
+            self.screen.print(f"{Colors.RED}❌ Invalid input! Please enter 1-9.{Colors.RESET}")
+        elif self.game.make_move(position):
+            # Show move confirmation
+            self.screen.print(f"{Colors.GREEN}✓ Move placed at position {cmd}{Colors.RESET}")
+            return 'moved'
+        elif self.game.result_reason == 'time':
+            return 'redraw'  # The move came too late; show the result
+        else:
+            self.screen.print(f"{Colors.RED}❌ Invalid move! Position already taken.{Colors.RESET}")
+        return None
+    
+    def undo_move(self):
+        """Take back moves until it is a human's turn; returns 'redraw' or None"""
+        if self.game.undo() is None:
+            self.screen.print(f"{Colors.RED}❌ Nothing to undo.{Colors.RESET}")
+            return None
+        while self.is_robot_turn() and self.game.undo() is not None:
+            pass
+        return 'redraw'
+    
+    def redo_move(self):
+        """Replay undone moves, including the robot's replies; returns 'redraw' or None"""
+        if self.game.redo() is None:
+            self.screen.print(f"{Colors.RED}❌ Nothing to redo.{Colors.RESET}")
+            return None
+        while self.is_robot_turn() and self.game.redo() is not None:
+            pass
+        return 'redraw'
+    
+    def game_over_prompt(self):
+        """Choices after a game, offering analysis until it is shown"""
+        if self.offer_analysis and self.analyzed_game is not self.game:
+            return ANALYSIS_GAME_OVER_PROMPT
+        return GAME_OVER_PROMPT
+    
+    def handle_game_over_choice(self, choice):
+        """Act on the choice after a game; returns 'restart' to keep playing, 'menu' or 'quit'"""
+        if choice == 'r':
+            # Restart same game mode
+            self.restart_game()
+            return 'restart'
+        elif choice == 'u':
+            # Take back the last moves and play on
+            self.undo_move()
+            return 'restart'
+        elif choice == 'a' and self.offer_analysis:
+            # Show the result screen again, with the analysis
+            self.analyzed_game = self.game
+            return 'restart'
+        elif choice == 'm':
+            return 'menu'
+        self.screen.print(f"\n{Colors.GREEN}Thanks for playing! 👋{Colors.RESET}")
+        return 'quit'
     
     def play_game(self):
-        """Main game loop"""
+        """Main game loop; returns 'menu' or 'quit'"""
+        input_received = None
         while True:
-            self.clear_screen()
-            
-            # Show position reference if enabled
-            if self.show_positions:
-                print(self.game.get_board_position_map())
-                print(f"\n{Colors.CYAN}{'═' * 50}{Colors.RESET}\n")
+            frame_start = time.perf_counter()
+            self.draw_game_screen()
             
-            # Show current game board
-            print(self.game.print_board_ascii())
+            if STATS.enabled:
+                self.record_frame(frame_start, input_received)
+                input_received = None
             
             # Check if game is over
             if self.game.game_over:
                 self.display_result()
                 
-                choice = input(f"\n{Colors.YELLOW}Press '{Colors.GREEN}r{Colors.YELLOW}' to restart, '{Colors.GREEN}m{Colors.YELLOW}' for menu, or any key to quit: {Colors.RESET}").lower()
-                if choice == 'r':
-                    # Restart same game mode
-                    if self.ai:
-                        difficulty = self.ai.difficulty
-                        self.game = TicTacToeGame(self.player_name, "🤖 Robot")
-                        self.ai = RobotAI(difficulty)
-                    else:
-                        player1 = self.game.players['X']
-                        player2 = self.game.players['O']
-                        self.game = TicTacToeGame(player1, player2)
+                choice = self.ask(self.game_over_prompt()).lower()
+                action = self.handle_game_over_choice(choice)
+                if action == 'restart':
                     continue
-                elif choice == 'm':
-                    break
-                else:
-                    print(f"\n{Colors.GREEN}Thanks for playing! 👋{Colors.RESET}")
-                    sys.exit(0)
+                return action
             
             # Handle input based on game mode
-            if self.ai and self.game.current_player == 'O':
+            if self.is_robot_turn():
                 # AI's turn
-                ai_display = self.ai.get_difficulty_display()
-                print(f"\n{Colors.MAGENTA}{ai_display} {Colors.BLINK}is thinking...{Colors.RESET}")
-                
-                move = self.ai.get_move(self.game)
-                self.game.make_move(move)
-                
-                # Show AI move animation
-                print(f"\n{Colors.GREEN}🤖 Robot placed O at position {move + 1}{Colors.RESET}")
-                time.sleep(0.5)
+                self.announce_robot_thinking()
+                self.apply_robot_move(self.ai.get_move(self.game))
+                self.screen.pause(0.5)
             else:
                 # Human's turn
-                current_player_name = self.game.players[self.game.current_player]
-                player_color = Colors.CYAN if self.game.current_player == 'X' else Colors.YELLOW
-                
-                print(f"\n{player_color}╔═══════════════════════════════════════════════════════╗{Colors.RESET}")
-                print(f"{player_color}║ {Colors.BOLD}{current_player_name}'s turn ({self.game.current_player}) - Make your move!{Colors.RESET} {player_color}║{Colors.RESET}")
-                print(f"{player_color}╚═══════════════════════════════════════════════════════╝{Colors.RESET}")
+                self.print_turn_banner()
                 
                 while True:
-                    cmd = input(f"\n{Colors.YELLOW}Enter position (1-9) or command (r/m/q/p): {Colors.RESET}").lower().strip()
+                    cmd = self.ask(MOVE_PROMPT).lower().strip()
+                    input_received = time.perf_counter()
                     
-                    if cmd == 'p':
-                        # Toggle position display
-                        self.show_positions = not self.show_positions
-                        print(f"{Colors.GREEN}Position numbers {'enabled' if self.show_positions else 'disabled'}{Colors.RESET}")
+                    action = self.handle_command(cmd)
+                    if action in ('menu', 'quit'):
+                        return action  # Leave to the main menu or exit
+                    elif action == 'moved':
+                        paused = time.perf_counter()
+                        self.screen.pause(0.3)
+                        input_received += time.perf_counter() - paused  # The cosmetic pause is not latency
+                    if action:
                         break  # Redraw screen
-                    
-                    elif cmd == 'r':
-                        # Restart game
-                        if self.ai:
-                            difficulty = self.ai.difficulty
-                            self.game = TicTacToeGame(self.player_name, "🤖 Robot")
-                            self.ai = RobotAI(difficulty)
-                        else:
-                            player1 = self.game.players['X']
-                            player2 = self.game.players['O']
-                            self.game = TicTacToeGame(player1, player2)
-                        break
-                    
-                    elif cmd == 'm':
-                        return  # Return to main menu
-                    
-                    elif cmd == 'q':
-                        print(f"\n{Colors.GREEN}Thanks for playing! 👋{Colors.RESET}")
-                        sys.exit(0)
-                    
-                    else:
-                        # Try to parse as move
-                        try:
-                            position = int(cmd) - 1
-                            if 0 <= position <= 8:
-                                if self.game.make_move(position):
-                                    # Show move confirmation
-                                    print(f"{Colors.GREEN}✓ Move placed at position {cmd}{Colors.RESET}")
-                                    time.sleep(0.3)
-                                    break
-                                else:
-                                    print(f"{Colors.RED}❌ Invalid move! Position already taken.{Colors.RESET}")
-                            else:
-                                print(f"{Colors.RED}❌ Invalid input! Please enter 1-9.{Colors.RESET}")
-                        except ValueError:
-                            print(f"{Colors.RED}❌ Invalid input! Please enter 1-9, 'r', 'm', 'q', or 'p'.{Colors.RESET}")
     
     def display_result(self):
         """Display game result with ASCII art and colors"""
         self.clear_screen()
         
         # Show final board
-        print(self.game.print_board_ascii())
-        print(f"\n{Colors.CYAN}{'═' * 60}{Colors.RESET}")
+        self.screen.print(self.game.print_board_ascii())
+        self.screen.print(f"\n{Colors.CYAN}{'═' * 60}{Colors.RESET}")
         
         if self.game.winner == 'Tie':
-            print(f"""
+            self.screen.print(f"""
     {Colors.YELLOW}╔═══════════════════════════════════════════════════════════╗{Colors.RESET}
     {Colors.YELLOW}║{Colors.BOLD}                   GAME OVER!                    {Colors.RESET}{Colors.YELLOW}║{Colors.RESET}
     {Colors.YELLOW}╠═══════════════════════════════════════════════════════════╣{Colors.RESET}
@@ -712,7 +1225,7 @@ class TicTacToeTerminal:
             winner_color = Colors.CYAN if self.game.winner == 'X' else Colors.YELLOW
             
             if self.ai and winner_name == "🤖 Robot":
-                print(f"""
+                self.screen.print(f"""
     {Colors.RED}╔═══════════════════════════════════════════════════════════╗{Colors.RESET}
     {Colors.RED}║{Colors.BOLD}                   GAME OVER!                    {Colors.RESET}{Colors.RED}║{Colors.RESET}
     {Colors.RED}╠═══════════════════════════════════════════════════════════╣{Colors.RESET}
@@ -723,7 +1236,7 @@ class TicTacToeTerminal:
     {Colors.RED}╚═══════════════════════════════════════════════════════════╝{Colors.RESET}
                 """)
             else:
-                print(f"""
+                self.screen.print(f"""
     {winner_color}╔═══════════════════════════════════════════════════════════╗{Colors.RESET}
     {winner_color}║{Colors.BOLD}                   GAME OVER!                    {Colors.RESET}{winner_color}║{Colors.RESET}
     {winner_color}╠═══════════════════════════════════════════════════════════╣{Colors.RESET}
@@ -735,44 +1248,91 @@ class TicTacToeTerminal:
     {winner_color}╚═══════════════════════════════════════════════════════════╝{Colors.RESET}
                 """)
         
-        # Show moves history
-        print(f"\n{Colors.CYAN}{Colors.BOLD}📝 Moves History:{Colors.RESET}")
-        print(f"{Colors.WHITE}  {'─' * 50}{Colors.RESET}")
+        if self.game.result_reason == 'time':
+            loser = 'O' if self.game.winner == 'X' else 'X'
+            self.screen.print(f"\n{Colors.RED}⏰ {self.game.players[loser]} ran out of time!{Colors.RESET}")
+        
+        # Show moves history, with moves that fell short of perfect play flagged on request
+        analysis = self.analyze_game() if self.analyzed_game is self.game else None
+        notes = analysis.moves if analysis else []
+        self.screen.print(f"\n{Colors.CYAN}{Colors.BOLD}📝 Moves History:{Colors.RESET}")
+        self.screen.print(f"{Colors.WHITE}  {'─' * 50}{Colors.RESET}")
         
         for i, move in enumerate(self.game.moves_history, 1):
             player_name = self.game.players[move['player']]
             player_color = Colors.CYAN if move['player'] == 'X' else Colors.YELLOW
             
-            print(f"  {Colors.WHITE}{i:2}.{Colors.RESET} {player_color}{player_name:15}{Colors.RESET} placed "
+            self.screen.print(f"  {Colors.WHITE}{i:2}.{Colors.RESET} {player_color}{player_name:15}{Colors.RESET} placed "
                   f"{player_color}{move['player']}{Colors.RESET} at position "
                   f"{Colors.GREEN}{move['position'] + 1}{Colors.RESET} "
-                  f"({Colors.MAGENTA}{move['time']}{Colors.RESET})")
+                  f"({Colors.MAGENTA}{move['time']}{Colors.RESET})"
+                  + (f" {Colors.WHITE}{move['elapsed']:.1f}s{Colors.RESET}" if 'elapsed' in move else ""))
+            if i <= len(notes) and notes[i - 1].verdict != 'best':
+                note = notes[i - 1]
+                color = VERDICT_COLORS.get(note.verdict, Colors.WHITE)
+                self.screen.print(f"      {color}⚠ {note.verdict}{Colors.RESET}: {self.explain_note(note)}")
         
-        print(f"{Colors.WHITE}  {'─' * 50}{Colors.RESET}")
+        self.screen.print(f"{Colors.WHITE}  {'─' * 50}{Colors.RESET}")
+        if analysis and notes:
+            flagged = len(analysis.flagged())
+            summary = "every move was perfect!" if not flagged else f"{flagged} move(s) fell short of perfect play"
+            self.screen.print(f"  {Colors.CYAN}🔍 Analysis: {summary}{Colors.RESET}")
+    
+    def analyze_game(self):
+        """Grade the game's moves against perfect play; None without a usable endgame database"""
+        try:
+            from game_analysis import shared_analyzer
+            return shared_analyzer().analyze_game(self.game)
+        except (OSError, ValueError) as e:
+            self.screen.print(f"{Colors.RED}❌ Analysis unavailable: {e}{Colors.RESET}")
+            return None
+    
+    def explain_note(self, note):
+        from game_analysis import explain
+        return explain(note)
 
 def main():
     """Main entry point"""
+    args = configure_ratings(configure_events(configure_stats(sys.argv[1:])))
+    time_control = None
+    for arg in args:
+        if arg.startswith('--time-control='):
+            # e.g. --time-control=180+2 or --time-control=move=10
+            from time_control import TimeControl
+            try:
+                time_control = TimeControl.parse(arg.split('=', 1)[1])
+            except ValueError as e:
+                print(f"usage: \"Tictac toe.py\" [--async] [--time-control=SPEC]\nerror: {e}", file=sys.stderr)
+                sys.exit(2)
+    
     # Clear screen and start
-    os.system('cls' if os.name == 'nt' else 'clear')
+    screen = TTYScreen()
+    screen.clear()
     
     # Check for color support
     try:
-        # Initialize game
-        game = TicTacToeTerminal()
-        
         # Print welcome message
-        print(f"\n{Colors.GREEN}{Colors.BOLD}Welcome to Tic Tac Toe Terminal!{Colors.RESET}")
-        print(f"{Colors.CYAN}Loading game...{Colors.RESET}")
-        time.sleep(1)
+        screen.print(f"\n{Colors.GREEN}{Colors.BOLD}Welcome to Tic Tac Toe Terminal!{Colors.RESET}")
+        screen.flush()
+        
+        if '--async' in args:
+            # asyncio is only imported when the async interface is requested
+            sys.modules.setdefault('tictactoe', sys.modules[__name__])
+            from async_terminal import run
+            run(time_control)
+            return
         
-        # Start main menu
+        # Initialize game and start main menu
+        game = TicTacToeTerminal(screen)
+        game.time_control = time_control
         game.main_menu()
         
     except KeyboardInterrupt:
-        print(f"\n\n{Colors.YELLOW}Game interrupted. Thanks for playing!{Colors.RESET}")
+        screen.print(f"\n\n{Colors.YELLOW}Game interrupted. Thanks for playing!{Colors.RESET}")
     except Exception as e:
-        print(f"\n{Colors.RED}An error occurred: {e}{Colors.RESET}")
-        print(f"{Colors.YELLOW}Please ensure your terminal supports ANSI colors.{Colors.RESET}")
+        screen.print(f"\n{Colors.RED}An error occurred: {e}{Colors.RESET}")
+        screen.print(f"{Colors.YELLOW}Please ensure your terminal supports ANSI colors.{Colors.RESET}")
+    screen.flush()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,184 @@
+"""Admission control and input rate limits for the game host.
+
+Protects ``game_host.py`` (and every ``game_cluster.py`` worker) from
+clients that flood it, so one abusive or buggy client cannot slow down
+everyone else's games:
+
+- New connections are turned away at once, before a session is set up,
+  when the host is full, when one IP address already holds too many
+  connections, or while the event loop is lagging (load shedding).
+- Typed lines and key presses pass through token buckets, one per
+  connection and one per IP address. Input over the limit is dropped, a
+  line longer than ``max_line_bytes`` ends the connection, and so does a
+  long run of dropped input.
+
+Every check is O(1). Decisions are counted in ``AdmissionControl.counters``
+and, with ``--stats``, in ``STATS`` under ``host.*`` along with the event
+loop lag histogram. Limits apply per process.
+"""
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from instrumentation import STATS
+
+REJECT_MESSAGES = {
+    'full': "Server is full, please try again later.",
+    'ip': "Too many connections from your address.",
+    'lag': "Server is busy, please try again in a moment.",
+}
+
+
+# ============== LIMITS ==============
+@dataclass(frozen=True)
+class Limits:
+    """Rates are per second; a bucket starts full and holds ``burst`` tokens"""
+    line_rate: float = 5.0          # Typed lines (menu choices, moves, commands)
+    line_burst: float = 20.0
+    key_rate: float = 30.0          # Key presses in key mode (Tetris)
+    key_burst: float = 60.0
+    ip_share: float = 4.0           # Per-IP buckets are this many connections' worth
+    max_per_ip: int = 32            # Concurrent connections per IP address
+    max_line_bytes: int = 4096
+    flood_drops: int = 500          # Inputs dropped in a row before disconnecting
+    max_lag: float = 0.25           # Event loop lag (seconds) that starts shedding
+
+
+class TokenBucket:
+    """Refills continuously at ``rate`` up to ``burst``; refilled lazily on use"""
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float, cost: float = 1.0) -> bool:
+        """Spend ``cost`` tokens if there are enough"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < cost:
+            return False
+        self.tokens -= cost
+        return True
+
+    def full_at(self) -> float:
+        """When the bucket will be full again"""
+        return self.updated + (self.burst - self.tokens) / self.rate
+
+
+class AddressState:
+    """Connections and shared buckets of one IP address"""
+    __slots__ = ('connections', 'lines', 'keys')
+
+    def __init__(self, limits: Limits, now: float):
+        self.connections = 0
+        self.lines = TokenBucket(limits.line_rate * limits.ip_share, limits.line_burst * limits.ip_share, now)
+        self.keys = TokenBucket(limits.key_rate * limits.ip_share, limits.key_burst * limits.ip_share, now)
+
+
+# ============== ADMISSION ==============
+class AdmissionControl:
+    """Session admission, load shedding and the per-address registry of one host"""
+
+    def __init__(self, limits: Optional[Limits] = None, max_sessions: int = 500,
+                 clock: Callable[[], float] = time.monotonic):
+        self.limits = limits or Limits()
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self.sessions = 0
+        self.addresses: Dict[str, AddressState] = {}
+        self.lag = 0.0           # Smoothed event loop lag in seconds
+        self.shedding = False
+        self.counters: Dict[str, int] = {}
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+        if STATS.enabled:
+            STATS.incr('host.' + name, amount)
+
+    def admit(self, address: str) -> Optional[str]:
+        """Take a session slot for ``address``; returns why not (a ``REJECT_MESSAGES`` key) instead"""
+        if self.shedding:
+            reason = 'lag'
+        elif self.sessions >= self.max_sessions:
+            reason = 'full'
+        else:
+            state = self.addresses.get(address)
+            if state is None:
+                state = self.addresses[address] = AddressState(self.limits, self.clock())
+            if state.connections >= self.limits.max_per_ip:
+                reason = 'ip'
+            else:
+                state.connections += 1
+                self.sessions += 1
+                self.count('admitted')
+                return None
+        self.count('rejected.' + reason)
+        return reason
+
+    def release(self, address: str):
+        """Give back the slot of a session that ended"""
+        self.sessions -= 1
+        self.addresses[address].connections -= 1
+
+    def limiter(self, address: str) -> 'ClientLimiter':
+        return ClientLimiter(self, self.addresses[address])
+
+    def record_lag(self, lag: float):
+        """Feed one event loop lag sample; shedding starts above ``max_lag`` and stops below half of it"""
+        self.lag = self.lag * 0.7 + lag * 0.3
+        if STATS.enabled:
+            STATS.observe('host.loop_lag', lag)
+        if not self.shedding and self.lag > self.limits.max_lag:
+            self.shedding = True
+            self.count('shedding.started')
+        elif self.shedding and self.lag < self.limits.max_lag / 2:
+            self.shedding = False
+
+    def sweep(self):
+        """Forget addresses with no connections whose buckets have refilled"""
+        now = self.clock()
+        idle = [address for address, state in self.addresses.items()
+                if not state.connections and state.lines.full_at() <= now and state.keys.full_at() <= now]
+        for address in idle:
+            del self.addresses[address]
+
+    def stats(self) -> dict:
+        return {'sessions': self.sessions, 'addresses': len(self.addresses), 'lag': self.lag,
+                'shedding': self.shedding, **self.counters}
+
+
+class ClientLimiter:
+    """Input limits of one connection, chained to its address's"""
+
+    def __init__(self, control: AdmissionControl, address: AddressState):
+        limits = control.limits
+        now = control.clock()
+        self.control = control
+        self.address = address
+        self.lines = TokenBucket(limits.line_rate, limits.line_burst, now)
+        self.keys = TokenBucket(limits.key_rate, limits.key_burst, now)
+        self.dropped_in_row = 0
+
+    def allow_line(self) -> bool:
+        now = self.control.clock()
+        return self._check(self.lines.take(now) and self.address.lines.take(now), 'lines')
+
+    def allow_key(self) -> bool:
+        now = self.control.clock()
+        return self._check(self.keys.take(now) and self.address.keys.take(now), 'keys')
+
+    def _check(self, allowed: bool, kind: str) -> bool:
+        if allowed:
+            self.dropped_in_row = 0
+        else:
+            self.dropped_in_row += 1
+            self.control.count('throttled.' + kind)
+        return allowed
+
+    @property
+    def flooding(self) -> bool:
+        """True once so much input was dropped in a row that the client should go"""
+        return self.dropped_in_row >= self.control.limits.flood_drops
@@ -0,0 +1,311 @@
+"""Asyncio-driven interface for Tic Tac Toe.
+
+Started with ``python "Tictac toe.py" --async``. Keeping it in its own
+module means the plain terminal game never pays for importing asyncio.
+
+Typed lines, remote opponent moves, chat messages and clock flags all
+flow through a single inbox queue, so hosts can drive a game without
+blocking on stdin:
+
+    terminal = AsyncTicTacToeTerminal()
+    terminal.submit_remote_move(4)
+    terminal.post_message("GG!")
+"""
+import asyncio
+import sys
+import time
+
+from game_modules import load_tictactoe
+from instrumentation import STATS
+
+ttt = load_tictactoe()
+Colors = ttt.Colors
+DIFFICULTY_CHOICES = ttt.DIFFICULTY_CHOICES
+NAME_PROMPT = ttt.NAME_PROMPT
+PLAYER1_PROMPT = ttt.PLAYER1_PROMPT
+PLAYER2_PROMPT = ttt.PLAYER2_PROMPT
+MOVE_PROMPT = ttt.MOVE_PROMPT
+RETURN_PROMPT = ttt.RETURN_PROMPT
+SETTINGS_PROMPT = ttt.SETTINGS_PROMPT
+NEW_NAME_PROMPT = ttt.NEW_NAME_PROMPT
+DIFFICULTY_PROMPT = ttt.DIFFICULTY_PROMPT
+
+
+class AsyncTicTacToeTerminal(ttt.TicTacToeTerminal):
+    """Terminal interface driven by an asyncio event loop.
+
+    Typed lines, remote opponent moves and chat messages all arrive through
+    one inbox queue, so the loop keeps handling network messages and timers
+    while a prompt is open. Robot moves are computed in an executor.
+    """
+
+    def __init__(self, screen=None):
+        super().__init__(screen)
+        self.inbox = None            # created on the running loop
+        self.remote_player = None    # mark played by a remote opponent, if any
+        self.pending_remote_moves = []
+        self._wheel_task = None
+
+    # ---------- clocks ----------
+    def start_clock(self, game):
+        """Start the game's clock, with flags arriving as inbox events"""
+        if self.time_control is not None and self.timer_wheel is None:
+            from time_control import TimerWheel
+            self.timer_wheel = TimerWheel()
+            self._wheel_task = asyncio.get_running_loop().create_task(self._run_wheel())
+        super().start_clock(game)
+        if game.clock is not None:
+            inbox = self._get_inbox()
+            game.clock.on_flag.append(lambda player: inbox.put_nowait(('flag', player)))
+
+    async def _run_wheel(self):
+        """Advance this terminal's timer wheel once per tick"""
+        wheel = self.timer_wheel
+        while True:
+            await asyncio.sleep(wheel.tick)
+            wheel.advance()
+
+    # ---------- inbox ----------
+    def _get_inbox(self):
+        """Create the inbox and start reading stdin on first use"""
+        if self.inbox is None:
+            self.inbox = asyncio.Queue()
+            self.start_input()
+        return self.inbox
+
+    def start_input(self):
+        """Feed stdin lines into the inbox without blocking the loop"""
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_reader(sys.stdin.fileno(), self._on_stdin_ready)
+        except (NotImplementedError, ValueError, OSError, AttributeError):
+            # Windows event loops cannot watch stdin, so read it on a thread
+            import threading
+            threading.Thread(target=self._read_stdin_blocking, args=(loop,), daemon=True).start()
+
+    def _on_stdin_ready(self):
+        """Event loop callback when stdin has a line"""
+        line = sys.stdin.readline()
+        if not line:
+            asyncio.get_running_loop().remove_reader(sys.stdin.fileno())
+            self.inbox.put_nowait(('eof', None))
+        else:
+            self.inbox.put_nowait(('line', line.rstrip('\n')))
+
+    def _read_stdin_blocking(self, loop):
+        """Thread fallback for reading stdin"""
+        for line in iter(sys.stdin.readline, ''):
+            loop.call_soon_threadsafe(self.inbox.put_nowait, ('line', line.rstrip('\n')))
+        loop.call_soon_threadsafe(self.inbox.put_nowait, ('eof', None))
+
+    def submit_remote_move(self, position):
+        """Queue a move (0-8) from the remote opponent"""
+        self._get_inbox().put_nowait(('move', position))
+
+    def post_message(self, text):
+        """Queue a chat or system message for display"""
+        self._get_inbox().put_nowait(('message', text))
+
+    async def next_event(self):
+        """Wait for the next inbox event, showing messages as they arrive"""
+        while True:
+            kind, value = await self._get_inbox().get()
+            if kind == 'message':
+                self.screen.print(f"\n{Colors.MAGENTA}💬 {value}{Colors.RESET}")
+            elif kind == 'move':
+                self.pending_remote_moves.append(value)
+            elif kind == 'eof':
+                raise EOFError
+            return kind, value
+
+    async def pause(self, seconds):
+        """Show pending output and wait without blocking the loop"""
+        self.screen.flush()
+        if self.screen.interactive:
+            await asyncio.sleep(seconds)
+
+    async def read_line(self, prompt=''):
+        """Async replacement for ``input()``"""
+        self.screen.write(prompt)
+        self.screen.flush()
+        while True:
+            kind, value = await self.next_event()
+            if kind == 'line':
+                return value
+            if kind == 'message':
+                self.screen.write(prompt)
+                self.screen.flush()
+
+    # ---------- menus ----------
+    async def main_menu(self):
+        """Display main menu"""
+        while True:
+            self.clear_screen()
+            self.print_header()
+
+            try:
+                choice = (await self.read_line(self.main_menu_text())).strip()
+
+                result = None
+                if choice == '1':
+                    result = await self.play_vs_robot()
+                elif choice == '2':
+                    result = await self.play_vs_friend()
+                elif choice == '3':
+                    await self.show_and_wait(self.online_text())
+                elif choice == '4':
+                    await self.game_settings()
+                elif choice == '5':
+                    await self.show_and_wait(self.how_to_play_text())
+                elif choice == '6':
+                    await self.show_and_wait(self.leaderboard_text())
+                elif choice == '7':
+                    self.screen.print(f"\n{Colors.GREEN}Thanks for playing! Goodbye! 👋{Colors.RESET}\n")
+                    break
+                else:
+                    self.screen.print(f"{Colors.RED}Invalid choice. Please try again.{Colors.RESET}")
+                    await self.pause(1)
+            except EOFError:
+                break  # Input closed
+
+            if result == 'quit':
+                break
+        self.screen.flush()
+
+    async def show_and_wait(self, screen):
+        """Show an information screen until Enter is pressed"""
+        self.clear_screen()
+        self.screen.print(screen)
+        await self.read_line(RETURN_PROMPT)
+
+    async def game_settings(self):
+        """Game settings menu"""
+        self.clear_screen()
+        self.screen.print(self.settings_text())
+
+        choice = (await self.read_line(SETTINGS_PROMPT)).strip()
+        if choice == '1':
+            self.toggle_positions_setting()
+            await self.pause(1)
+        elif choice == '2':
+            if self.rename_player((await self.read_line(NEW_NAME_PROMPT)).strip()):
+                await self.pause(1)
+
+    async def choose_difficulty(self):
+        """Let player choose AI difficulty with colors"""
+        self.clear_screen()
+        self.screen.print(self.difficulty_text())
+
+        while True:
+            choice = (await self.read_line(DIFFICULTY_PROMPT)).strip()
+            if choice in DIFFICULTY_CHOICES:
+                return DIFFICULTY_CHOICES[choice]
+            self.screen.print(f"{Colors.RED}Invalid choice. Please enter 1-6.{Colors.RESET}")
+
+    async def play_vs_robot(self):
+        """Play against AI robot"""
+        self.print_mode_banner("🤖 PLAY VS ROBOT 🤖")
+        self.player_name = (await self.read_line(NAME_PROMPT)).strip() or "Player"
+        self.start_robot_game(await self.choose_difficulty())
+        return await self.play_game()
+
+    async def play_vs_friend(self):
+        """Local multiplayer"""
+        self.print_mode_banner("👥 PLAY VS FRIEND 👥")
+        player1 = (await self.read_line(PLAYER1_PROMPT)).strip() or "Player 1"
+        player2 = (await self.read_line(PLAYER2_PROMPT)).strip() or "Player 2"
+        self.start_friend_game(player1, player2)
+        return await self.play_game()
+
+    async def play_vs_remote(self, local_name, remote_name, remote_player='O'):
+        """Play against an opponent whose moves arrive via ``submit_remote_move``"""
+        self.remote_player = remote_player
+        self.pending_remote_moves = []
+        names = (remote_name, local_name) if remote_player == 'X' else (local_name, remote_name)
+        self.start_friend_game(*names)
+        try:
+            return await self.play_game()
+        finally:
+            self.remote_player = None
+
+    # ---------- game loop ----------
+    async def play_game(self):
+        """Main game loop; returns 'menu' or 'quit'"""
+        loop = asyncio.get_running_loop()
+        input_received = None
+        while True:
+            frame_start = time.perf_counter()
+            self.draw_game_screen()
+
+            if STATS.enabled:
+                self.record_frame(frame_start, input_received)
+                input_received = None
+
+            if self.game.game_over:
+                self.display_result()
+                choice = (await self.read_line(self.game_over_prompt())).lower()
+                action = self.handle_game_over_choice(choice)
+                if action == 'restart':
+                    self.pending_remote_moves = []
+                    continue
+                return action
+
+            if self.is_robot_turn():
+                self.announce_robot_thinking()
+                move = await loop.run_in_executor(None, self.ai.get_move, self.game)
+                self.apply_robot_move(move)
+                await self.pause(0.5)
+                continue
+
+            remote_turn = self.game.current_player == self.remote_player
+            if remote_turn:
+                self.screen.print(f"\n{Colors.MAGENTA}Waiting for {self.game.players[self.remote_player]} to move...{Colors.RESET}")
+                if self.game.clock is not None:
+                    self.print_clocks()
+            else:
+                self.print_turn_banner()
+
+            action = None
+            while not action:
+                if remote_turn and self.pending_remote_moves:
+                    position = self.pending_remote_moves.pop(0)
+                    if self.game.make_move(position):
+                        action = 'moved'
+                    continue
+
+                self.screen.write(MOVE_PROMPT)
+                self.screen.flush()
+                kind, value = await self.next_event()
+                if self.game.game_over:
+                    action = 'redraw'  # Flag fell while waiting
+                    break
+                if kind != 'line':
+                    continue
+                cmd = value.lower().strip()
+                input_received = time.perf_counter()
+                if remote_turn and cmd.isdigit():
+                    self.screen.print(f"{Colors.RED}❌ It's your opponent's turn.{Colors.RESET}")
+                    continue
+                action = self.handle_command(cmd)
+
+            if action in ('menu', 'quit'):
+                return action
+            if action == 'moved':
+                paused = time.perf_counter()
+                await self.pause(0.3)
+                if input_received is not None:
+                    input_received += time.perf_counter() - paused  # The cosmetic pause is not latency
+
+
+def run(time_control=None):
+    """Run the async main menu until the player quits"""
+    terminal = AsyncTicTacToeTerminal()
+    terminal.time_control = time_control
+    try:
+        asyncio.run(terminal.main_menu())
+    except KeyboardInterrupt:
+        print(f"\n\n{Colors.YELLOW}Game interrupted. Goodbye! 👋{Colors.RESET}\n")
+
+
+if __name__ == '__main__':
+    run()
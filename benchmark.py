@@ -0,0 +1,393 @@
+"""Benchmark suite for Tic Tac Toe and Tetris.
+
+Measures AI move latency, game stepping throughput and render cost with
+percentiles and peak memory, and saves the results as JSON so runs can be
+compared:
+
+    python benchmark.py --output before.json
+    python benchmark.py --compare before.json --threshold 0.10
+
+With ``--compare`` the exit status is 1 when any case's median slowed down
+by more than the threshold.
+"""
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from game_modules import GAME_DIR, load_tetris, load_tictactoe
+from terminal_io import BufferKeyboard, NullScreen
+
+# ============== HARNESS ==============
+@dataclass
+class BenchmarkCase:
+    """A single timed operation; ``setup`` runs untimed before every sample"""
+    name: str
+    run: Callable[[Any], Any]
+    setup: Callable[[], Any] = lambda: None
+    ops: int = 1  # operations performed by one call of ``run``
+    samples: Optional[int] = None
+    groups: List[str] = field(default_factory=list)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_case(case: BenchmarkCase, samples: int, warmup: int) -> dict:
+    """Time a case and measure its peak memory"""
+    samples = case.samples or samples
+    for _ in range(warmup):
+        case.run(case.setup())
+
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(samples):
+            state = case.setup()
+            start = time.perf_counter()
+            case.run(state)
+            timings.append(time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    # Memory is measured on a separate call because tracing slows everything down
+    state = case.setup()
+    tracemalloc.start()
+    case.run(state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    mean = sum(timings) / len(timings)
+    return {
+        'samples': len(timings),
+        'ops_per_sample': case.ops,
+        'mean_s': mean,
+        'min_s': timings[0],
+        'p50_s': percentile(timings, 50),
+        'p90_s': percentile(timings, 90),
+        'p99_s': percentile(timings, 99),
+        'max_s': timings[-1],
+        'ops_per_s': case.ops / mean if mean else float('inf'),
+        'peak_memory_bytes': peak,
+    }
+
+
+# ============== TIC TAC TOE CASES ==============
+# Representative positions as (board, side to move)
+TICTACTOE_POSITIONS = {
+    'opening': ('         ', 'O'),
+    'reply': ('    X    ', 'O'),
+    'midgame': ('X O  X   ', 'O'),
+    'endgame': ('XOX OX  O', 'X'),
+}
+
+
+def tictactoe_cases() -> List[BenchmarkCase]:
+    """AI latency, game stepping and rating cases"""
+    ttt = load_tictactoe()
+    cases = []
+
+    def position_game(board: str, player: str):
+        game = ttt.TicTacToeGame()
+        game.board = list(board)
+        game.current_player = player
+        return game
+
+    for difficulty in ('easy', 'medium', 'hard', 'impossible', 'oracle'):
+        for label, (board, player) in TICTACTOE_POSITIONS.items():
+            ai = ttt.RobotAI(difficulty, mark=player, think_delay=False)
+
+            def cold_setup(board=board, player=player):
+                # Clear the shared minimax cache so the full search is measured
+                ttt.RobotAI._minimax_cache.clear()
+                random.seed(0)
+                return position_game(board, player)
+
+            cases.append(BenchmarkCase(f"ttt.get_move.{difficulty}.{label}",
+                                       lambda game, ai=ai: ai.get_move(game),
+                                       cold_setup, groups=['ttt', 'ai']))
+
+    for label, (board, player) in TICTACTOE_POSITIONS.items():
+        ai = ttt.RobotAI('mcts', mark=player, think_delay=False,
+                         mcts_options={'time_budget': None, 'iterations': 500, 'seed': 0})
+        cases.append(BenchmarkCase(f"ttt.get_move.mcts500.{label}",
+                                   lambda game, ai=ai: ai.get_move(game),
+                                   lambda board=board, player=player: position_game(board, player),
+                                   samples=10, groups=['ttt', 'ai']))
+
+    # Pre-generated random games so only the game logic is timed
+    rng = random.Random(42)
+    games = []
+    for _ in range(200):
+        moves = list(range(9))
+        rng.shuffle(moves)
+        games.append(moves)
+
+    def play_games(_):
+        for moves in games:
+            game = ttt.TicTacToeGame()
+            for move in moves:
+                if not game.make_move(move):
+                    break
+
+    total_moves = 0
+    for moves in games:
+        game = ttt.TicTacToeGame()
+        for move in moves:
+            if not game.make_move(move):
+                break
+            total_moves += 1
+    cases.append(BenchmarkCase("ttt.make_move", play_games, ops=total_moves, groups=['ttt', 'step']))
+
+    status_game = position_game('XOX OX  O', 'X')
+
+    def check_status(game):
+        for _ in range(1000):
+            game.game_over = False
+            game.check_game_status()
+
+    cases.append(BenchmarkCase("ttt.check_game_status", check_status,
+                               lambda: status_game, ops=1000, groups=['ttt', 'step']))
+
+    # A whole scripted session through the menus, with no terminal attached
+    session_script = ['2', 'Ann', 'Bob', '1', '4', '2', '5', '3', 'r', '5', '1', '9', 'm', '7']
+    cases.append(BenchmarkCase(
+        "ttt.session.friend",
+        lambda keyboard: ttt.TicTacToeTerminal(NullScreen(), keyboard).main_menu(),
+        lambda: BufferKeyboard(session_script), groups=['ttt', 'session']))
+    return cases
+
+
+# ============== RATINGS CASES ==============
+def ratings_cases() -> List[BenchmarkCase]:
+    """Glicko-2: one live update, and a batch recompute of 100k games over a year"""
+    import ratings
+    store = ratings.RatingStore()
+    rng = random.Random(7)
+    pairs = [(f"p{rng.randrange(1000)}", f"p{rng.randrange(1000)}", rng.choice((0.0, 0.5, 1.0)))
+             for _ in range(1000)]
+    cases = [BenchmarkCase("ttt.ratings.update", lambda _: [store.record(*pair) for pair in pairs],
+                           ops=len(pairs), groups=['ttt', 'ratings'])]
+    if importlib.util.find_spec('numpy') is None:
+        return cases  # The batch mode needs NumPy
+
+    season = []
+
+    def build_season():
+        # Built by the first sample's setup, so listing or skipping the case costs nothing
+        if not season:
+            rng = random.Random(8)
+            season.extend([sorted(rng.uniform(0, 365 * ratings.PERIOD) for _ in range(100000)),
+                           [f"p{rng.randrange(5000)}" for _ in range(100000)],
+                           [f"q{rng.randrange(5000)}" for _ in range(100000)],
+                           [rng.choice((0.0, 0.5, 1.0)) for _ in range(100000)]])
+        return season
+
+    cases.append(BenchmarkCase("ttt.ratings.recompute", lambda games: ratings.rate_results(*games),
+                               build_season, ops=100000, samples=5, groups=['ttt', 'ratings']))
+    return cases
+
+
+# ============== TETRIS CASES ==============
+def tetris_cases() -> List[BenchmarkCase]:
+    """Board stepping and rendering cases"""
+    tetris = load_tetris()
+    width = tetris.GAME_CONFIG['BOARD_WIDTH']
+    height = tetris.GAME_CONFIG['BOARD_HEIGHT']
+    cases = []
+
+    def fresh_board():
+        random.seed(7)
+        return tetris.GameBoard(width, height)
+
+    def shuffle_piece(board):
+        for step in range(200):
+            board.move_piece(1 if step % 4 < 2 else -1, 0)
+
+    cases.append(BenchmarkCase("tetris.move_piece", shuffle_piece, fresh_board, ops=200,
+                               groups=['tetris', 'step']))
+
+    def drop_many(board):
+        for _ in range(20):
+            if board.game_over:
+                break
+            board.drop_piece()
+
+    cases.append(BenchmarkCase("tetris.drop_piece", drop_many, fresh_board, ops=20,
+                               groups=['tetris', 'step']))
+
+    def board_with_full_rows():
+        board = fresh_board()
+        for y in range(height - 4, height):
+            board.grid[y] = [tetris.Colors.CYAN] * width
+        return board
+
+    cases.append(BenchmarkCase("tetris._clear_lines", lambda board: board._clear_lines(),
+                               board_with_full_rows, groups=['tetris', 'step']))
+
+    def midgame_state():
+        board = fresh_board()
+        for _ in range(8):
+            board.drop_piece()
+        return board.get_game_state()
+
+    renderer = tetris.GameRenderer(NullScreen())
+    cases.append(BenchmarkCase("tetris.draw_board", renderer.draw_board, midgame_state,
+                               groups=['tetris', 'render']))
+    cases.append(BenchmarkCase("tetris.render", renderer.render, midgame_state,
+                               groups=['tetris', 'render']))
+
+    def dashboard_frame():
+        from tetris_dashboard import BotFleet, DashboardRenderer
+        fleet = BotFleet(32, seed=7)
+        for _ in range(200):
+            fleet.tick()
+        return DashboardRenderer(NullScreen(), width=160), fleet.tiles()
+
+    cases.append(BenchmarkCase("tetris.dashboard", lambda state: state[0].render(state[1], force=True),
+                               dashboard_frame, groups=['tetris', 'render']))
+
+    def scripted_game():
+        random.seed(7)
+        keys = BufferKeyboard(list('aaw ddw sw ' * 10) + ['q', 'q'])
+        return tetris.TetrisGame(NullScreen(), keys)
+
+    cases.append(BenchmarkCase("tetris.session", lambda game: game.run(), scripted_game,
+                               samples=10, groups=['tetris', 'session']))
+    return cases
+
+
+# ============== STARTUP CASES ==============
+# Text that shows the first screen has been drawn
+STARTUP_MARKERS = {
+    'Tictac toe.py': 'MAIN MENU',
+    'Tetris.py': 'Programmed by Jeff',
+}
+
+
+def launch_until(script: str, marker: str):
+    """Start a game in a fresh interpreter and wait for its first screen"""
+    env = dict(os.environ, PYTHONUNBUFFERED='1')
+    proc = subprocess.Popen([sys.executable, os.path.join(GAME_DIR, script)],
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, cwd=GAME_DIR, env=env)
+    try:
+        seen = b''
+        needle = marker.encode()
+        while needle not in seen:
+            chunk = proc.stdout.read1(4096)
+            if not chunk:
+                raise RuntimeError(f"{script} exited before drawing '{marker}'")
+            seen = seen[-len(needle):] + chunk
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def startup_cases() -> List[BenchmarkCase]:
+    """Cold launch to first rendered menu, in a new process per sample"""
+    return [BenchmarkCase(f"startup.{script.split('.')[0].replace(' ', '_').lower()}",
+                          lambda _, script=script, marker=marker: launch_until(script, marker),
+                          samples=10, groups=['startup'])
+            for script, marker in STARTUP_MARKERS.items()]
+
+
+# ============== RUNNER ==============
+def collect_cases(groups: Optional[List[str]]) -> List[BenchmarkCase]:
+    """All cases, optionally filtered by group"""
+    cases = tictactoe_cases() + ratings_cases() + tetris_cases() + startup_cases()
+    if groups:
+        cases = [c for c in cases if set(groups) & set(c.groups)]
+    return cases
+
+
+def environment() -> dict:
+    """Metadata that makes result files comparable"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=GAME_DIR,
+                                capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Print a comparison table and return the names of regressed cases"""
+    regressions = []
+    print(f"\n{'Case':44} {'base p50':>12} {'new p50':>12} {'change':>8}")
+    for name, result in current.items():
+        if name not in baseline:
+            continue
+        old, new = baseline[name]['p50_s'], result['p50_s']
+        change = (new - old) / old if old else 0.0
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:44} {old * 1e6:>10.1f}us {new * 1e6:>10.1f}us {change:>+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark the terminal games")
+    parser.add_argument('--samples', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--group', action='append',
+                        help="only run cases in this group (ttt, tetris, ai, step, render, session, ratings, startup)")
+    parser.add_argument('--filter', help="only run cases whose name contains this text")
+    parser.add_argument('--output', help="write results to this JSON file")
+    parser.add_argument('--compare', help="baseline JSON file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="allowed median slowdown before flagging a regression")
+    args = parser.parse_args()
+
+    cases = collect_cases(args.group)
+    if args.filter:
+        cases = [c for c in cases if args.filter in c.name]
+
+    results = {}
+    print(f"{'Case':44} {'p50':>10} {'p90':>10} {'p99':>10} {'ops/s':>12} {'peak mem':>10}")
+    for case in cases:
+        result = run_case(case, args.samples, args.warmup)
+        results[case.name] = result
+        print(f"{case.name:44} {result['p50_s'] * 1e6:>8.1f}us {result['p90_s'] * 1e6:>8.1f}us "
+              f"{result['p99_s'] * 1e6:>8.1f}us {result['ops_per_s']:>12.0f} "
+              f"{result['peak_memory_bytes'] / 1024:>8.1f}KB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,420 @@
+"""Retrograde endgame databases for m,n,k games (k in a row on an m x n board).
+
+Positions are solved backwards: the full-board layer first, then each layer
+with one stone fewer, down to the empty board. A layer only depends on the
+layer after it, so it is split into chunks that are solved in parallel on
+a process pool. Every layer lives on disk as two files that are opened
+with mmap:
+
+    layer_NN.keys   sorted position keys (X stones | O stones << cells)
+    layer_NN.vals   one value byte per key
+
+A value byte holds the result for the side to move: ``DRAW``, or ``WIN``
+or ``LOSS`` combined with the distance to the end of the game in plies.
+X always moves first, so the side to move follows from the stone count.
+
+    python endgame_db.py --width 4 --height 4 --k 4 --workers 8
+    python endgame_db.py --width 4 --height 4 --k 4 --probe "X..O.X..O......."
+"""
+import argparse
+import json
+import mmap
+import os
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import combinations
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_DB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'endgame_db')
+
+# Value byte layout, from the side to move's point of view
+DRAW = 0x00
+WIN = 0x40
+LOSS = 0x80
+DISTANCE_MASK = 0x3F
+
+CHUNK_SIZE = 1 << 16
+
+
+# ============== GEOMETRY ==============
+@dataclass(frozen=True)
+class Geometry:
+    """Board shape; cells are numbered row by row like the 3x3 game"""
+    width: int
+    height: int
+    k: int
+
+    @property
+    def cells(self) -> int:
+        return self.width * self.height
+
+    @property
+    def typecode(self) -> str:
+        """Array type wide enough for a position key"""
+        return 'I' if 2 * self.cells <= 32 else 'Q'
+
+    @property
+    def name(self) -> str:
+        return f"{self.width}x{self.height}k{self.k}"
+
+    def lines(self) -> List[int]:
+        """Bit masks of every k-in-a-row line"""
+        masks = []
+        for row in range(self.height):
+            for col in range(self.width):
+                for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_row, end_col = row + dr * (self.k - 1), col + dc * (self.k - 1)
+                    if 0 <= end_row < self.height and 0 <= end_col < self.width:
+                        masks.append(sum(1 << ((row + dr * i) * self.width + col + dc * i)
+                                         for i in range(self.k)))
+        return masks
+
+    def lines_through(self) -> List[List[int]]:
+        """Line masks grouped by the cells they cover"""
+        lines = self.lines()
+        return [[mask for mask in lines if mask >> cell & 1] for cell in range(self.cells)]
+
+
+def has_line(stones: int, lines: Sequence[int]) -> bool:
+    """Whether ``stones`` completes any of ``lines``"""
+    for mask in lines:
+        if stones & mask == mask:
+            return True
+    return False
+
+
+def decode(value: int) -> Tuple[str, int]:
+    """Turn a value byte into ('win' | 'draw' | 'loss', distance in plies)"""
+    if value & WIN:
+        return 'win', value & DISTANCE_MASK
+    if value & LOSS:
+        return 'loss', value & DISTANCE_MASK
+    return 'draw', 0
+
+
+def child_to_parent(value: int) -> int:
+    """Value of a move for the mover, given the value of the resulting position"""
+    if value & LOSS:
+        return WIN | ((value & DISTANCE_MASK) + 1)
+    if value & WIN:
+        return LOSS | ((value & DISTANCE_MASK) + 1)
+    return DRAW
+
+
+def preference(value: int) -> int:
+    """Sort key: quick wins first, then draws, then the slowest losses"""
+    if value & WIN:
+        return 200 - (value & DISTANCE_MASK)
+    if value & LOSS:
+        return value & DISTANCE_MASK
+    return 100
+
+
+# ============== LAYER FILES ==============
+def layer_path(directory: str, stones: int, kind: str) -> str:
+    return os.path.join(directory, f"layer_{stones:02d}.{kind}")
+
+
+def open_array(path: str, typecode: str):
+    """Map a layer file read-only and view it as an array of ``typecode``"""
+    if os.path.getsize(path) == 0:
+        return array(typecode), None
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mapped).cast(typecode), mapped
+
+
+def close_array(view, mapped):
+    """Release a view returned by ``open_array`` and its map"""
+    if mapped is not None:
+        view.release()
+        mapped.close()
+
+
+def generate_layer(geometry: Geometry, stones: int) -> array:
+    """Sorted keys of every reachable position with ``stones`` stones.
+
+    Positions where the side to move already has a line are skipped, since
+    the game would have ended on the previous move.
+    """
+    cells = geometry.cells
+    lines = geometry.lines()
+    x_to_move = stones % 2 == 0
+    keys = []
+    for occupied in combinations(range(cells), stones):
+        occupied_mask = sum(1 << c for c in occupied)
+        for o_cells in combinations(occupied, stones // 2):
+            o_mask = sum(1 << c for c in o_cells)
+            x_mask = occupied_mask ^ o_mask
+            if has_line(x_mask if x_to_move else o_mask, lines):
+                continue
+            keys.append(x_mask | o_mask << cells)
+    keys.sort()
+    return array(geometry.typecode, keys)
+
+
+def solve_chunk(directory: str, geometry: Geometry, stones: int, start: int, stop: int) -> int:
+    """Solve keys[start:stop] of one layer and write their value bytes.
+
+    Runs in a worker process; reads the next layer through mmap and writes
+    its slice of this layer's value file in place.
+    """
+    cells = geometry.cells
+    full = (1 << cells) - 1
+    lines = geometry.lines()
+    through = geometry.lines_through()
+    x_to_move = stones % 2 == 0
+
+    keys = open_array(layer_path(directory, stones, 'keys'), geometry.typecode)
+    children = open_array(layer_path(directory, stones + 1, 'keys'), geometry.typecode) if stones < cells else None
+    child_values = open_array(layer_path(directory, stones + 1, 'vals'), 'B') if stones < cells else None
+    position_keys = keys[0]
+    child_keys = children[0] if children else None
+    child_vals = child_values[0] if child_values else None
+
+    values = bytearray(stop - start)
+    try:
+        for i in range(start, stop):
+            key = position_keys[i]
+            x_mask = key & full
+            o_mask = key >> cells
+            mine, theirs = (x_mask, o_mask) if x_to_move else (o_mask, x_mask)
+
+            if has_line(theirs, lines):
+                values[i - start] = LOSS  # Lost on the previous move
+                continue
+            empty = full & ~(x_mask | o_mask)
+            if not empty:
+                values[i - start] = DRAW
+                continue
+
+            best = None
+            best_rank = -1
+            while empty:
+                bit = empty & -empty
+                empty ^= bit
+                if has_line(mine | bit, through[bit.bit_length() - 1]):
+                    best = WIN | 1
+                    break
+                child = key | (bit if x_to_move else bit << cells)
+                value = child_to_parent(child_vals[bisect_left(child_keys, child)])
+                rank = preference(value)
+                if rank > best_rank:
+                    best, best_rank = value, rank
+            values[i - start] = best
+    finally:
+        del position_keys, child_keys, child_vals
+        for opened in (keys, children, child_values):
+            if opened:
+                close_array(*opened)
+
+    with open(layer_path(directory, stones, 'vals'), 'r+b') as f:
+        f.seek(start)
+        f.write(values)
+    return stop - start
+
+
+# ============== BUILDER ==============
+def database_dir(geometry: Geometry, root: Optional[str] = None) -> str:
+    return os.path.join(root or DEFAULT_DB_DIR, geometry.name)
+
+
+def read_meta(directory: str) -> dict:
+    try:
+        with open(os.path.join(directory, 'meta.json')) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def write_meta(directory: str, meta: dict):
+    """Atomically record build progress"""
+    path = os.path.join(directory, 'meta.json')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def build(geometry: Geometry, root: Optional[str] = None, workers: Optional[int] = None,
+          chunk_size: int = CHUNK_SIZE, progress: Optional[Callable[[str], None]] = None) -> str:
+    """Solve every layer of ``geometry`` and return the database directory.
+
+    Progress is saved after each layer, so an interrupted build picks up
+    from the last finished layer.
+    """
+    directory = database_dir(geometry, root)
+    os.makedirs(directory, exist_ok=True)
+    meta = read_meta(directory)
+    if meta.get('geometry') != [geometry.width, geometry.height, geometry.k]:
+        meta = {'geometry': [geometry.width, geometry.height, geometry.k],
+                'typecode': geometry.typecode, 'solved_from': None, 'layers': {}}
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    try:
+        for stones in range(geometry.cells, -1, -1):
+            if meta['solved_from'] is not None and stones >= meta['solved_from']:
+                continue
+            started = time.time()
+            keys = generate_layer(geometry, stones)
+            with open(layer_path(directory, stones, 'keys'), 'wb') as f:
+                keys.tofile(f)
+            with open(layer_path(directory, stones, 'vals'), 'wb') as f:
+                f.truncate(len(keys))
+
+            ranges = [(start, min(start + chunk_size, len(keys)))
+                      for start in range(0, len(keys), chunk_size)]
+            if pool:
+                futures = [pool.submit(solve_chunk, directory, geometry, stones, start, stop)
+                           for start, stop in ranges]
+                for future in futures:
+                    future.result()
+            else:
+                for start, stop in ranges:
+                    solve_chunk(directory, geometry, stones, start, stop)
+
+            meta['solved_from'] = stones
+            meta['layers'][str(stones)] = len(keys)
+            write_meta(directory, meta)
+            if progress:
+                progress(f"layer {stones:2d}: {len(keys):>10,} positions in {time.time() - started:.1f}s")
+    finally:
+        if pool:
+            pool.shutdown()
+    return directory
+
+
+# ============== PROBING ==============
+class EndgameDatabase:
+    """Read-only access to a solved database"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        meta = read_meta(directory)
+        if meta.get('solved_from') != 0:
+            raise FileNotFoundError(f"no complete endgame database in {directory}")
+        self.geometry = Geometry(*meta['geometry'])
+        self.layers: Dict[int, tuple] = {}
+        self.through = self.geometry.lines_through()
+
+    def _layer(self, stones: int):
+        """(keys, values) of a layer, mapped on first use"""
+        layer = self.layers.get(stones)
+        if layer is None:
+            layer = self.layers[stones] = (
+                open_array(layer_path(self.directory, stones, 'keys'), self.geometry.typecode),
+                open_array(layer_path(self.directory, stones, 'vals'), 'B'))
+        return layer[0][0], layer[1][0]
+
+    def probe_key(self, x_mask: int, o_mask: int) -> Optional[int]:
+        """Value byte for the side to move, or None for unreachable positions"""
+        keys, vals = self._layer(bin(x_mask | o_mask).count('1'))
+        key = x_mask | o_mask << self.geometry.cells
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return vals[i]
+        return None
+
+    def masks(self, board: Sequence[str]) -> Tuple[int, int]:
+        """X and O bit masks of a board given as a sequence of 'X', 'O' and ' '"""
+        x_mask = o_mask = 0
+        for cell, mark in enumerate(board):
+            if mark == 'X':
+                x_mask |= 1 << cell
+            elif mark == 'O':
+                o_mask |= 1 << cell
+        return x_mask, o_mask
+
+    def probe(self, board: Sequence[str]) -> Optional[int]:
+        """Value byte of a board for the side to move"""
+        return self.probe_key(*self.masks(board))
+
+    def move_values(self, board: Sequence[str]) -> Dict[int, int]:
+        """Value of every legal move for the side to move"""
+        return self.move_values_of(*self.masks(board))
+
+    def move_values_of(self, x_mask: int, o_mask: int) -> Dict[int, int]:
+        """``move_values`` of a position given as X and O bit masks"""
+        x_to_move = bin(x_mask | o_mask).count('1') % 2 == 0
+        mine = x_mask if x_to_move else o_mask
+        values = {}
+        for cell in range(self.geometry.cells):
+            bit = 1 << cell
+            if (x_mask | o_mask) & bit:
+                continue
+            if has_line(mine | bit, self.through[cell]):
+                values[cell] = WIN | 1
+                continue
+            child = self.probe_key(x_mask | bit, o_mask) if x_to_move else self.probe_key(x_mask, o_mask | bit)
+            values[cell] = DRAW if child is None else child_to_parent(child)
+        return values
+
+    def best_move(self, board: Sequence[str]) -> Tuple[int, int]:
+        """(cell, value) of the best move: fastest win, else draw, else slowest loss"""
+        values = self.move_values(board)
+        cell = max(values, key=lambda c: preference(values[c]))
+        return cell, values[cell]
+
+    def close(self):
+        """Unmap every layer"""
+        for keys, vals in self.layers.values():
+            close_array(*keys)
+            close_array(*vals)
+        self.layers.clear()
+
+
+def open_database(width: int = 3, height: int = 3, k: int = 3, root: Optional[str] = None,
+                  build_if_missing: bool = True, workers: Optional[int] = None) -> EndgameDatabase:
+    """Open a database, solving it first if it is not on disk yet"""
+    geometry = Geometry(width, height, k)
+    directory = database_dir(geometry, root)
+    if read_meta(directory).get('solved_from') != 0:
+        if not build_if_missing:
+            raise FileNotFoundError(f"no endgame database for {geometry.name} in {directory}")
+        build(geometry, root, workers)
+    return EndgameDatabase(directory)
+
+
+# ============== COMMAND LINE ==============
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Build or probe an m,n,k endgame database")
+    parser.add_argument('--width', type=int, default=3)
+    parser.add_argument('--height', type=int, default=3)
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--dir', help=f"database root (default {DEFAULT_DB_DIR})")
+    parser.add_argument('--workers', type=int, help="worker processes (default: all cores)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--probe', help="board to evaluate, row by row, using X, O and '.' for empty")
+    args = parser.parse_args()
+
+    geometry = Geometry(args.width, args.height, args.k)
+    if args.probe is None:
+        started = time.time()
+        directory = build(geometry, args.dir, args.workers, args.chunk_size, progress=print)
+        print(f"Solved {geometry.name} in {time.time() - started:.1f}s -> {directory}")
+        args.probe = '.' * geometry.cells
+
+    board = [' ' if c == '.' else c.upper() for c in args.probe]
+    if len(board) != geometry.cells:
+        sys.exit(f"--probe needs {geometry.cells} cells")
+    db = open_database(args.width, args.height, args.k, args.dir, build_if_missing=False)
+    value = db.probe(board)
+    if value is None:
+        sys.exit("unreachable position")
+    outcome, distance = decode(value)
+    print(f"Side to move: {outcome}" + (f" in {distance} plies" if distance else ""))
+    if ' ' in board and value != LOSS:
+        cell, move_value = db.best_move(board)
+        print(f"Best move: cell {cell} ({decode(move_value)[0]})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+"""Game event stream written to rotating compressed files.
+
+Event logging is off by default. Turn it on with ``--events-dir=PATH`` or
+the ``GAME_EVENTS_DIR`` environment variable:
+
+    GAME_EVENTS_DIR=events python Tetris.py
+    python "Tictac toe.py" --events-dir=events --events-policy=drop-newest
+
+Games call ``EVENTS.emit`` for game start, moves and placements, line
+clears and game end. ``emit`` only appends to a bounded in-memory queue;
+a background thread drains it in batches into gzip-compressed JSON lines
+files, with one fsync per batch of writes, and rotates files by size;
+every file is kept unless ``--events-max-files=N`` (``GAME_EVENTS_MAX_FILES``)
+limits how many of a process's files stay on disk. The
+game loop never waits for the disk. When the queue is full events are
+dropped by the configured policy, and the writer records the drops and
+its lag in the stream itself. As with ``STATS``, hot paths guard calls
+with ``if EVENTS.enabled:``.
+"""
+import atexit
+import itertools
+import os
+import sys
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+from instrumentation import STATS
+
+POLICIES = ('drop-oldest', 'drop-newest')
+# The writer reports itself in the stream once events wait this long
+LAG_WARNING = 1.0
+
+
+class EventLog:
+    """Process-wide bounded event queue"""
+
+    def __init__(self):
+        self.enabled = False
+        self.directory: Optional[str] = None
+        self.capacity = 10000
+        self.policy = 'drop-oldest'
+        self.batch_size = 256
+        self.queue: deque = deque()
+        self.emitted = 0
+        self.dropped = 0
+        self._ids = itertools.count(1)
+        self._pid: Optional[int] = None
+        self._run = ''                   # Random per process run, see new_game_id()
+        # Set by game_cluster.py so a shard only hands out ids that hash to it
+        self.owns_id: Optional[Callable[[str], bool]] = None
+        self._wake = None                # threading.Event, created by enable()
+        self._writer: Optional['EventWriter'] = None
+
+    def enable(self, directory: str, capacity: int = 10000, policy: str = 'drop-oldest',
+               batch_size: int = 256, flush_interval: float = 1.0,
+               max_bytes: int = 8 << 20, max_files: Optional[int] = None, start: bool = True):
+        """Log into ``directory``, starting the background writer now unless ``start`` is False"""
+        if policy not in POLICIES:
+            raise ValueError(f"unknown drop policy '{policy}' (expected one of {', '.join(POLICIES)})")
+        if self.enabled:
+            return
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.capacity = capacity
+        self.policy = policy
+        self.batch_size = batch_size
+        self._options = (flush_interval, max_bytes, max_files)
+        if start:
+            self.start()
+
+    def start(self, label: str = ''):
+        """Start the writer of a log set up by ``enable``; ``label`` goes into its file names.
+
+        ``game_cluster.py`` enables the log with ``start=False`` and starts
+        it in each worker after the fork, so no writer thread is forked.
+        """
+        import threading  # Only paid for when event logging is on
+        if self.enabled or self.directory is None:
+            return
+        self._wake = threading.Event()
+        self._writer = EventWriter(self, *self._options, label=label)
+        self._writer.start()
+        self.enabled = True
+        atexit.register(self.close)
+
+    def new_game_id(self) -> str:
+        """Identifier that ties the events of one game together, unique across runs"""
+        pid = os.getpid()
+        if pid != self._pid:
+            # PIDs come back after restarts, respawns and in containers; the token does not
+            self._pid, self._run = pid, os.urandom(4).hex()
+        while True:
+            game_id = f"{pid}-{self._run}-{next(self._ids)}"
+            if self.owns_id is None or self.owns_id(game_id):
+                return game_id
+
+    def emit(self, game: str, game_id: str, kind: str, **fields):
+        """Queue one event; never blocks or touches the disk"""
+        if len(self.queue) >= self.capacity:
+            self.dropped += 1
+            if self.policy == 'drop-newest':
+                return
+            try:
+                self.queue.popleft()
+            except IndexError:
+                pass  # The writer emptied the queue meanwhile
+        event = {'t': time.time(), 'game': game, 'id': game_id, 'type': kind}
+        event.update(fields)
+        self.queue.append(event)
+        self.emitted += 1
+        if len(self.queue) >= self.batch_size and self._wake is not None:
+            self._wake.set()
+
+    def stats(self) -> dict:
+        """Queue and writer counters"""
+        writer = self._writer
+        return {
+            'emitted': self.emitted,
+            'queued': len(self.queue),
+            'dropped': self.dropped,
+            'policy': self.policy,
+            'written': writer.written if writer else 0,
+            'lag': writer.lag if writer else 0.0,
+            'max_lag': writer.max_lag if writer else 0.0,
+            'files': writer.files if writer else [],
+        }
+
+    def close(self):
+        """Write everything still queued and stop the writer"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._writer.stop()
+
+
+class EventWriter:
+    """Drains the event queue into rotating gzip JSON lines files on its own thread"""
+
+    def __init__(self, log: EventLog, flush_interval: float, max_bytes: int, max_files: Optional[int],
+                 label: str = ''):
+        self.log = log
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes      # Uncompressed bytes per file before rotating
+        self.max_files = max_files      # Files of this process kept on disk; None keeps all
+        label = f"{label}-" if label else ''
+        self.prefix = f"events-{time.strftime('%Y%m%d-%H%M%S')}-{label}{os.getpid()}"
+        self.files: List[str] = []
+        self.written = 0
+        self.lag = 0.0                  # Age of the oldest event in the last batch
+        self.max_lag = 0.0
+        self._reported_drops = 0
+        self._raw = None
+        self._gzip = None
+        self._bytes = 0
+        self._sequence = itertools.count(1)
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        import threading
+        self._thread = threading.Thread(target=self.run, name='event-writer', daemon=True)
+        self._thread.start()
+
+    def run(self):
+        while not self._stopping:
+            self.log._wake.wait(self.flush_interval)
+            self.log._wake.clear()
+            self.write_pending()
+        self.write_pending()
+        self._close_file()
+
+    def stop(self):
+        self._stopping = True
+        self.log._wake.set()
+        self._thread.join()
+
+    def write_pending(self):
+        """Write every queued event in batches, then fsync once"""
+        queue = self.log.queue
+        wrote = False
+        while queue:
+            batch = []
+            while queue and len(batch) < self.log.batch_size:
+                batch.append(queue.popleft())
+            self._write_batch(batch)
+            wrote = True
+        if wrote:
+            self._sync()
+
+    def _write_batch(self, batch: List[dict]):
+        import json
+        self.lag = time.time() - batch[0]['t']
+        self.max_lag = max(self.max_lag, self.lag)
+        dropped = self.log.dropped - self._reported_drops
+        if dropped or self.lag >= LAG_WARNING:
+            # Falling behind: say so in the stream
+            self._reported_drops += dropped
+            batch.append({'t': time.time(), 'game': 'log', 'id': None, 'type': 'writer',
+                          'policy': self.log.policy, 'dropped': dropped,
+                          'lag': round(self.lag, 3), 'queued': len(self.log.queue)})
+
+        data = ''.join(json.dumps(event, default=str) + '\n' for event in batch).encode()
+        if self._gzip is None or self._bytes >= self.max_bytes:
+            self._rotate()
+        self._gzip.write(data)
+        self._bytes += len(data)
+        self.written += len(batch)
+        if STATS.enabled:
+            STATS.incr('events.written', len(batch))
+            STATS.incr('events.dropped', dropped)
+            STATS.observe('events.lag', self.lag)
+
+    def _sync(self):
+        """Flush the compressor and fsync, so written batches survive a crash"""
+        self._gzip.flush()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+
+    def _rotate(self):
+        """Start a new file and delete the oldest beyond ``max_files``, if set"""
+        self._close_file()
+        import gzip
+        path = os.path.join(self.log.directory, f"{self.prefix}-{next(self._sequence):04d}.jsonl.gz")
+        self._raw = open(path, 'wb')
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode='wb')
+        self._bytes = 0
+        self.files.append(path)
+        while self.max_files and len(self.files) > self.max_files:
+            try:
+                os.remove(self.files.pop(0))
+            except OSError:
+                pass
+
+    def _close_file(self):
+        if self._gzip is None:
+            return
+        self._gzip.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+        self._gzip = self._raw = None
+
+
+EVENTS = EventLog()
+
+
+def configure(argv: Optional[List[str]] = None, start: bool = True) -> List[str]:
+    """Enable the event log from the environment or command line flags.
+
+    Recognizes ``--events-dir=PATH``, ``--events-policy=drop-oldest|drop-newest``
+    and ``--events-max-files=N`` (and ``GAME_EVENTS_DIR`` / ``GAME_EVENTS_POLICY``
+    / ``GAME_EVENTS_MAX_FILES``), and returns the
+    remaining arguments. With ``start=False`` the writer waits for
+    ``EVENTS.start()``.
+    """
+    env = os.environ
+    directory = env.get('GAME_EVENTS_DIR')
+    policy = env.get('GAME_EVENTS_POLICY', 'drop-oldest')
+    max_files = env.get('GAME_EVENTS_MAX_FILES')
+
+    remaining = []
+    for arg in argv or []:
+        if arg.startswith('--events-dir='):
+            directory = arg.split('=', 1)[1]
+        elif arg.startswith('--events-policy='):
+            policy = arg.split('=', 1)[1]
+        elif arg.startswith('--events-max-files='):
+            max_files = arg.split('=', 1)[1]
+        else:
+            remaining.append(arg)
+
+    if directory:
+        try:
+            EVENTS.enable(directory, policy=policy, max_files=parse_max_files(max_files), start=start)
+        except ValueError as e:
+            print(f"error: {e}", file=sys.stderr)
+            sys.exit(2)
+    return remaining
+
+
+def parse_max_files(value: Optional[str]) -> Optional[int]:
+    """``--events-max-files`` as a count of files, or None to keep them all"""
+    if not value:
+        return None
+    try:
+        count = int(value)
+    except ValueError:
+        count = 0
+    if count < 1:
+        raise ValueError(f"invalid --events-max-files '{value}' (expected a number of files, at least 1)")
+    return count
@@ -0,0 +1,324 @@
+"""Post-game analysis of Tic Tac Toe against perfect play.
+
+Every move of a finished game is compared with the solved endgame database
+(``endgame_db.py``): a move that throws away a forced win is a missed win,
+one that turns a draw or better into a loss is a blunder, and a slower win
+or a quicker loss is an inaccuracy. Flagged moves carry the principal
+variation, the line perfect play would have followed instead.
+
+Move values and principal variations are cached per position, so positions
+shared by many games (every opening, for a start) are looked up once per
+process. Archives are read from the event log (``--events-dir``) and fanned
+out over a process pool; annotated games are printed as they come back.
+
+    python game_analysis.py events/
+    python game_analysis.py events/ --workers 8 --json analysis.jsonl
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from endgame_db import EndgameDatabase, decode, has_line, open_database, preference
+
+MARKS = ('X', 'O')
+VERDICTS = ('best', 'inaccuracy', 'missed win', 'blunder')
+
+
+# ============== DATA MODELS ==============
+@dataclass
+class MoveNote:
+    """One move of a game held up against perfect play"""
+    ply: int
+    player: str
+    position: int               # Board index (0-8)
+    verdict: str                # One of VERDICTS
+    outcome: str                # Outcome of the move with perfect play after it: 'win', 'draw' or 'loss'
+    distance: int               # Plies from the move to the end of the game with perfect play
+    best_outcome: str           # Outcome and distance of the best move
+    best_distance: int
+    best: List[int]             # Every move as good as the best one
+    pv: List[int] = field(default_factory=list)  # Best line from the position, for flagged moves
+
+
+@dataclass
+class GameAnalysis:
+    """Annotated record of a finished game"""
+    game_id: Optional[str]
+    players: Dict[str, str]
+    winner: Optional[str]
+    moves: List[MoveNote]
+
+    def flagged(self) -> List[MoveNote]:
+        return [note for note in self.moves if note.verdict != 'best']
+
+    def count(self, verdict: str) -> int:
+        return sum(1 for note in self.moves if note.verdict == verdict)
+
+
+# ============== ANALYSIS ==============
+class PositionCache:
+    """Bounded LRU of move values and principal variations by position"""
+
+    def __init__(self, capacity: int = 1 << 16):
+        self.capacity = capacity
+        self.entries: 'OrderedDict[tuple, tuple]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[tuple]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, entry: tuple):
+        self.entries[key] = entry
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class Analyzer:
+    """Grades moves with an endgame database, reusing solved positions across games"""
+
+    def __init__(self, db: EndgameDatabase, cache: Optional[PositionCache] = None):
+        self.db = db
+        self.cache = cache if cache is not None else PositionCache()
+
+    def position(self, x_mask: int, o_mask: int) -> Tuple[Dict[int, int], List[int]]:
+        """(value of every legal move, principal variation) for the side to move"""
+        key = (x_mask, o_mask)
+        entry = self.cache.get(key)
+        if entry is None:
+            values = self.db.move_values_of(x_mask, o_mask)
+            entry = (values, self._principal_variation(x_mask, o_mask, values))
+            self.cache.put(key, entry)
+        return entry
+
+    def _principal_variation(self, x_mask: int, o_mask: int, values: Dict[int, int]) -> List[int]:
+        if not values:
+            return []
+        cell = max(values, key=lambda c: preference(values[c]))
+        x_to_move = bin(x_mask | o_mask).count('1') % 2 == 0
+        mine = (x_mask if x_to_move else o_mask) | 1 << cell
+        if has_line(mine, self.db.through[cell]):
+            return [cell]
+        child = (mine, o_mask) if x_to_move else (x_mask, mine)
+        return [cell] + self.position(*child)[1]
+
+    def analyze(self, moves: Sequence[Tuple[str, int]], game_id: Optional[str] = None,
+                players: Optional[Dict[str, str]] = None, winner: Optional[str] = None) -> GameAnalysis:
+        """Grade ``moves``, a sequence of (player, position) from the start of the game"""
+        masks = [0, 0]
+        notes = []
+        for ply, (player, position) in enumerate(moves, 1):
+            values, pv = self.position(*masks)
+            if position not in values:
+                break  # Not a legal continuation; the record is damaged
+            chosen = values[position]
+            top = max(preference(value) for value in values.values())
+            best = sorted(cell for cell, value in values.items() if preference(value) == top)
+            best_value = values[best[0]]
+            verdict = grade(chosen, best_value)
+            notes.append(MoveNote(ply, player, position, verdict, *decode(chosen), *decode(best_value),
+                                  best, [] if verdict == 'best' else pv))
+            masks[MARKS.index(player)] |= 1 << position
+        return GameAnalysis(game_id, players or {'X': 'X', 'O': 'O'}, winner, notes)
+
+    def analyze_game(self, game) -> GameAnalysis:
+        """Grade a ``TicTacToeGame`` from its move history"""
+        moves = [(move['player'], move['position']) for move in game.moves_history]
+        return self.analyze(moves, game.game_id, dict(game.players), game.winner)
+
+
+def grade(chosen: int, best: int) -> str:
+    """Verdict for a move of value ``chosen`` where ``best`` was available"""
+    if preference(chosen) == preference(best):
+        return 'best'
+    outcome, best_outcome = decode(chosen)[0], decode(best)[0]
+    if best_outcome == 'win' and outcome != 'win':
+        return 'missed win'
+    if outcome == 'loss' and best_outcome != 'loss':
+        return 'blunder'
+    return 'inaccuracy'
+
+
+_analyzer: Optional[Analyzer] = None
+
+
+def shared_analyzer(root: Optional[str] = None) -> Analyzer:
+    """This process's analyzer on the 3x3 database, built on first use"""
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = Analyzer(open_database(3, 3, 3, root))
+    return _analyzer
+
+
+# ============== ARCHIVES ==============
+def event_files(paths: Iterable[str]) -> List[str]:
+    """Event log files named by ``paths`` (files, or directories to search)"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, 'events-*.jsonl*'))))
+        else:
+            files.append(path)
+    return files
+
+
+def read_archive(paths: Iterable[str]) -> Iterator[tuple]:
+    """Finished Tic Tac Toe games in event log files as (game_id, players, moves, winner).
+
+    Games are rebuilt from their move, undo and redo events. A game can be
+    taken back after its end event, so games are yielded once every file
+    has been read, in the order they finished; unfinished games are skipped.
+    """
+    games: Dict[str, dict] = {}
+    for path in event_files(paths):
+        opener = gzip.open if path.endswith('.gz') else open
+        try:
+            with opener(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        break  # Truncated tail of a file still being written
+                    if event.get('game') == 'tictactoe':
+                        apply_event(games, event)
+        except (OSError, EOFError):
+            continue  # Unreadable or cut-off gzip file
+
+    finished = sorted((game for game in games.values() if game['finished'] is not None),
+                      key=lambda game: game['finished'])
+    for game in finished:
+        yield game['id'], game['players'], tuple(game['moves']), game['winner']
+
+
+def apply_event(games: Dict[str, dict], event: dict):
+    """Update the game an event log record belongs to"""
+    game = games.get(event['id'])
+    if game is None:
+        game = games[event['id']] = {'id': event['id'], 'players': None, 'moves': [],
+                                     'winner': None, 'finished': None}
+    kind = event['type']
+    if kind == 'start':
+        game['players'] = event.get('players')
+    elif kind in ('move', 'redo'):
+        game['moves'].append((event['player'], event['position']))
+    elif kind == 'undo' and game['moves']:
+        game['moves'].pop()
+        game['finished'] = None
+    elif kind == 'end':
+        game['players'] = game['players'] or event.get('players')
+        game['winner'] = event.get('winner')
+        game['finished'] = event['t']
+
+
+def analyze_record(record: tuple) -> GameAnalysis:
+    """Grade one archived game on a worker"""
+    game_id, players, moves, winner = record
+    return shared_analyzer().analyze(moves, game_id, players, winner)
+
+
+def annotate_record(task: tuple) -> tuple:
+    """Grade and render one archived game on a worker.
+
+    Returns (text, JSON line or '', count per verdict). Only strings go back
+    to the parent, which costs far less than pickling the analysis.
+    """
+    record, with_json = task
+    analysis = analyze_record(record)
+    line = json.dumps(asdict(analysis)) if with_json else ''
+    return format_analysis(analysis), line, tuple(analysis.count(verdict) for verdict in VERDICTS)
+
+
+def annotate_archive(records: Sequence[tuple], workers: int = 1,
+                     with_json: bool = False) -> Iterator[tuple]:
+    """``annotate_record`` of every record, in order, as the workers finish them"""
+    tasks = [(record, with_json) for record in records]
+    if workers <= 1 or len(tasks) < 2:
+        yield from map(annotate_record, tasks)
+        return
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(annotate_record, tasks, chunksize=chunksize)
+
+
+# ============== OUTPUT ==============
+def outcome_text(outcome: str, distance: int) -> str:
+    return outcome if outcome == 'draw' else f"{outcome} in {distance}"
+
+
+def explain(note: MoveNote) -> str:
+    """Why a flagged move was flagged, with positions numbered 1-9 as on the board"""
+    return (f"{outcome_text(note.outcome, note.distance)} instead of "
+            f"{outcome_text(note.best_outcome, note.best_distance)};"
+            f" best {', '.join(str(cell + 1) for cell in note.best)};"
+            f" line {' '.join(str(cell + 1) for cell in note.pv)}")
+
+
+def describe_move(note: MoveNote) -> str:
+    """One line about a move"""
+    text = f"{note.ply:2}. {note.player} {note.position + 1}  {note.verdict}"
+    if note.verdict != 'best':
+        text += f" ({explain(note)})"
+    return text
+
+
+def format_analysis(analysis: GameAnalysis) -> str:
+    players = analysis.players
+    result = 'draw' if analysis.winner == 'Tie' else f"{analysis.winner} wins" if analysis.winner else 'unfinished'
+    lines = [f"Game {analysis.game_id}: {players.get('X')} (X) vs {players.get('O')} (O), {result}"]
+    lines.extend('  ' + describe_move(note) for note in analysis.moves)
+    return '\n'.join(lines)
+
+
+# ============== ENTRY POINT ==============
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Annotate Tic Tac Toe games against perfect play")
+    parser.add_argument('paths', nargs='+', help="event log files or directories (see --events-dir)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--json', metavar='PATH', help="also write one JSON analysis per line to PATH")
+    parser.add_argument('--flagged-only', action='store_true', help="only print games with flagged moves")
+    args = parser.parse_args()
+
+    started = time.time()
+    shared_analyzer()  # Build the database once before the workers need it
+    records = list(read_archive(args.paths))
+    totals = [0] * len(VERDICTS)
+    out = open(args.json, 'w') if args.json else None
+    try:
+        for text, line, counts in annotate_archive(records, args.workers, bool(out)):
+            totals = [total + count for total, count in zip(totals, counts)]
+            if out:
+                out.write(line + '\n')
+            if any(counts[1:]) or not args.flagged_only:
+                print(text)
+    finally:
+        if out:
+            out.close()
+
+    moves = sum(totals)
+    summary = ', '.join(f"{count} {verdict}" for verdict, count in zip(VERDICTS, totals))
+    print(f"\n{len(records)} games, {moves} moves: {summary} ({time.time() - started:.1f}s)",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
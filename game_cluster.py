@@ -0,0 +1,302 @@
+"""Multi-process game host: one listening socket shared by N worker shards.
+
+``game_host.py`` runs every session on one interpreter, so game logic is
+bound to one core. The supervisor here opens the listening socket once
+and forks ``--workers`` processes (one per core by default), each running
+a ``GameHost`` on the inherited socket; the kernel gives each new
+connection to whichever worker accepts it first.
+
+Game ids are pinned to shards by a consistent hash ring, and each worker
+only hands out ids that hash to itself. When a player enters a resume
+code on a worker that does not own the game, the worker passes the
+client's connection itself (the file descriptor, over a Unix socket) to
+the owning shard, which carries on the session. The supervisor restarts
+workers that die, backing off when one keeps crashing; with
+``--snapshot=PATH`` each shard checkpoints to ``PATH.<shard>``, so a
+restarted worker restores its games and players resume them as usual.
+With ``--events-dir=DIR`` every shard writes its own event log files,
+named ``events-<time>-shard<N>-<pid>``, into DIR.
+Likewise ``--ratings=PATH`` keeps each shard's ratings in ``PATH.<shard>``.
+Each shard rates only the games it hosts, so there is one ratings store
+per shard, not per cluster: a player who plays on several shards has a
+separate rating on each. Use ``game_host.py`` when one rating per player
+matters.
+
+    python game_cluster.py --port 2323 --workers 4 --snapshot games.snap
+
+Workers are forked, so this needs a POSIX system; restart with the same
+``--workers`` to resume saved games. Elsewhere, use ``game_host.py``.
+"""
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from event_log import EVENTS, configure as configure_events
+from game_host import Colors, GameHost, Session, add_arguments, limits_from
+from game_modules import load_tictactoe
+from instrumentation import STATS, configure as configure_stats
+from snapshot import SNAPSHOTS
+
+HANDOFF_TIMEOUT = 2.0
+# Workers that die sooner than this after starting are restarted with a growing delay
+MIN_UPTIME = 10.0
+MAX_RESTART_DELAY = 30.0
+
+
+# ============== CONSISTENT HASHING ==============
+def ring_hash(key: str) -> int:
+    """Stable 64-bit hash; ``hash()`` differs between interpreter runs"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Consistent hash ring of shard numbers with virtual nodes"""
+
+    def __init__(self, shards: int, replicas: int = 64):
+        points = sorted((ring_hash(f"shard-{shard}-{replica}"), shard)
+                        for shard in range(shards) for replica in range(replicas))
+        self.points = [point for point, _ in points]
+        self.shards = [shard for _, shard in points]
+
+    def shard_for(self, key: str) -> int:
+        index = bisect.bisect(self.points, ring_hash(key)) % len(self.points)
+        return self.shards[index]
+
+
+# ============== SHARDS ==============
+def socket_path(run_dir: str, shard: int) -> str:
+    return os.path.join(run_dir, f"shard-{shard}.sock")
+
+
+def send_connection(path: str, message: bytes, fd: int):
+    """Pass a client's socket to the shard listening on ``path``"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as channel:
+        channel.settimeout(HANDOFF_TIMEOUT)
+        channel.connect(path)
+        socket.send_fds(channel, [message], [fd])
+
+
+class ShardHost(GameHost):
+    """Game host serving the games that hash to one shard"""
+
+    def __init__(self, shard: int, ring: HashRing, run_dir: str, **options):
+        super().__init__(**options)
+        self.shard = shard
+        self.ring = ring
+        self.run_dir = run_dir
+        self.label = f"Shard {shard} (pid {os.getpid()})"
+        self.handoffs_in = 0
+        self.handoffs_out = 0
+
+    async def hand_off(self, session: Session, game_id: str) -> bool:
+        owner = self.ring.shard_for(game_id)
+        if owner == self.shard or game_id in self.saved:
+            return False
+
+        # Stop reading so no input is lost to this process, and let queued output go first
+        transport = session.screen.writer.transport
+        session.screen.flush()
+        transport.pause_reading()
+        while transport.get_write_buffer_size() and not transport.is_closing():
+            await asyncio.sleep(0.01)
+        message = json.dumps({'action': 'resume', 'game': game_id}).encode()
+        fd = session.screen.writer.get_extra_info('socket').fileno()
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, send_connection, socket_path(self.run_dir, owner), message, fd)
+        except OSError:
+            transport.resume_reading()
+            session.screen.print(f"{Colors.RED}That game's server is restarting, "
+                                 f"please try again in a moment.{Colors.RESET}")
+            session.screen.flush()
+            await asyncio.sleep(1)
+            return True
+        # The owner holds its own copy of the socket; closing ours leaves the client connected
+        self.handoffs_out += 1
+        session.closed = True
+        session.screen.close()
+        return True
+
+    def accept_handoffs(self, loop: asyncio.AbstractEventLoop):
+        """Take connections passed by other shards, on a background thread"""
+        path = socket_path(self.run_dir, self.shard)
+        if os.path.exists(path):
+            os.unlink(path)  # Left by the worker this one replaces
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen()
+        threading.Thread(target=self._accept_loop, args=(server, loop),
+                         name='handoffs', daemon=True).start()
+
+    def _accept_loop(self, server: socket.socket, loop: asyncio.AbstractEventLoop):
+        while True:
+            channel, _ = server.accept()
+            with channel:
+                try:
+                    message, fds, _, _ = socket.recv_fds(channel, 4096, 1)
+                except OSError:
+                    continue
+            for fd in fds:
+                asyncio.run_coroutine_threadsafe(self.adopt(fd, json.loads(message)), loop)
+
+    async def adopt(self, fd: int, message: dict):
+        """Serve a connection passed over by another shard"""
+        reader, writer = await asyncio.open_connection(sock=socket.socket(fileno=fd))
+        self.handoffs_in += 1
+        await self.handle_connection(reader, writer, message.get('game'))
+
+    async def serve(self, host: Optional[str] = None, port: Optional[int] = None, sock=None):
+        self.accept_handoffs(asyncio.get_running_loop())
+        await super().serve(host, port, sock)
+
+
+def ignore_signals():
+    """Let shutdown finish even if another interrupt arrives"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+
+def shard_path(path: str, shard: int) -> str:
+    return f"{path}.{shard}"
+
+
+def run_worker(shard: int, shards: int, sock: socket.socket, run_dir: str, args: argparse.Namespace):
+    """Entry point of a forked worker"""
+    signal.signal(signal.SIGTERM, signal.default_int_handler)  # Shut down like Ctrl-C
+    ring = HashRing(shards)
+    EVENTS.owns_id = lambda game_id: ring.shard_for(game_id) == shard
+    EVENTS.start(f"shard{shard}")  # Configured, not started, by the supervisor
+    if STATS.path:
+        STATS.path = shard_path(STATS.path, shard)
+    ratings = load_tictactoe().RATINGS
+    if ratings.enabled:
+        ratings.load(shard_path(ratings.path, shard))
+    host = ShardHost(shard, ring, run_dir, max_sessions=args.max_sessions, time_control=args.time_control,
+                     snapshot_interval=args.snapshot_interval, limits=limits_from(args))
+    if args.snapshot:
+        host.restore_games(shard_path(args.snapshot, shard))
+    try:
+        asyncio.run(host.serve(sock=sock))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ignore_signals()  # Ctrl-C reaches the supervisor too, which then sends SIGTERM
+        SNAPSHOTS.close()
+        EVENTS.close()
+        if ratings.enabled:
+            ratings.close()
+        STATS.dump()  # Forked workers skip atexit
+
+
+# ============== SUPERVISOR ==============
+class Supervisor:
+    """Forks the shards onto one listening socket and restarts them when they die"""
+
+    def __init__(self, args: argparse.Namespace, workers: int):
+        self.args = args
+        self.workers = workers
+        self.context = multiprocessing.get_context('fork')
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        self.started = [0.0] * workers
+        self.failures = [0] * workers           # Quick deaths in a row, per shard
+        self.restart_at: Dict[int, float] = {}  # Shard -> when to start it again
+        self.restarts = 0
+        self.sock: Optional[socket.socket] = None
+        self.run_dir = ''
+
+    def start_shard(self, shard: int):
+        process = self.context.Process(target=run_worker, name=f"shard-{shard}",
+                                       args=(shard, self.workers, self.sock, self.run_dir, self.args))
+        process.start()
+        self.processes[shard] = process
+        self.started[shard] = time.monotonic()
+
+    def reap(self, shard: int):
+        """Schedule a restart of a shard whose worker exited"""
+        process = self.processes[shard]
+        process.join()
+        self.processes[shard] = None
+        if time.monotonic() - self.started[shard] < MIN_UPTIME:
+            self.failures[shard] += 1
+        else:
+            self.failures[shard] = 0
+        delay = min(MAX_RESTART_DELAY, 0.5 * (2 ** self.failures[shard] - 1))
+        print(f"Shard {shard} (pid {process.pid}) exited with code {process.exitcode}; "
+              f"restarting in {delay:.1f}s", file=sys.stderr)
+        self.restart_at[shard] = time.monotonic() + delay
+
+    def run(self):
+        """Serve until interrupted (Ctrl-C or SIGTERM)"""
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        self.sock = socket.create_server((self.args.host, self.args.port), backlog=1024)
+        self.run_dir = tempfile.mkdtemp(prefix='game-cluster-')
+        try:
+            for shard in range(self.workers):
+                self.start_shard(shard)
+            while True:
+                now = time.monotonic()
+                for shard, when in list(self.restart_at.items()):
+                    if when <= now:
+                        del self.restart_at[shard]
+                        self.restarts += 1
+                        self.start_shard(shard)
+                timeout = max(0.0, min(self.restart_at.values()) - now) if self.restart_at else None
+                sentinels = {process.sentinel: shard for shard, process in enumerate(self.processes)
+                             if process is not None}
+                for sentinel in multiprocessing.connection.wait(list(sentinels), timeout):
+                    self.reap(sentinels[sentinel])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            ignore_signals()
+            self.stop()
+
+    def stop(self):
+        """Ask every worker to save its games and exit, then clean up"""
+        running = [process for process in self.processes if process is not None]
+        for process in running:
+            if process.is_alive():
+                process.terminate()
+        for process in running:
+            process.join(5)
+            if process.is_alive():
+                process.kill()
+                process.join()
+        if self.sock is not None:
+            self.sock.close()
+        shutil.rmtree(self.run_dir, ignore_errors=True)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Serve the terminal games from one process per core")
+    add_arguments(parser)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: one per core)")
+    # Each worker starts its own event writer after the fork
+    argv = configure_events(configure_stats(sys.argv[1:]), start=False)
+    args = parser.parse_args(load_tictactoe().configure_ratings(argv))
+    if not hasattr(os, 'fork'):
+        parser.error("worker processes are forked, which this platform does not support; "
+                     "use game_host.py instead")
+
+    supervisor = Supervisor(args, max(1, args.workers))
+    supervisor.run()
+    print(f"Stopped {supervisor.workers} shards ({supervisor.restarts} restarts)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,545 @@
+"""Telnet-style TCP host for the terminal games.
+
+Serves Tic Tac Toe and Tetris to many players from one process: every
+connection gets its own game session, and all sessions share one asyncio
+event loop. Connect with any telnet client:
+
+    python game_host.py --port 2323
+    telnet localhost 2323
+
+Each session renders to its own ``SessionScreen``, which sends a whole
+screen to the client in one socket write. With ``--time-control`` every
+Tic Tac Toe game is played on the clock; all clocks share one timer wheel
+advanced by a single task.
+
+With ``--snapshot=PATH`` the games in progress are checkpointed to PATH
+every ``--snapshot-interval`` seconds. After a crash or a move to another
+machine the host restores them on startup, and players pick their game up
+again with the resume code shown while they play.
+
+Admission control (``admission.py``) turns connections away when the host
+is full, an address holds too many of them or the event loop lags, and
+rate-limits each client's input; ``--stats-file=host.json`` exposes its
+counters. With ``--ratings=PATH`` finished Tic Tac Toe games update the
+players' Glicko-2 ratings (``ratings.py``), and ``--events-dir=DIR`` logs
+every game (``event_log.py``) for ``game_analysis.py`` and
+``ratings.py recompute``.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Optional
+
+from admission import REJECT_MESSAGES, AdmissionControl, Limits
+from async_terminal import AsyncTicTacToeTerminal, Colors
+from event_log import configure as configure_events
+from game_modules import load_tetris, load_tictactoe
+from instrumentation import STATS, configure as configure_stats
+from snapshot import SNAPSHOTS
+from terminal_io import NullKeyboard, Screen, translate_keys
+from time_control import TimeControl, TimerWheel
+
+# Telnet protocol bytes (RFC 854/857/858)
+IAC, DONT, DO, WONT, WILL, SB, SE = 255, 254, 253, 252, 251, 250, 240
+ECHO, SUPPRESS_GO_AHEAD = 1, 3
+
+# Drop clients that stop reading once this much output is queued
+MAX_OUTPUT_BUFFER = 1 << 20
+# Forget idle addresses' rate limits this often (seconds)
+SWEEP_INTERVAL = 60.0
+
+HOST_MENU = f"""
+{Colors.CYAN}{Colors.BOLD}╔══════════════════════════════════╗
+║         TERMINAL ARCADE          ║
+╚══════════════════════════════════╝{Colors.RESET}
+
+  {Colors.GREEN}1.{Colors.RESET} ⭕ Tic Tac Toe
+  {Colors.GREEN}2.{Colors.RESET} 🧱 Tetris
+  {Colors.GREEN}3.{Colors.RESET} ♻️  Resume a saved game
+  {Colors.GREEN}4.{Colors.RESET} 🚪 Quit
+
+{Colors.YELLOW}Choose a game (1-4): {Colors.RESET}"""
+RESUME_PROMPT = f"{Colors.YELLOW}Enter your resume code: {Colors.RESET}"
+THROTTLED = f"\n{Colors.RED}⚠ Too much input, slow down! Some of it was ignored.{Colors.RESET}"
+
+
+# ============== OUTPUT ==============
+class SessionScreen(Screen):
+    """Screen that sends each frame to a client's stream in one write"""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        super().__init__()
+        self.writer = writer
+        self.closed = False
+
+    def send(self, data: str):
+        if self.closed:
+            return
+        # Telnet needs CRLF line endings
+        self.writer.write(data.replace('\n', '\r\n').encode('utf-8', 'replace'))
+        if self.writer.transport.get_write_buffer_size() > MAX_OUTPUT_BUFFER:
+            self.close()
+
+    def send_raw(self, data: bytes):
+        """Send protocol bytes immediately"""
+        if not self.closed:
+            self.writer.write(data)
+
+    def close(self):
+        self.closed = True
+        self.chunks.clear()
+        self.writer.close()
+
+
+# ============== INPUT DECODING ==============
+class TelnetDecoder:
+    """Strips telnet negotiation from the input byte stream"""
+
+    def __init__(self):
+        self.state = 'data'
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> str:
+        """Return the user text contained in ``data``"""
+        out = bytearray()
+        for byte in data:
+            if self.state == 'data':
+                if byte == IAC:
+                    self.state = 'iac'
+                elif byte != 0:
+                    out.append(byte)
+            elif self.state == 'iac':
+                if byte == IAC:
+                    out.append(IAC)
+                    self.state = 'data'
+                elif byte in (WILL, WONT, DO, DONT):
+                    self.state = 'option'
+                elif byte == SB:
+                    self.state = 'subnegotiation'
+                else:
+                    self.state = 'data'
+            elif self.state == 'option':
+                self.state = 'data'
+            elif self.state == 'subnegotiation':
+                if byte == IAC:
+                    self.state = 'subnegotiation_iac'
+            elif self.state == 'subnegotiation_iac':
+                self.state = 'data' if byte == SE else 'subnegotiation'
+        self.buffer += out
+        # Hold back an incomplete UTF-8 sequence until the rest arrives
+        cut = len(self.buffer)
+        lead = cut - 1
+        while lead >= 0 and (self.buffer[lead] & 0xC0) == 0x80:
+            lead -= 1
+        if lead >= 0 and self.buffer[lead] >= 0xC0:
+            needed = 2 if self.buffer[lead] < 0xE0 else 3 if self.buffer[lead] < 0xF0 else 4
+            if cut - lead < needed:
+                cut = lead
+        text = self.buffer[:cut].decode('utf-8', 'replace')
+        del self.buffer[:cut]
+        return text
+
+
+# ============== SESSIONS ==============
+class Session:
+    """One connected player"""
+
+    def __init__(self, host: 'GameHost', reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 address: str = ''):
+        self.host = host
+        self.reader = reader
+        self.screen = SessionScreen(writer)
+        self.peer = writer.get_extra_info('peername')
+        self.limiter = host.admission.limiter(address)
+        self.decoder = TelnetDecoder()
+        # Same ('line' | 'eof', value) events the async terminal reads
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        self.keys: asyncio.Queue = asyncio.Queue()
+        self.key_mode = False
+        self.closed = False
+
+    def set_key_mode(self, enabled: bool):
+        """Switch the client between line editing and single key presses"""
+        self.key_mode = enabled
+        verb = WILL if enabled else WONT
+        self.screen.send_raw(bytes([IAC, verb, ECHO, IAC, verb, SUPPRESS_GO_AHEAD]))
+
+    async def pump_input(self):
+        """Read the socket and feed the inbox (lines) or key queue, within the rate limits"""
+        limiter = self.limiter
+        admission = self.host.admission
+        pending = ''
+        try:
+            while True:
+                data = await self.reader.read(1024)
+                if not data:
+                    break
+                text = self.decoder.feed(data)
+                if self.key_mode:
+                    for key in translate_keys(text):
+                        if limiter.allow_key():
+                            self.keys.put_nowait(key)
+                else:
+                    pending += text
+                    *lines, pending = pending.split('\n')
+                    for line in lines:
+                        if limiter.allow_line():
+                            self.inbox.put_nowait(('line', line.rstrip('\r')))
+                        elif limiter.dropped_in_row == 1:
+                            self.screen.print(THROTTLED)
+                            self.screen.flush()
+                if limiter.flooding:
+                    admission.count('disconnected.flood')
+                    break
+                if len(pending) > admission.limits.max_line_bytes:
+                    admission.count('disconnected.long_line')
+                    break
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.closed = True
+            self.inbox.put_nowait(('eof', None))
+            self.keys.put_nowait(None)
+
+    async def read_line(self, prompt: str = '') -> str:
+        """Prompt and wait for a line; raises EOFError on disconnect"""
+        self.screen.write(prompt)
+        self.screen.flush()
+        kind, value = await self.inbox.get()
+        if kind == 'eof':
+            raise EOFError
+        return value
+
+    async def next_key(self, timeout: Optional[float] = None) -> str:
+        """Wait for a key press; returns '' on timeout and 'q' on disconnect"""
+        self.screen.flush()
+        if self.closed and self.keys.empty():
+            return 'q'
+        try:
+            key = await asyncio.wait_for(self.keys.get(), timeout)
+        except asyncio.TimeoutError:
+            return ''
+        return 'q' if key is None else key
+
+    async def run(self, resume_code: Optional[str] = None):
+        """Show the game menu until the player leaves, after resuming ``resume_code`` if given"""
+        pump = asyncio.create_task(self.pump_input())
+        try:
+            if resume_code is not None:
+                await self.resume_game(resume_code)
+            while not self.closed:
+                self.screen.clear()
+                choice = (await self.read_line(HOST_MENU)).strip()
+                if choice == '1':
+                    self.host.games_started += 1
+                    await HostedTicTacToeTerminal(self).main_menu()
+                elif choice == '2':
+                    self.host.games_started += 1
+                    await run_tetris(self)
+                elif choice == '3':
+                    await self.resume_game()
+                elif choice == '4':
+                    break
+            self.screen.print(f"\n{Colors.GREEN}Thanks for playing! Goodbye! 👋{Colors.RESET}\n")
+            self.screen.flush()
+        except EOFError:
+            pass
+        finally:
+            pump.cancel()
+            self.screen.close()
+
+    async def resume_game(self, code: Optional[str] = None):
+        """Continue a game restored from the host's snapshot or left by a dropped connection"""
+        if code is None:
+            code = (await self.read_line(RESUME_PROMPT)).strip()
+        if await self.host.hand_off(self, code):
+            return
+        game, tag = self.host.saved.pop(code, (None, None))
+        if game is None:
+            self.screen.print(f"{Colors.RED}No saved game with that code.{Colors.RESET}")
+            self.screen.flush()
+            await asyncio.sleep(1)
+        elif isinstance(game, load_tetris().GameBoard):
+            await run_tetris(self, game)
+        else:
+            await HostedTicTacToeTerminal(self).resume_game(game, tag)
+
+    def print_resume_code(self, game):
+        if SNAPSHOTS.enabled:
+            self.screen.print(f"{Colors.WHITE}Resume code: {Colors.BOLD}{game.game_id}{Colors.RESET}")
+
+
+class HostedTicTacToeTerminal(AsyncTicTacToeTerminal):
+    """Async Tic Tac Toe terminal reading from a network session"""
+
+    # Building the endgame database would stall every session on the loop
+    offer_analysis = False
+
+    def __init__(self, session: Session):
+        super().__init__(session.screen)
+        self.session = session
+        self.inbox = session.inbox
+        self.time_control = session.host.time_control
+        self.timer_wheel = session.host.wheel
+        self.tracked = None  # Game being checkpointed for this session
+
+    def start_input(self):
+        # The session already feeds the inbox from the socket
+        pass
+
+    def start_robot_game(self, difficulty):
+        super().start_robot_game(difficulty)
+        self.track_game()
+
+    def start_friend_game(self, player1, player2):
+        super().start_friend_game(player1, player2)
+        self.track_game()
+
+    def restart_game(self):
+        super().restart_game()
+        self.track_game()
+
+    def track_game(self):
+        """Checkpoint the current game in place of the previous one"""
+        if not SNAPSHOTS.enabled:
+            return
+        if self.tracked is not None:
+            SNAPSHOTS.forget(self.tracked)
+        self.tracked = self.game
+        SNAPSHOTS.track(self.game, self.ai.difficulty if self.ai else '')
+
+    async def resume_game(self, game, tag: str):
+        """Play on a restored game; ``tag`` is the robot's difficulty, if any"""
+        self.game = game
+        self.ai = self.create_ai(tag) if tag else None
+        if tag:
+            game.bots = {'O': tag}
+        self.player_name = game.players['X']
+        self.start_clock(game)
+        self.track_game()
+        return await self.play_game()
+
+    async def play_game(self):
+        try:
+            return await super().play_game()
+        finally:
+            game = self.tracked
+            if game is not None:
+                if self.session.closed and not game.game_over:
+                    # Dropped connection: keep the game to resume, with the clock stopped
+                    if game.clock is not None:
+                        game.saved_clock = game.clock.banks()
+                        game.clock.stop()
+                        game.clock = None
+                    self.session.host.saved[game.game_id] = (game, self.ai.difficulty if self.ai else '')
+                else:
+                    SNAPSHOTS.forget(game)
+                self.tracked = None
+
+    def print_turn_banner(self):
+        super().print_turn_banner()
+        self.session.print_resume_code(self.game)
+
+    def create_ai(self, difficulty):
+        # Pause with asyncio instead of sleeping in a shared executor thread,
+        # and keep MCTS in-process so sessions do not each start a pool
+        ai = super().create_ai(difficulty)
+        ai.think_delay = False
+        ai.mcts_options = {'time_budget': 0.5, 'workers': 1}
+        return ai
+
+    async def next_event(self):
+        self.session.screen.flush()
+        return await super().next_event()
+
+
+async def run_tetris(session: Session, board=None):
+    """Play one Tetris game over the session, on a restored ``board`` if given"""
+    tetris = load_tetris()
+    game = tetris.TetrisGame(session.screen, NullKeyboard(), board)
+    if SNAPSHOTS.enabled:
+        SNAPSHOTS.track(game.board)
+    renderer = game.renderer
+    session.set_key_mode(True)
+    try:
+        renderer.clear_screen()
+        renderer.draw_title()
+        session.print_resume_code(game.board)
+        for i in range(3, 0, -1):
+            session.screen.print(f"\n{tetris.Colors.BRIGHT_YELLOW}Game starts in {i}...{tetris.Colors.RESET}")
+            session.screen.flush()
+            await asyncio.sleep(1)
+        game.last_tick_time = time.time()
+
+        while not game.board.game_over and not session.closed:
+            game.update()
+            renderer.render(game.board.get_game_state())
+            key = await session.next_key(0.1)
+            if key == 'p':
+                renderer.clear_screen()
+                session.screen.print(f"\n{tetris.Colors.YELLOW}Game Paused. Press any key to continue...{tetris.Colors.RESET}")
+                await session.next_key()
+                game.last_tick_time = time.time()
+            elif key and not game.handle_input(key):
+                session.screen.print(f"\n{tetris.Colors.YELLOW}Thanks for playing!{tetris.Colors.RESET}")
+                break
+
+        renderer.render(game.board.get_game_state())
+        renderer.draw_game_over(game.board.score)
+        await session.next_key()
+    finally:
+        session.set_key_mode(False)
+        if SNAPSHOTS.enabled:
+            if session.closed and not game.board.game_over:
+                session.host.saved[game.board.game_id] = (game.board, '')
+            else:
+                SNAPSHOTS.forget(game.board)
+
+
+# ============== SERVER ==============
+class GameHost:
+    """Accepts connections and runs a session for each"""
+
+    def __init__(self, max_sessions: int = 500, time_control: Optional[TimeControl] = None,
+                 snapshot_interval: float = 1.0, limits: Optional[Limits] = None):
+        self.admission = AdmissionControl(limits, max_sessions)
+        self.sessions = set()
+        self.games_started = 0
+        self.time_control = time_control
+        self.wheel = TimerWheel()  # Every game clock on this host
+        self.snapshot_interval = snapshot_interval
+        self.saved = {}  # Restored games waiting to be resumed: game_id -> (game, tag)
+        self.label = 'Game host'
+
+    def restore_games(self, path: str):
+        """Checkpoint games to ``path``, first loading the games saved there"""
+        started = time.perf_counter()
+        SNAPSHOTS.enable(path)
+        self.saved = SNAPSHOTS.restore()
+        print(f"Restored {len(self.saved)} games from {path} in "
+              f"{(time.perf_counter() - started) * 1000:.0f} ms", file=sys.stderr)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                                resume_code: Optional[str] = None):
+        """Run one client's session, unless admission control turns it away"""
+        address = (writer.get_extra_info('peername') or ('',))[0]
+        reason = self.admission.admit(address)
+        if reason is not None:
+            writer.write(REJECT_MESSAGES[reason].encode() + b"\r\n")
+            writer.close()
+            return
+
+        session = Session(self, reader, writer, address)
+        self.sessions.add(session)
+        try:
+            await session.run(resume_code)
+        except Exception as e:
+            print(f"Session {session.peer} failed: {e!r}", file=sys.stderr)
+        finally:
+            self.sessions.discard(session)
+            self.admission.release(address)
+
+    async def hand_off(self, session: Session, game_id: str) -> bool:
+        """Pass ``session`` to the process that owns ``game_id``; False to serve it here"""
+        return False
+
+    async def serve(self, host: Optional[str] = None, port: Optional[int] = None, sock=None):
+        """Listen on ``host:port``, or on an already listening ``sock``, until cancelled"""
+        server = await asyncio.start_server(self.handle_connection, host, port, sock=sock)
+        addresses = ', '.join(str(sock.getsockname()) for sock in server.sockets)
+        print(f"{self.label} listening on {addresses}", file=sys.stderr)
+        tasks = [asyncio.create_task(self.run_wheel()), asyncio.create_task(self.monitor_load())]
+        if SNAPSHOTS.enabled:
+            tasks.append(asyncio.create_task(self.run_snapshots()))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def run_wheel(self):
+        """Advance the shared timer wheel once per tick"""
+        while True:
+            await asyncio.sleep(self.wheel.tick)
+            self.wheel.advance()
+
+    async def monitor_load(self, interval: float = 0.1):
+        """Sample event loop lag for load shedding; also forgets idle addresses, dumps stats and saves ratings"""
+        loop = asyncio.get_running_loop()
+        sweep_at = loop.time() + SWEEP_INTERVAL
+        ratings = load_tictactoe().RATINGS
+        saving = None  # Ratings write in progress
+        if ratings.enabled:
+            ratings.autosave = False  # Not from inside a move, on the loop
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            now = loop.time()
+            self.admission.record_lag(max(0.0, now - expected))
+            if now >= sweep_at:
+                self.admission.sweep()
+                sweep_at = now + SWEEP_INTERVAL
+            if STATS.enabled:
+                STATS.maybe_dump()
+            if ratings.enabled and ratings.due() and (saving is None or saving.done()):
+                # Copy the ratings here, encode and write them in a thread
+                from ratings import write_ratings
+                saving = loop.run_in_executor(None, write_ratings, ratings.path, ratings.checkpoint())
+
+    async def run_snapshots(self):
+        """Checkpoint the games that changed, once per interval"""
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            SNAPSHOTS.capture()
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Host options, shared with ``game_cluster.py``"""
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=2323)
+    parser.add_argument('--max-sessions', type=int, default=500)
+    parser.add_argument('--time-control', type=TimeControl.parse, default=None,
+                        help="clock for Tic Tac Toe games, e.g. 180+2 or move=10")
+    parser.add_argument('--snapshot', metavar='PATH',
+                        help="checkpoint games in progress to PATH and restore them on startup")
+    parser.add_argument('--snapshot-interval', type=float, default=1.0, metavar='SECONDS')
+    limits = Limits()
+    parser.add_argument('--max-per-ip', type=int, default=limits.max_per_ip,
+                        help="concurrent connections per IP address")
+    parser.add_argument('--line-rate', type=float, default=limits.line_rate,
+                        help="typed lines per second per connection (four times that per IP address)")
+    parser.add_argument('--key-rate', type=float, default=limits.key_rate,
+                        help="key presses per second per connection (four times that per IP address)")
+    parser.add_argument('--max-lag', type=float, default=limits.max_lag, metavar='SECONDS',
+                        help="turn new connections away while the event loop lags more than this")
+
+
+def limits_from(args: argparse.Namespace) -> Limits:
+    """Rate limits from the command line; bursts scale with the rates"""
+    defaults = Limits()
+    return Limits(line_rate=args.line_rate, line_burst=args.line_rate * defaults.line_burst / defaults.line_rate,
+                  key_rate=args.key_rate, key_burst=args.key_rate * defaults.key_burst / defaults.key_rate,
+                  max_per_ip=args.max_per_ip, max_lag=args.max_lag)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Serve the terminal games over telnet")
+    add_arguments(parser)
+    args = parser.parse_args(load_tictactoe().configure_ratings(configure_events(configure_stats(sys.argv[1:]))))
+
+    host = GameHost(args.max_sessions, args.time_control, args.snapshot_interval, limits_from(args))
+    if args.snapshot:
+        host.restore_games(args.snapshot)
+    try:
+        asyncio.run(host.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        SNAPSHOTS.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+"""Import helpers for the game scripts.
+
+``Tictac toe.py`` has a space in its file name, so tools that need its
+classes load it through here instead of a plain ``import``.
+"""
+import importlib.util
+import os
+import sys
+
+GAME_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_tictactoe():
+    """Load ``Tictac toe.py`` once and register it as ``tictactoe``"""
+    module = sys.modules.get('tictactoe')
+    if module is not None:
+        return module
+
+    path = os.path.join(GAME_DIR, 'Tictac toe.py')
+    spec = importlib.util.spec_from_file_location('tictactoe', path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['tictactoe'] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_tetris():
+    """Load ``Tetris.py``"""
+    if GAME_DIR not in sys.path:
+        sys.path.insert(0, GAME_DIR)
+    import Tetris
+    return Tetris
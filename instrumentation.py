@@ -0,0 +1,188 @@
+"""Opt-in counters and timing histograms for the terminal games.
+
+Instrumentation is off by default. Turn it on with the ``--stats`` flag or
+the ``GAME_STATS=1`` environment variable:
+
+    GAME_STATS=1 GAME_STATS_FILE=stats.json python Tetris.py
+    python "Tictac toe.py" --stats --stats-overlay
+
+Hot paths guard every call with ``if STATS.enabled:`` so that disabled
+instrumentation costs a single attribute check.
+"""
+import atexit
+import os
+import time
+from typing import Dict, List, Optional
+
+# Histogram buckets are powers of two in microseconds (bucket i < 2**i us)
+HISTOGRAM_BUCKETS = 32
+
+
+class Histogram:
+    """Log2-bucketed timing histogram"""
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+
+    def observe(self, seconds: float):
+        """Record one timing in seconds"""
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        bucket = min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)
+        self.buckets[bucket] += 1
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the given percentile, in seconds"""
+        if not self.count:
+            return 0.0
+        target = self.count * pct / 100
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return min((1 << i) / 1e6, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        """Summary statistics in seconds"""
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'min': self.min if self.count else 0.0,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+        }
+
+
+class _Timer:
+    """Context manager that records its duration into a histogram"""
+    __slots__ = ('stats', 'name', 'start')
+
+    def __init__(self, stats: 'Stats', name: str):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Stats:
+    """Process-wide counters and histograms"""
+
+    def __init__(self):
+        self.enabled = False
+        self.overlay = False
+        self.path: Optional[str] = None
+        self.interval = 5.0
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.started = time.time()
+        self._last_dump = time.monotonic()
+
+    def enable(self, path: Optional[str] = None, interval: float = 5.0, overlay: bool = False):
+        """Start collecting; dump to ``path`` every ``interval`` seconds"""
+        self.enabled = True
+        self.overlay = overlay
+        self.path = path
+        self.interval = interval
+        if path:
+            atexit.register(self.dump)
+
+    def incr(self, name: str, amount: int = 1):
+        """Increase a counter"""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, seconds: float):
+        """Add a timing to a histogram"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+    def timer(self, name: str) -> _Timer:
+        """Time a block: ``with STATS.timer('render'):``"""
+        return _Timer(self, name)
+
+    def snapshot(self) -> dict:
+        """Current counters and histogram summaries"""
+        return {
+            'uptime': time.time() - self.started,
+            'counters': dict(self.counters),
+            'histograms': {name: h.summary() for name, h in self.histograms.items()},
+        }
+
+    def dump(self):
+        """Write a snapshot to the stats file"""
+        if not self.path:
+            return
+        import json
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._last_dump = time.monotonic()
+
+    def maybe_dump(self):
+        """Dump if the interval has passed; call this once per frame or turn"""
+        if self.path and time.monotonic() - self._last_dump >= self.interval:
+            self.dump()
+
+    def overlay_lines(self) -> List[str]:
+        """Compact text lines for an in-game debug overlay"""
+        lines = [f"{name}: {value}" for name, value in sorted(self.counters.items())]
+        for name, histogram in sorted(self.histograms.items()):
+            summary = histogram.summary()
+            lines.append(f"{name}: n={summary['count']} p50={summary['p50'] * 1e3:.2f}ms "
+                         f"p99={summary['p99'] * 1e3:.2f}ms max={summary['max'] * 1e3:.2f}ms")
+        return lines
+
+
+STATS = Stats()
+
+
+def configure(argv: Optional[List[str]] = None) -> List[str]:
+    """Enable stats from the environment or command line flags.
+
+    Recognizes ``--stats``, ``--stats-file=PATH``, ``--stats-interval=SECONDS``
+    and ``--stats-overlay`` (and the matching ``GAME_STATS*`` variables), and
+    returns the remaining arguments.
+    """
+    env = os.environ
+    enabled = env.get('GAME_STATS', '') not in ('', '0')
+    path = env.get('GAME_STATS_FILE')
+    interval = float(env.get('GAME_STATS_INTERVAL', 5.0))
+    overlay = env.get('GAME_STATS_OVERLAY', '') not in ('', '0')
+
+    remaining = []
+    for arg in argv or []:
+        if arg == '--stats':
+            enabled = True
+        elif arg.startswith('--stats-file='):
+            enabled, path = True, arg.split('=', 1)[1]
+        elif arg.startswith('--stats-interval='):
+            interval = float(arg.split('=', 1)[1])
+        elif arg == '--stats-overlay':
+            enabled = overlay = True
+        else:
+            remaining.append(arg)
+
+    if path or overlay:
+        enabled = True
+    if enabled:
+        STATS.enable(path, interval, overlay)
+    return remaining
@@ -0,0 +1,199 @@
+"""Monte Carlo Tree Search for Tic Tac Toe and larger k-in-a-row boards.
+
+UCT search with a per-move time or iteration budget, used by the
+``mcts`` robot difficulty:
+
+    mcts = MonteCarloTreeSearch(time_budget=1.0)
+    move = mcts.search(board, 'O')
+
+The tree is kept between moves. By default the search runs in-process;
+with ``workers > 1`` extra searches run on a process pool (root
+parallelism) and their root statistics are merged. The pool is started
+on first use and shut down by ``close()`` or at exit. Its worker entry
+point lives here, so any multiprocessing start method can import it.
+"""
+import atexit
+import math
+import random
+import time
+
+from instrumentation import STATS
+
+# Rows, columns and diagonals of the 3x3 board
+TICTACTOE_PATTERNS = ([[row * 3 + col for col in range(3)] for row in range(3)]
+                      + [[row * 3 + col for row in range(3)] for col in range(3)]
+                      + [[0, 4, 8], [2, 4, 6]])
+
+
+def mcts_winner(board, patterns):
+    """Return the winning mark, 'Tie', or None while the game is open"""
+    for a, *rest in patterns:
+        mark = board[a]
+        if mark != ' ' and all(board[i] == mark for i in rest):
+            return mark
+    return 'Tie' if ' ' not in board else None
+
+
+class MCTSNode:
+    """Node in the Monte Carlo search tree"""
+    __slots__ = ('board', 'player', 'parent', 'move', 'children', 'untried',
+                 'visits', 'wins', 'winner')
+
+    def __init__(self, board, player, patterns, parent=None, move=None):
+        self.board = board            # tuple of ' ', 'X', 'O'
+        self.player = player          # side to move at this node
+        self.parent = parent
+        self.move = move              # move that led here
+        self.children = []
+        self.winner = mcts_winner(board, patterns)
+        self.untried = [] if self.winner else [i for i, c in enumerate(board) if c == ' ']
+        self.visits = 0
+        self.wins = 0.0               # from the point of view of the side that moved here
+
+    def best_child(self, exploration):
+        """Select a child with the UCT formula"""
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda c: c.wins / c.visits
+                   + exploration * math.sqrt(log_visits / c.visits))
+
+
+class MonteCarloTreeSearch:
+    """UCT search with a per-move time or iteration budget.
+
+    Works on any board size given matching win patterns. The tree is kept
+    between moves, and with ``workers > 1`` extra searches run in other
+    processes (root parallelism) and their root statistics are merged.
+    """
+
+    def __init__(self, time_budget=1.0, iterations=None, workers=1,
+                 exploration=1.41, patterns=TICTACTOE_PATTERNS, seed=None):
+        self.time_budget = time_budget
+        self.iterations = iterations
+        self.workers = workers
+        self.exploration = exploration
+        self.patterns = patterns
+        self.rng = random.Random(seed)
+        self.root = None
+        self._pool = None
+
+    def search(self, board, player, time_budget=None):
+        """Return the best move for ``player`` on ``board``
+        
+        ``time_budget`` caps the configured budget for this move only, e.g.
+        when a game clock is running low.
+        """
+        root = self._reuse_root(tuple(board), player)
+        if time_budget is None or (self.time_budget and self.time_budget < time_budget):
+            time_budget = self.time_budget
+
+        futures = []
+        if self.workers > 1:
+            pool = self._get_pool()
+            for _ in range(self.workers - 1):
+                futures.append(pool.submit(mcts_root_statistics, root.board, player,
+                                           time_budget, self.iterations,
+                                           self.rng.getrandbits(32), self.exploration,
+                                           self.patterns))
+
+        iterations = self.run(root, time_budget, self.iterations)
+        if STATS.enabled:
+            STATS.incr('ai.mcts_iterations', iterations)
+
+        visits = {child.move: child.visits for child in root.children}
+        for future in futures:
+            for move, (child_visits, _) in future.result().items():
+                visits[move] = visits.get(move, 0) + child_visits
+
+        move = max(visits, key=visits.get)
+        self.root = next((c for c in root.children if c.move == move), None)
+        return move
+
+    def run(self, root, time_budget=None, iterations=None):
+        """Grow the tree from ``root`` until the budget is spent"""
+        deadline = time.perf_counter() + time_budget if time_budget else None
+        count = 0
+        while True:
+            if iterations is not None and count >= iterations:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            if iterations is None and deadline is None:
+                break
+            self._iterate(root)
+            count += 1
+        return count
+
+    def _iterate(self, root):
+        """One selection, expansion, rollout and backpropagation pass"""
+        node = root
+        while not node.untried and node.children:
+            node = node.best_child(self.exploration)
+
+        if node.untried:
+            move = node.untried.pop(self.rng.randrange(len(node.untried)))
+            board = list(node.board)
+            board[move] = node.player
+            child = MCTSNode(tuple(board), 'O' if node.player == 'X' else 'X',
+                             self.patterns, node, move)
+            node.children.append(child)
+            node = child
+
+        winner = node.winner or self._rollout(node)
+
+        while node is not None:
+            node.visits += 1
+            mover = 'O' if node.player == 'X' else 'X'
+            if winner == mover:
+                node.wins += 1
+            elif winner == 'Tie':
+                node.wins += 0.5
+            node = node.parent
+
+    def _rollout(self, node):
+        """Play random moves to the end of the game"""
+        board = list(node.board)
+        player = node.player
+        moves = [i for i, c in enumerate(board) if c == ' ']
+        self.rng.shuffle(moves)
+        for move in moves:
+            board[move] = player
+            winner = mcts_winner(board, self.patterns)
+            if winner:
+                return winner
+            player = 'O' if player == 'X' else 'X'
+        return 'Tie'
+
+    def _reuse_root(self, board, player):
+        """Find the current position in the kept tree, or start a new one"""
+        if self.root is not None:
+            for node in [self.root] + self.root.children:
+                if node.board == board and node.player == player:
+                    node.parent = None
+                    return node
+        return MCTSNode(board, player, self.patterns)
+
+    def _get_pool(self):
+        """Create the rollout process pool on first use"""
+        if self._pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(max_workers=self.workers - 1)
+            atexit.register(self.close)
+        return self._pool
+
+    def reset(self):
+        """Forget the kept tree (e.g. when a new game starts)"""
+        self.root = None
+
+    def close(self):
+        """Shut down the rollout process pool"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def mcts_root_statistics(board, player, time_budget, iterations, seed, exploration, patterns):
+    """Run an independent search in a worker process and report root children"""
+    mcts = MonteCarloTreeSearch(time_budget, iterations, 1, exploration, patterns, seed)
+    root = MCTSNode(tuple(board), player, patterns)
+    mcts.run(root, time_budget, iterations)
+    return {child.move: (child.visits, child.wins) for child in root.children}
@@ -0,0 +1,569 @@
+"""Glicko-2 ratings for Tic Tac Toe players and bots.
+
+Ratings are off by default. Turn them on with ``--ratings=PATH`` or the
+``GAME_RATINGS_FILE`` environment variable:
+
+    python "Tictac toe.py" --ratings=ratings.json
+    python game_host.py --ratings=ratings.json
+
+Every finished game then updates both players at once
+(``RATINGS.record_game``, guarded by ``if RATINGS.enabled:`` like
+``STATS``), the leaderboard shows the ratings and the robot difficulty
+labels show the bots' measured ratings. Robots are rated as
+``bot:<difficulty>`` and humans as ``human:<name>``, so no player name can
+pass for a robot. Live updates treat every game as a
+rating period of its own, with a player's rating deviation growing with
+the time since their last game.
+
+The batch mode rebuilds every rating from the event log (``--events-dir``)
+in rating periods of ``--period`` seconds, as Glicko-2 intends: all games
+of a period are rated against the ratings at its start. A period costs a
+few NumPy operations over its games, so millions of results take seconds,
+most of it reading the log. ``calibrate`` measures the bots by playing
+them against each other on a process pool.
+
+    python ratings.py recompute events/ --output ratings.json
+    python ratings.py calibrate --output ratings.json
+    python ratings.py show ratings.json
+
+The batch modes require NumPy (``pip install numpy``). The games only
+import this module once ratings are turned on, so the batch tooling is
+imported inside the functions that use it.
+"""
+import atexit
+import json
+import math
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from instrumentation import STATS
+
+SCALE = 173.7178             # Rating points per Glicko-2 unit
+DEFAULT_RATING = 1500.0
+DEFAULT_RD = 350.0
+DEFAULT_VOLATILITY = 0.06
+MAX_PHI = DEFAULT_RD / SCALE
+TAU = 0.5                    # Limits how fast volatility changes
+EPSILON = 1e-6               # Tolerance of the volatility solve
+MAX_ITERATIONS = 100
+PERIOD = 86400.0             # Seconds per rating period
+SAVE_INTERVAL = 5.0
+BOT_PREFIX = 'bot:'
+HUMAN_PREFIX = 'human:'
+SCORES = {'X': 1.0, 'O': 0.0, 'Tie': 0.5}  # Score of X by winner
+
+
+# ============== DATA MODELS ==============
+@dataclass
+class Rating:
+    """Glicko-2 state of one player, on the familiar 1500 scale"""
+    rating: float = DEFAULT_RATING
+    rd: float = DEFAULT_RD
+    volatility: float = DEFAULT_VOLATILITY
+    games: int = 0
+    wins: int = 0
+    draws: int = 0
+    losses: int = 0
+    updated: float = 0.0     # When the last rated game ended
+
+    @property
+    def conservative(self) -> float:
+        """Rating the player is very likely above; the leaderboard ranks by it"""
+        return self.rating - 2 * self.rd
+
+    def phi_at(self, now: float, period: float = PERIOD) -> float:
+        """Glicko-2 deviation grown by the rating periods since the last game"""
+        phi = self.rd / SCALE
+        if not self.games:
+            return phi
+        idle = max(0.0, now - self.updated) / period
+        return min(math.sqrt(phi * phi + self.volatility ** 2 * idle), MAX_PHI)
+
+    def tally(self, score: float):
+        self.games += 1
+        if score == 1.0:
+            self.wins += 1
+        elif score == 0.0:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+
+def player_ids(players: Dict[str, str], bots: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Rating ids of both sides: ``human:<name>``, or ``bot:<difficulty>`` for a robot"""
+    bots = bots or {}
+    return {mark: BOT_PREFIX + bots[mark] if mark in bots else HUMAN_PREFIX + players[mark]
+            for mark in ('X', 'O')}
+
+
+# ============== GLICKO-2 ==============
+def g(phi: float) -> float:
+    return 1.0 / math.sqrt(1.0 + 3.0 * phi * phi / (math.pi * math.pi))
+
+
+def new_volatility(sigma: float, phi: float, v: float, delta: float, tau: float = TAU) -> float:
+    """Step 5 of Glickman's Glicko-2 paper, solved with the Illinois method"""
+    a = math.log(sigma * sigma)
+    phi2, delta2 = phi * phi, delta * delta
+
+    def f(x):
+        ex = math.exp(x)
+        return ex * (delta2 - phi2 - v - ex) / (2.0 * (phi2 + v + ex) ** 2) - (x - a) / (tau * tau)
+
+    low = a
+    if delta2 > phi2 + v:
+        high = math.log(delta2 - phi2 - v)
+    else:
+        k = 1
+        while f(a - k * tau) < 0:
+            k += 1
+        high = a - k * tau
+    f_low, f_high = f(low), f(high)
+    for _ in range(MAX_ITERATIONS):
+        if abs(high - low) <= EPSILON:
+            break
+        mid = low + (low - high) * f_low / (f_high - f_low)
+        f_mid = f(mid)
+        if f_mid * f_high <= 0:
+            low, f_low = high, f_high
+        else:
+            f_low /= 2
+        high, f_high = mid, f_mid
+    return math.exp(low / 2)
+
+
+def update(mu: float, phi: float, sigma: float,
+           games: Sequence[Tuple[float, float, float]]) -> Tuple[float, float, float]:
+    """One rating period of one player; ``games`` holds (opponent mu, opponent phi, score)"""
+    v_inverse = total = 0.0
+    for mu_j, phi_j, score in games:
+        g_j = g(phi_j)
+        expected = 1.0 / (1.0 + math.exp(-g_j * (mu - mu_j)))
+        v_inverse += g_j * g_j * expected * (1.0 - expected)
+        total += g_j * (score - expected)
+    v = 1.0 / v_inverse
+    sigma = new_volatility(sigma, phi, v, v * total)
+    phi_star = math.sqrt(phi * phi + sigma * sigma)
+    phi = 1.0 / math.sqrt(1.0 / (phi_star * phi_star) + 1.0 / v)
+    return mu + phi * phi * total, phi, sigma
+
+
+# ============== LIVE RATINGS ==============
+class RatingStore:
+    """Process-wide ratings, kept in a JSON file"""
+
+    def __init__(self):
+        self.enabled = False
+        self.path: Optional[str] = None
+        self.period = PERIOD
+        self.players: Dict[str, Rating] = {}
+        self.dirty = False
+        self.saved_at = 0.0
+        # record_game saves now and then; game_host.py saves off its event loop instead
+        self.autosave = True
+
+    def enable(self, path: str, period: float = PERIOD):
+        """Load ``path`` if it exists and rate games from now on"""
+        if self.enabled:
+            return
+        self.period = period
+        self.load(path)
+        self.enabled = True
+        atexit.register(self.close)
+
+    def load(self, path: str):
+        """Switch to the ratings file ``path``"""
+        self.path = path
+        self.players = load_ratings(path) if os.path.exists(path) else {}
+        self.dirty = False
+
+    def get(self, player_id: str) -> Rating:
+        rating = self.players.get(player_id)
+        if rating is None:
+            rating = self.players[player_id] = Rating()
+        return rating
+
+    def record(self, x_id: str, o_id: str, score: float, now: Optional[float] = None):
+        """Rate one game; ``score`` is X's (1 win, 0.5 draw, 0 loss)"""
+        now = time.time() if now is None else now
+        x, o = self.get(x_id), self.get(o_id)
+        x_mu, o_mu = (x.rating - DEFAULT_RATING) / SCALE, (o.rating - DEFAULT_RATING) / SCALE
+        x_phi, o_phi = x.phi_at(now, self.period), o.phi_at(now, self.period)
+        for rating, mu, phi, opponent in ((x, x_mu, x_phi, (o_mu, o_phi, score)),
+                                          (o, o_mu, o_phi, (x_mu, x_phi, 1.0 - score))):
+            mu, phi, rating.volatility = update(mu, phi, rating.volatility, [opponent])
+            rating.rating = DEFAULT_RATING + SCALE * mu
+            rating.rd = SCALE * phi
+            rating.updated = now
+        x.tally(score)
+        o.tally(1.0 - score)
+        self.dirty = True
+
+    def record_game(self, game):
+        """Rate a finished ``TicTacToeGame`` once, even if it is taken back and finished again"""
+        if game.rated or game.winner not in SCORES:
+            return
+        game.rated = True
+        ids = player_ids(game.players, game.bots)
+        if ids['X'] == ids['O']:
+            return
+        self.record(ids['X'], ids['O'], SCORES[game.winner])
+        if STATS.enabled:
+            STATS.incr('ratings.games')
+        if self.autosave:
+            self.maybe_save()
+
+    def bot_rating(self, difficulty: str) -> Optional[Rating]:
+        """Measured rating of a robot difficulty, if it has played"""
+        rating = self.players.get(BOT_PREFIX + difficulty)
+        return rating if rating is not None and rating.games else None
+
+    def leaderboard(self, limit: int = 10) -> List[Tuple[str, Rating]]:
+        """Best players first, ranked by ``Rating.conservative``"""
+        rated = [(player_id, rating) for player_id, rating in self.players.items() if rating.games]
+        rated.sort(key=lambda entry: entry[1].conservative, reverse=True)
+        return rated[:limit]
+
+    def due(self) -> bool:
+        """Whether anything changed and the last save was a while ago"""
+        return self.dirty and time.monotonic() - self.saved_at >= SAVE_INTERVAL
+
+    def maybe_save(self):
+        if self.due():
+            self.save()
+
+    def checkpoint(self) -> dict:
+        """Copy of the ratings for ``write_ratings``, counted as saved"""
+        data = ratings_data(self.players, self.period)
+        self.dirty = False
+        self.saved_at = time.monotonic()
+        return data
+
+    def save(self):
+        write_ratings(self.path, self.checkpoint())
+
+    def close(self):
+        """Save what changed"""
+        if self.enabled and self.dirty:
+            self.save()
+
+
+RATINGS = RatingStore()
+
+
+def load_ratings(path: str) -> Dict[str, Rating]:
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return {player_id: Rating(**fields) for player_id, fields in data['players'].items()}
+
+
+def ratings_data(players: Dict[str, Rating], period: float = PERIOD) -> dict:
+    """Contents of a ratings file, copied out of the live ratings"""
+    return {'period': period, 'players': {player_id: dict(vars(rating)) for player_id, rating in players.items()}}
+
+
+def write_ratings(path: str, data: dict):
+    """Write a ratings file atomically"""
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def save_ratings(path: str, players: Dict[str, Rating], period: float = PERIOD):
+    write_ratings(path, ratings_data(players, period))
+
+
+def configure(argv: Optional[List[str]] = None) -> List[str]:
+    """Enable ratings from the environment or command line flags.
+
+    Recognizes ``--ratings=PATH`` and ``--ratings-period=SECONDS`` (and
+    ``GAME_RATINGS_FILE`` / ``GAME_RATINGS_PERIOD``), and returns the
+    remaining arguments.
+    """
+    env = os.environ
+    path = env.get('GAME_RATINGS_FILE')
+    period = float(env.get('GAME_RATINGS_PERIOD', PERIOD))
+
+    remaining = []
+    for arg in argv or []:
+        if arg.startswith('--ratings='):
+            path = arg.split('=', 1)[1]
+        elif arg.startswith('--ratings-period='):
+            period = float(arg.split('=', 1)[1])
+        else:
+            remaining.append(arg)
+
+    if path:
+        RATINGS.enable(path, period)
+    return remaining
+
+
+# ============== BATCH RECOMPUTATION ==============
+def new_volatilities(np, sigma, phi, v, delta, tau: float = TAU):
+    """``new_volatility`` of many players at once; each stops iterating once it converges"""
+    a = np.log(sigma * sigma)
+    phi2, delta2 = phi * phi, delta * delta
+
+    def f(x):
+        ex = np.exp(x)
+        return ex * (delta2 - phi2 - v - ex) / (2.0 * (phi2 + v + ex) ** 2) - (x - a) / (tau * tau)
+
+    low = a
+    wide = delta2 > phi2 + v
+    high = np.where(wide, np.log(np.where(wide, delta2 - phi2 - v, 1.0)), a - tau)
+    stepping = ~wide & (f(high) < 0)
+    while stepping.any():
+        high = np.where(stepping, high - tau, high)
+        stepping &= f(high) < 0
+    f_low, f_high = f(low), f(high)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for _ in range(MAX_ITERATIONS):
+            live = np.abs(high - low) > EPSILON
+            if not live.any():
+                break
+            mid = np.where(live, low + (low - high) * f_low / (f_high - f_low), high)
+            f_mid = f(mid)
+            swap = live & (f_mid * f_high <= 0)
+            low, f_low = np.where(swap, high, low), np.where(swap, f_high, np.where(live, f_low / 2, f_low))
+            high, f_high = mid, f_mid
+    return np.exp(low / 2)
+
+
+def batch_ratings(periods, x, o, score, count: int, tau: float = TAU):
+    """Glicko-2 over whole rating periods.
+
+    ``periods`` (sorted), ``x``, ``o`` and ``score`` (X's) are arrays with
+    one entry per game, and players are numbered below ``count``. Returns
+    (mu, phi, sigma, last period played) per player. Idle periods are
+    applied when a player returns, which is the same as growing every
+    idle player's deviation each period.
+    """
+    import numpy as np
+    mu = np.zeros(count)
+    phi = np.full(count, MAX_PHI)
+    sigma = np.full(count, DEFAULT_VOLATILITY)
+    last = np.full(count, -1, dtype=np.int64)
+    bounds = (np.flatnonzero(np.diff(periods)) + 1).tolist()
+    for start, end in zip([0] + bounds, bounds + [len(periods)]):
+        period = periods[start]
+        side = np.concatenate((x[start:end], o[start:end]))
+        opponent = np.concatenate((o[start:end], x[start:end]))
+        scores = np.concatenate((score[start:end], 1.0 - score[start:end]))
+        active, local = np.unique(side, return_inverse=True)
+
+        idle = np.where(last[active] >= 0, period - last[active] - 1, 0)
+        phi_now = np.minimum(np.sqrt(phi[active] ** 2 + sigma[active] ** 2 * idle), MAX_PHI)
+        phi[active] = phi_now
+
+        g_j = 1.0 / np.sqrt(1.0 + 3.0 * phi[opponent] ** 2 / (math.pi * math.pi))
+        expected = 1.0 / (1.0 + np.exp(-g_j * (mu[side] - mu[opponent])))
+        v = 1.0 / np.maximum(np.bincount(local, g_j * g_j * expected * (1.0 - expected), len(active)), 1e-12)
+        total = np.bincount(local, g_j * (scores - expected), len(active))
+
+        new_sigma = new_volatilities(np, sigma[active], phi_now, v, v * total, tau)
+        phi_star2 = phi_now ** 2 + new_sigma ** 2
+        new_phi = 1.0 / np.sqrt(1.0 / phi_star2 + 1.0 / v)
+        mu[active] += new_phi ** 2 * total
+        phi[active] = new_phi
+        sigma[active] = new_sigma
+        last[active] = period
+    return mu, phi, sigma, last
+
+
+def rate_results(times, x_ids: Sequence[str], o_ids: Sequence[str], scores,
+                 period: float = PERIOD, tau: float = TAU) -> Dict[str, Rating]:
+    """Ratings of every player from scratch; one entry per game in each argument"""
+    import numpy as np
+    index: Dict[str, int] = {}
+    x = np.fromiter((index.setdefault(name, len(index)) for name in x_ids), np.int64, len(x_ids))
+    o = np.fromiter((index.setdefault(name, len(index)) for name in o_ids), np.int64, len(o_ids))
+    times = np.asarray(times, dtype=np.float64)
+    score = np.asarray(scores, dtype=np.float64)
+    order = np.argsort(times, kind='stable')
+    x, o, score = x[order], o[order], score[order]
+    periods = np.floor(times[order] / period).astype(np.int64)
+
+    mu, phi, sigma, last = batch_ratings(periods, x, o, score, len(index), tau)
+    count = len(index)
+    wins = np.bincount(x, score == 1.0, count) + np.bincount(o, score == 0.0, count)
+    losses = np.bincount(x, score == 0.0, count) + np.bincount(o, score == 1.0, count)
+    games = np.bincount(x, minlength=count) + np.bincount(o, minlength=count)
+    ratings = {}
+    for player_id, i in index.items():
+        ratings[player_id] = Rating(float(DEFAULT_RATING + SCALE * mu[i]), float(SCALE * phi[i]),
+                                    float(sigma[i]), int(games[i]), int(wins[i]),
+                                    int(games[i] - wins[i] - losses[i]), int(losses[i]),
+                                    float((last[i] + 1) * period))
+    return ratings
+
+
+# ============== ARCHIVES ==============
+def read_file_results(path: str) -> List[tuple]:
+    """(time, game id, X's id, O's id, X's score) of each game ending in one event log file.
+
+    Only end events are decoded; every other line is skipped on a
+    substring test, which is most of the file.
+    """
+    import gzip
+    results = []
+    opener = gzip.open if path.endswith('.gz') else open
+    try:
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if '"end"' not in line or '"tictactoe"' not in line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    break  # Truncated tail of a file still being written
+                if event.get('type') != 'end' or event.get('game') != 'tictactoe':
+                    continue
+                winner, players = event.get('winner'), event.get('players')
+                if winner not in SCORES or not players:
+                    continue
+                ids = player_ids(players, event.get('bots'))
+                if ids['X'] != ids['O']:
+                    results.append((event['t'], event['id'], ids['X'], ids['O'], SCORES[winner]))
+    except (OSError, EOFError):
+        pass  # Unreadable or cut-off gzip file
+    return results
+
+
+def read_results(paths: Iterable[str], workers: int = 1) -> Tuple[list, list, list, list]:
+    """Columns (times, X ids, O ids, X scores) of the games in event log files.
+
+    Files are read on a process pool. A game counts with its first result,
+    as it did live: finishing it again after an undo changes nothing.
+    """
+    from game_analysis import event_files
+    files = event_files(paths)
+    if workers <= 1 or len(files) < 2:
+        return collect_results(map(read_file_results, files))
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return collect_results(pool.map(read_file_results, files))
+
+
+def collect_results(per_file: Iterable[List[tuple]]) -> Tuple[list, list, list, list]:
+    """Columns of ``read_file_results`` lists, keeping the first result of each game"""
+    times, x_ids, o_ids, scores = [], [], [], []
+    seen = set()
+    for results in per_file:
+        for t, game_id, x_id, o_id, score in results:
+            if game_id in seen:
+                continue
+            seen.add(game_id)
+            times.append(t)
+            x_ids.append(x_id)
+            o_ids.append(o_id)
+            scores.append(score)
+    return times, x_ids, o_ids, scores
+
+
+# ============== BOT CALIBRATION ==============
+def play_calibration_game(task: tuple) -> float:
+    """Play one bot game on a worker; returns X's score"""
+    from tournament import play_game
+    x_policy, o_policy, seed = task
+    return SCORES[play_game(x_policy, o_policy, seed)]
+
+
+def calibrate(policies: Sequence[str], rounds: int = 20, games: int = 10,
+              workers: int = 1, seed: int = 0) -> Dict[str, Rating]:
+    """Measure bots by rating a round-robin between them.
+
+    Every round, each ordered pair plays ``games`` games and the round is
+    one rating period; the ratings settle over the rounds.
+    """
+    tasks, periods = [], []
+    for round_number in range(rounds):
+        for x_policy in policies:
+            for o_policy in policies:
+                if x_policy != o_policy:
+                    for game in range(games):
+                        tasks.append((x_policy, o_policy, seed + len(tasks)))
+                        periods.append(round_number)
+    if workers <= 1:
+        scores = list(map(play_calibration_game, tasks))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            scores = list(pool.map(play_calibration_game, tasks,
+                                   chunksize=max(1, len(tasks) // (workers * 4))))
+    bots = rate_results(periods, [BOT_PREFIX + task[0] for task in tasks],
+                        [BOT_PREFIX + task[1] for task in tasks], scores, period=1.0)
+    now = time.time()
+    for rating in bots.values():
+        rating.updated = now  # Rounds are not real time; the ratings hold from now on
+    return bots
+
+
+# ============== ENTRY POINT ==============
+def print_ratings(players: Dict[str, Rating], limit: int):
+    ranked = sorted(players.items(), key=lambda entry: entry[1].conservative, reverse=True)
+    print(f"{'#':>4}  {'player':<24} {'rating':>6} {'rd':>5} {'vol':>6} {'games':>7}  W-D-L")
+    for rank, (player_id, rating) in enumerate(ranked[:limit], 1):
+        print(f"{rank:>4}  {player_id[:24]:<24} {rating.rating:6.0f} {rating.rd:5.0f} {rating.volatility:6.3f} "
+              f"{rating.games:7}  {rating.wins}-{rating.draws}-{rating.losses}")
+
+
+def main():
+    """Command line entry point"""
+    import argparse
+    parser = argparse.ArgumentParser(description="Glicko-2 ratings for Tic Tac Toe players and bots")
+    commands = parser.add_subparsers(dest='command', required=True)
+    recompute = commands.add_parser('recompute', help="rebuild every rating from the event log")
+    recompute.add_argument('paths', nargs='+', help="event log files or directories (see --events-dir)")
+    recompute.add_argument('--period', type=float, default=PERIOD, metavar='SECONDS',
+                           help="length of a rating period (default: a day)")
+    recompute.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    recompute.add_argument('--output', metavar='PATH', help="write the ratings file (keeps calibrated bots)")
+    bots = commands.add_parser('calibrate', help="measure the robot difficulties against each other")
+    bots.add_argument('--policies', nargs='+', default=None, metavar='POLICY',
+                      help="RobotAI difficulties to measure (default: every tournament bot)")
+    bots.add_argument('--rounds', type=int, default=20)
+    bots.add_argument('--games', type=int, default=10, help="games per ordered pair per round")
+    bots.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    bots.add_argument('--seed', type=int, default=0)
+    bots.add_argument('--output', metavar='PATH', help="merge the bot ratings into this ratings file")
+    show = commands.add_parser('show', help="print a ratings file")
+    show.add_argument('path')
+    for command in (recompute, bots, show):
+        command.add_argument('--top', type=int, default=20, help="players to print")
+    args = parser.parse_args()
+
+    started = time.time()
+    if args.command == 'show':
+        print_ratings(load_ratings(args.path), args.top)
+        return
+    if args.command == 'recompute':
+        times, x_ids, o_ids, scores = read_results(args.paths, args.workers)
+        read_time = time.time() - started
+        players = rate_results(times, x_ids, o_ids, scores, args.period) if times else {}
+        summary = f"{len(times)} games, {len(players)} players (read {read_time:.1f}s, "
+        if args.output and os.path.exists(args.output):
+            # Bots measured by calibrate keep their ratings unless the log has their games
+            for player_id, rating in load_ratings(args.output).items():
+                if player_id.startswith(BOT_PREFIX):
+                    players.setdefault(player_id, rating)
+    else:
+        from tournament import BUILTIN_POLICIES
+        players = calibrate(args.policies or list(BUILTIN_POLICIES), args.rounds, args.games,
+                            args.workers, args.seed)
+        summary = f"{sum(rating.games for rating in players.values()) // 2} games, {len(players)} bots ("
+        if args.output and os.path.exists(args.output):
+            players = {**load_ratings(args.output), **players}
+    summary += f"total {time.time() - started:.1f}s)"
+
+    print_ratings(players, args.top)
+    if args.output:
+        save_ratings(args.output, players, getattr(args, 'period', PERIOD))
+    print(f"\n{summary}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+"""Incremental snapshots of live games for crash recovery and migration.
+
+Snapshots are off by default; ``game_host.py --snapshot=PATH`` turns them
+on. Games handed to ``SNAPSHOTS.track`` mark themselves dirty whenever
+they change (hot paths guard the call with ``if SNAPSHOTS.enabled:``, as
+with ``STATS``). ``capture()``, run periodically by the serving loop,
+copies the state of only the dirty games into immutable tuples and hands
+them to a background thread, so the loop pays for a copy of what changed
+and never waits for encoding or the disk.
+
+The file is a sequence of segments, each a header (magic, length, CRC-32)
+followed by a ``marshal``-encoded ``{game_id: (tag, state)}`` dict; a
+state of None marks a game that finished or was abandoned. Every segment
+is fsynced, later segments override earlier ones, and a torn segment at
+the end (a crash mid-write) is ignored and cut off. Once the appended
+segments outgrow the last full snapshot the writer rewrites the file
+with only the live games, atomically.
+
+    SNAPSHOTS.enable('games.snap')
+    games = SNAPSHOTS.restore()   # {game_id: (game, tag)}
+
+Restoring tens of thousands of games takes a fraction of a second:
+``marshal`` decodes each segment in one call and games are rebuilt
+without replaying their moves. Its format belongs to the Python version,
+so restore with the same version that wrote the file. Both games import
+this module, so what only snapshots need is imported when they are on.
+"""
+import atexit
+import gc
+import os
+import struct
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from instrumentation import STATS
+
+MAGIC = b'GSNP'
+HEADER = struct.Struct('<4sII')  # magic, payload bytes, CRC-32 of the payload
+# Appended segments may grow to this many times the last full snapshot
+COMPACT_RATIO = 4
+MIN_COMPACT_BYTES = 1 << 20
+
+
+def read_snapshot(path: str) -> Tuple[Dict[str, tuple], int]:
+    """Latest ``(tag, state)`` per game in the file, and the bytes that were valid"""
+    import marshal
+    import zlib
+    records: Dict[str, tuple] = {}
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return records, 0
+
+    offset = 0
+    while offset + HEADER.size <= len(data):
+        magic, length, crc = HEADER.unpack_from(data, offset)
+        start = offset + HEADER.size
+        payload = data[start:start + length]
+        if magic != MAGIC or len(payload) < length or zlib.crc32(payload) != crc:
+            break  # Torn or damaged segment: everything after it is lost
+        for game_id, record in marshal.loads(payload).items():
+            if record is None:
+                records.pop(game_id, None)
+            else:
+                records[game_id] = record
+        offset = start + length
+    return records, offset
+
+
+@contextmanager
+def gc_paused():
+    """Hold off cyclic garbage collection while building many long-lived objects"""
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def encode_segment(records: dict) -> bytes:
+    import marshal
+    import zlib
+    payload = marshal.dumps(records)
+    return HEADER.pack(MAGIC, len(payload), zlib.crc32(payload)) + payload
+
+
+def game_loaders() -> dict:
+    """``from_snapshot`` of each game class by the kind its state starts with"""
+    from game_modules import load_tetris, load_tictactoe
+    return {
+        'tictactoe': load_tictactoe().TicTacToeGame.from_snapshot,
+        'tetris': load_tetris().GameBoard.from_snapshot,
+    }
+
+
+class SnapshotStore:
+    """Process-wide registry of games to checkpoint"""
+
+    def __init__(self):
+        self.enabled = False
+        self.path: Optional[str] = None
+        self.games: Dict[str, tuple] = {}  # game_id -> (game, tag)
+        self.dirty: Dict[str, object] = {}
+        self.captures = 0
+        self.saved: Dict[str, tuple] = {}   # Records found in the file by enable()
+        self._writer: Optional['SnapshotWriter'] = None
+
+    def enable(self, path: str, compact_ratio: float = COMPACT_RATIO):
+        """Load ``path`` (see ``restore``) and start appending snapshots to it"""
+        if self.enabled:
+            return
+        self.path = path
+        with gc_paused():
+            self.saved, valid = read_snapshot(path)
+        self._writer = SnapshotWriter(path, dict(self.saved), valid, compact_ratio)
+        self._writer.start()
+        self.enabled = True
+        atexit.register(self.close)
+
+    def restore(self) -> Dict[str, tuple]:
+        """Rebuild the games saved in the file as ``{game_id: (game, tag)}`` and track them"""
+        loaders = game_loaders()
+        restored = {}
+        with gc_paused():
+            for game_id, (tag, state) in self.saved.items():
+                restored[game_id] = (loaders[state[0]](state), tag)
+        self.games.update(restored)
+        self.saved = {}
+        return restored
+
+    def track(self, game, tag: str = ''):
+        """Checkpoint ``game`` from now on; ``tag`` is saved with it for the host"""
+        self.games[game.game_id] = (game, tag)
+        self.dirty[game.game_id] = game
+
+    def touch(self, game):
+        """Mark a tracked game as changed since the last capture"""
+        if game.game_id in self.games:
+            self.dirty[game.game_id] = game
+
+    def forget(self, game):
+        """Stop tracking ``game`` and drop it from the snapshot"""
+        if self.games.pop(game.game_id, None) is not None:
+            self.dirty[game.game_id] = None
+
+    def capture(self) -> int:
+        """Copy the state of the games changed since the last capture and queue it for writing.
+
+        Finished games are written as removed but stay tracked, since undo
+        can bring them back. Returns the number of games captured.
+        """
+        if not self.dirty:
+            return 0
+        started = time.perf_counter()
+        dirty, self.dirty = self.dirty, {}
+        records = {}
+        for game_id, game in dirty.items():
+            entry = self.games.get(game_id)
+            if entry is None or game.game_over:
+                records[game_id] = None
+            else:
+                records[game_id] = (entry[1], game.snapshot_state())
+        self._writer.submit(records)
+        self.captures += 1
+        if STATS.enabled:
+            STATS.observe('snapshot.capture', time.perf_counter() - started)
+            STATS.incr('snapshot.games', len(records))
+        return len(records)
+
+    def stats(self) -> dict:
+        writer = self._writer
+        return {
+            'tracked': len(self.games),
+            'dirty': len(self.dirty),
+            'captures': self.captures,
+            'segments': writer.segments if writer else 0,
+            'compactions': writer.compactions if writer else 0,
+            'bytes': writer.size if writer else 0,
+        }
+
+    def close(self):
+        """Capture what changed and wait until it is on disk"""
+        if not self.enabled:
+            return
+        self.capture()
+        self.enabled = False
+        self._writer.stop()
+
+
+class SnapshotWriter:
+    """Encodes captured states and appends them to the snapshot file on its own thread"""
+
+    def __init__(self, path: str, latest: Dict[str, tuple], size: int, compact_ratio: float):
+        import threading  # Only paid for when snapshots are on
+        self.path = path
+        self.latest = latest            # Every live game's newest record, for compaction
+        self.compact_ratio = compact_ratio
+        self.pending: deque = deque()
+        self.segments = 0
+        self.compactions = 0
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = threading.Thread(target=self.run, name='snapshot-writer', daemon=True)
+
+        # Cut off a torn segment before appending after it
+        self._file = open(path, 'ab')
+        self._file.truncate(size)
+        self.size = size
+        self.full_size = size           # Size of the last full snapshot
+
+    def start(self):
+        self._thread.start()
+
+    def submit(self, records: dict):
+        self.pending.append(records)
+        self._wake.set()
+
+    def run(self):
+        while not self._stopping:
+            self._wake.wait()
+            self._wake.clear()
+            self.write_pending()
+        self.write_pending()
+        self._file.close()
+
+    def stop(self):
+        self._stopping = True
+        self._wake.set()
+        self._thread.join()
+
+    def write_pending(self):
+        """Write every queued capture as one segment, then fsync"""
+        if not self.pending:
+            return
+        records = {}
+        while self.pending:
+            records.update(self.pending.popleft())
+        for game_id, record in records.items():
+            if record is None:
+                self.latest.pop(game_id, None)
+            else:
+                self.latest[game_id] = record
+
+        if self.size - self.full_size > max(MIN_COMPACT_BYTES, self.full_size * self.compact_ratio):
+            self.compact()
+            return
+        segment = encode_segment(records)
+        self._file.write(segment)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.size += len(segment)
+        self.segments += 1
+
+    def compact(self):
+        """Atomically replace the file with one segment of the live games"""
+        segment = encode_segment(self.latest)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(segment)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._file.close()
+        self._file = open(self.path, 'ab')
+        self.size = self.full_size = len(segment)
+        self.compactions += 1
+        if STATS.enabled:
+            STATS.incr('snapshot.compactions')
+
+
+SNAPSHOTS = SnapshotStore()
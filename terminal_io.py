@@ -0,0 +1,309 @@
+"""Pluggable terminal input and output for the games.
+
+Games write to a *screen* and read from a *keyboard* instead of calling
+``print``, ``input`` or ``sys.stdin`` directly:
+
+    TTYScreen / TTYKeyboard        the real terminal (default)
+    BufferScreen / BufferKeyboard  in-memory, for tests and scripted sessions
+    SocketScreen / SocketKeyboard  a connected socket (telnet clients)
+    NullScreen / NullKeyboard      discard output / no input
+
+Screens collect everything written during a frame and send it with a
+single write on ``flush()``. Non-interactive screens also skip the
+cosmetic pauses, so headless sessions run at full speed:
+
+    screen = NullScreen()
+    keyboard = BufferKeyboard(['2', 'Ann', 'Bob', '1', '4', '2', '5', '3', 'm', '7'])
+    TicTacToeTerminal(screen, keyboard).main_menu()
+"""
+import os
+import sys
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Iterable, List, Optional
+
+CLEAR_SCREEN = '\033[H\033[2J\033[3J'
+
+# Escape sequences and control keys mapped to the game's key names
+KEY_SEQUENCES = {
+    '\x1b[A': 'w', '\x1b[B': 's', '\x1b[C': 'd', '\x1b[D': 'a',
+    '\r': 'enter', '\n': 'enter', '\x03': 'q', '\x1b': 'q',
+}
+ARROW_SEQUENCES = ('\x1b[A', '\x1b[B', '\x1b[C', '\x1b[D')
+
+
+def translate_keys(text: str) -> List[str]:
+    """Split raw key input into key names (arrows become w/a/s/d)"""
+    keys = []
+    i = 0
+    while i < len(text):
+        for sequence in ARROW_SEQUENCES:
+            if text.startswith(sequence, i):
+                keys.append(KEY_SEQUENCES[sequence])
+                i += len(sequence)
+                break
+        else:
+            ch = text[i]
+            keys.append(KEY_SEQUENCES.get(ch, ch.lower()))
+            i += 1
+    return keys
+
+
+# ============== SCREENS ==============
+class Screen(ABC):
+    """Output backend that batches writes into one send per flush"""
+
+    # Interactive screens honour cosmetic pauses; headless ones skip them
+    interactive = True
+
+    def __init__(self):
+        self.chunks: List[str] = []
+
+    def write(self, text: str):
+        self.chunks.append(text)
+
+    def print(self, *values, sep: str = ' ', end: str = '\n'):
+        """``print`` replacement that writes to this screen"""
+        self.chunks.append(sep.join(map(str, values)) + end)
+
+    def clear(self):
+        """Clear the display"""
+        self.chunks.append(CLEAR_SCREEN)
+
+    def flush(self):
+        """Send the pending frame in a single write"""
+        if self.chunks:
+            data = ''.join(self.chunks)
+            self.chunks.clear()
+            self.send(data)
+
+    @abstractmethod
+    def send(self, data: str):
+        """Deliver a finished frame"""
+
+    def pause(self, seconds: float):
+        """Show the pending output, then wait if a person is watching"""
+        self.flush()
+        if self.interactive:
+            time.sleep(seconds)
+
+
+class TTYScreen(Screen):
+    """The process's terminal, or any text stream"""
+
+    _vt_enabled = False
+
+    def __init__(self, stream=None):
+        super().__init__()
+        self.stream = stream
+
+    def clear(self):
+        if os.name == 'nt' and not TTYScreen._vt_enabled:
+            os.system('')  # Turns on ANSI escape handling in the Windows console
+            TTYScreen._vt_enabled = True
+        super().clear()
+
+    def send(self, data: str):
+        # Looked up on every send so redirecting sys.stdout still works
+        stream = self.stream or sys.stdout
+        stream.write(data)
+        stream.flush()
+
+
+class BufferScreen(Screen):
+    """Keeps every flushed frame in memory"""
+
+    interactive = False
+
+    def __init__(self):
+        super().__init__()
+        self.frames: List[str] = []
+
+    def send(self, data: str):
+        self.frames.append(data)
+
+    def getvalue(self) -> str:
+        """Everything written so far, including unflushed output"""
+        return ''.join(self.frames) + ''.join(self.chunks)
+
+
+class SocketScreen(Screen):
+    """Sends frames to a connected socket with telnet line endings"""
+
+    def __init__(self, sock):
+        super().__init__()
+        self.sock = sock
+
+    def send(self, data: str):
+        self.sock.sendall(data.replace('\n', '\r\n').encode('utf-8', 'replace'))
+
+
+class NullScreen(Screen):
+    """Discards all output"""
+
+    interactive = False
+
+    def write(self, text: str):
+        pass
+
+    def print(self, *values, sep: str = ' ', end: str = '\n'):
+        pass
+
+    def clear(self):
+        pass
+
+    def send(self, data: str):
+        pass
+
+
+# ============== KEYBOARDS ==============
+class Keyboard(ABC):
+    """Input backend.
+
+    ``read_line`` returns one line and ``read_key`` one key name ('' when
+    ``timeout`` runs out). Both raise EOFError once input has ended.
+    """
+
+    @abstractmethod
+    def read_line(self) -> str:
+        """The next line of input"""
+
+    @abstractmethod
+    def read_key(self, timeout: Optional[float] = None) -> str:
+        """The next key name, or '' when ``timeout`` runs out"""
+
+
+class TTYKeyboard(Keyboard):
+    """Reads the process's standard input"""
+
+    def __init__(self):
+        self.pending = deque()
+        self._backend = None
+
+    def read_line(self) -> str:
+        return input()
+
+    def read_key(self, timeout: Optional[float] = None) -> str:
+        if self.pending:
+            return self.pending.popleft()
+        if self._backend is None:
+            self._backend = self._select_backend()
+        for key in translate_keys(self._backend(timeout)):
+            self.pending.append(key)
+        return self.pending.popleft() if self.pending else ''
+
+    def _select_backend(self):
+        """Import the terminal modules for this platform once"""
+        try:
+            # For Unix-like systems (Linux, macOS, Termux)
+            import select
+            import termios
+            import tty
+            return lambda timeout: self._read_unix(select, termios, tty, timeout)
+        except ImportError:
+            pass
+        try:
+            # For Windows
+            import msvcrt
+            return lambda timeout: self._read_windows(msvcrt, timeout)
+        except ImportError:
+            return lambda timeout: ''
+
+    @staticmethod
+    def _read_unix(select, termios, tty, timeout: Optional[float]) -> str:
+        """Read the bytes of one key press in raw mode, waiting up to ``timeout``"""
+        fd = sys.stdin.fileno()
+        try:
+            old_settings = termios.tcgetattr(fd)
+        except termios.error:
+            old_settings = None  # Not a terminal, e.g. piped input
+        try:
+            if old_settings is not None:
+                tty.setraw(fd)
+            ready, _, _ = select.select([fd], [], [], timeout)
+            if not ready:
+                return ''
+            data = os.read(fd, 16)
+            if not data:
+                raise EOFError
+            return data.decode('utf-8', 'replace')
+        finally:
+            if old_settings is not None:
+                termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+
+    @staticmethod
+    def _read_windows(msvcrt, timeout: Optional[float]) -> str:
+        """Poll the console for a key press until ``timeout``"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not msvcrt.kbhit():
+            if deadline is not None and time.monotonic() >= deadline:
+                return ''
+            time.sleep(0.01)
+        ch = msvcrt.getwch()
+        if ch in ('\x00', '\xe0'):
+            # Arrow keys arrive as a prefix and a scan code
+            return {'H': '\x1b[A', 'P': '\x1b[B', 'M': '\x1b[C', 'K': '\x1b[D'}.get(msvcrt.getwch(), '')
+        return ch
+
+
+class BufferKeyboard(Keyboard):
+    """Replays scripted lines and keys, then reports end of input"""
+
+    def __init__(self, items: Iterable[str] = ()):
+        self.items = deque(items)
+
+    def feed(self, *items: str):
+        """Queue more input"""
+        self.items.extend(items)
+
+    def read_line(self) -> str:
+        if not self.items:
+            raise EOFError
+        return self.items.popleft()
+
+    def read_key(self, timeout: Optional[float] = None) -> str:
+        return self.read_line()
+
+
+class SocketKeyboard(Keyboard):
+    """Reads lines and key presses from a connected socket"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buffer = ''
+        self.pending = deque()
+
+    def _receive(self, timeout: Optional[float]) -> bool:
+        """Append newly received text; False if nothing arrived in time"""
+        import select
+        ready, _, _ = select.select([self.sock], [], [], timeout)
+        if not ready:
+            return False
+        data = self.sock.recv(1024)
+        if not data:
+            raise EOFError
+        self.buffer += data.decode('utf-8', 'replace').replace('\0', '')
+        return True
+
+    def read_line(self) -> str:
+        while '\n' not in self.buffer:
+            self._receive(None)
+        line, self.buffer = self.buffer.split('\n', 1)
+        return line.rstrip('\r')
+
+    def read_key(self, timeout: Optional[float] = None) -> str:
+        if not self.pending and (self.buffer or self._receive(timeout)):
+            self.pending.extend(translate_keys(self.buffer))
+            self.buffer = ''
+        return self.pending.popleft() if self.pending else ''
+
+
+class NullKeyboard(Keyboard):
+    """No input at all"""
+
+    def read_line(self) -> str:
+        raise EOFError
+
+    def read_key(self, timeout: Optional[float] = None) -> str:
+        raise EOFError
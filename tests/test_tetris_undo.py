@@ -0,0 +1,73 @@
+"""Undo and redo of Tetris locks, including holds made while a piece fell.
+
+    python -m unittest discover tests
+"""
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_modules import load_tetris
+
+tetris = load_tetris()
+
+
+def board_state(board):
+    """Everything undo-all/redo-all must bring back"""
+    return ([row[:] for row in board.grid],
+            board.current_piece.type, board.current_piece.rotation,
+            board.hold_piece.type if board.hold_piece else None, board.hold_used,
+            [piece.type for piece in board.preview(5)],
+            board.score, board.level, board.lines_cleared)
+
+
+def play(board, rng, locks):
+    """Random moves, rotations, holds and drops until ``locks`` pieces locked"""
+    while len(board.undo_log) < locks and not board.game_over:
+        action = rng.random()
+        if action < 0.15:
+            board.hold()
+        elif action < 0.35:
+            board.rotate_piece()
+        elif action < 0.6:
+            board.move_piece(rng.choice((-1, 1)), 0)
+        elif action < 0.75:
+            board.soft_drop()
+        else:
+            board.drop_piece()
+
+
+class UndoRedoTest(unittest.TestCase):
+
+    def test_hold_is_redone(self):
+        board = tetris.GameBoard(10, 20, rng=random.Random(1))
+        board.drop_piece()
+        board.hold()
+        board.drop_piece()
+        expected = board_state(board)
+        board.undo()
+        board.undo()
+        board.redo()
+        board.redo()
+        self.assertEqual(board_state(board), expected)
+
+    def test_undo_all_redo_all(self):
+        for seed in range(60):
+            with self.subTest(seed=seed):
+                rng = random.Random(seed)
+                board = tetris.GameBoard(10, 20, rng=random.Random(seed))
+                # A hold after the last lock is not in the history, so compare lock by lock
+                locked = []
+                board.on_lock = lambda event: locked.append(board_state(board))
+                play(board, rng, 15)
+                while board.undo():
+                    pass
+                for expected in locked:
+                    self.assertTrue(board.redo())
+                    self.assertEqual(board_state(board), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
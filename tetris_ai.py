@@ -0,0 +1,330 @@
+"""Heuristic Tetris bot.
+
+Scores every rotation and column the current piece can be hard-dropped
+into and picks the best by a weighted sum of board features (aggregate
+height, completed lines, holes and bumpiness). The board is copied to
+row bitmasks once per decision, so each candidate costs a few integer
+operations per row:
+
+    ai = TetrisAI()
+    ai.play(board)   # rotate, shift and hard-drop the current piece
+
+With ``lookahead=n`` the best few placements (``beam``) are searched
+further with the next n pieces in the preview. Scores are memoized in an
+``EvalCache`` keyed on a Zobrist hash of the board, which is updated
+with the four cells of each candidate instead of rehashing the grid.
+The boards the search ranked one ply deep include the board the bot
+decides on next turn, so part of each search is a cache hit.
+"""
+import json
+import random
+from collections import OrderedDict
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from game_modules import load_tetris
+
+tetris = load_tetris()
+
+# Well-known hand-tuned weights for the four features
+DEFAULT_WEIGHTS = {
+    'height': -0.510066,
+    'lines': 0.760666,
+    'holes': -0.35663,
+    'bumpiness': -0.184483,
+}
+FEATURES = tuple(DEFAULT_WEIGHTS)
+
+ZOBRIST_SEED = 0x7E7215
+# Score of a position where the next piece cannot be placed at all
+TOP_OUT_SCORE = -1e9
+
+
+@dataclass
+class Placement:
+    """Where to put the current piece"""
+    rotation: int  # Clockwise quarter turns from the spawn orientation
+    x: int         # Left column of the rotated shape
+    score: float
+
+
+def board_masks(grid: Sequence[Sequence]) -> List[int]:
+    """One bitmask per row, bit x set when column x is filled"""
+    masks = []
+    for row in grid:
+        mask = 0
+        for x, cell in enumerate(row):
+            if cell:
+                mask |= 1 << x
+        masks.append(mask)
+    return masks
+
+
+def piece_rotations(piece) -> List[Tuple[int, List[int], int]]:
+    """Distinct orientations as (rotation, row masks, width)"""
+    rotations = []
+    seen = set()
+    shape = piece.copy()
+    for rotation in range(4):
+        rows = tuple(sum(1 << x for x, cell in enumerate(row) if cell) for row in shape.shape)
+        if rows not in seen:
+            seen.add(rows)
+            rotations.append((rotation, list(rows), len(shape.shape[0])))
+        shape.rotate()
+    return rotations
+
+
+def features(rows: List[int], width: int) -> Dict[str, float]:
+    """Feature values of a board given as row masks (top row first)"""
+    full = (1 << width) - 1
+    lines = rows.count(full)
+    if lines:
+        rows = [row for row in rows if row != full]
+    height = len(rows)
+
+    # One pass down the rows: a column's height is set by its first filled
+    # cell, and every empty cell under a filled one is a hole
+    heights = [0] * width
+    total = 0
+    holes = 0
+    covered = 0
+    for y, row in enumerate(rows):
+        new = row & ~covered
+        if new:
+            covered |= new
+            column_height = height - y
+            while new:
+                low = new & -new
+                heights[low.bit_length() - 1] = column_height
+                total += column_height
+                new ^= low
+        if covered:
+            holes += bin(covered & ~row).count('1')
+
+    bumpiness = sum(abs(heights[x] - heights[x + 1]) for x in range(width - 1))
+    return {'height': total, 'lines': lines, 'holes': holes, 'bumpiness': bumpiness}
+
+
+def rotations_of(piece_type) -> List[Tuple[int, List[int], int]]:
+    """``piece_rotations`` of a freshly spawned piece, computed once per type"""
+    rotations = _SPAWN_ROTATIONS.get(piece_type)
+    if rotations is None:
+        rotations = _SPAWN_ROTATIONS[piece_type] = piece_rotations(tetris.Piece(piece_type))
+    return rotations
+
+
+_SPAWN_ROTATIONS = {}
+
+
+def stack_top(rows: List[int]) -> int:
+    """Index of the highest row with a filled cell (the row count if empty)"""
+    for y, row in enumerate(rows):
+        if row:
+            return y
+    return len(rows)
+
+
+def drop_row(rows: List[int], shape: List[int], x: int, top: int = 0) -> Optional[int]:
+    """Row where ``shape`` comes to rest when dropped at column ``x``.
+
+    ``top`` is ``stack_top(rows)``; the shape falls freely down to it.
+    """
+    cells = [mask << x for mask in shape]
+    for i, cell in enumerate(cells):
+        if rows[i] & cell:
+            return None  # Blocked at the spawn row
+    y = max(0, top - len(cells))
+    limit = len(rows) - len(cells)
+    while y < limit:
+        for i, cell in enumerate(cells):
+            if rows[y + 1 + i] & cell:
+                return y
+        y += 1
+    return y
+
+
+# ============== EVALUATION CACHE ==============
+class Zobrist:
+    """Random 64-bit keys per board cell and piece type.
+
+    A board's hash is the XOR of the keys of its filled cells, so placing
+    a piece updates it with four XORs. Keys come from a fixed seed, which
+    keeps hashes stable across processes.
+    """
+
+    def __init__(self, height: int, width: int):
+        rng = random.Random(ZOBRIST_SEED)
+        self.cells = [[rng.getrandbits(64) for _ in range(width)] for _ in range(height)]
+        self.pieces = {piece_type: rng.getrandbits(64) for piece_type in tetris.PieceType}
+        self.depths = [rng.getrandbits(64) for _ in range(8)]
+
+    def row(self, y: int, mask: int) -> int:
+        """XOR of the keys of the cells set in ``mask`` on row ``y``"""
+        keys = self.cells[y]
+        h = 0
+        while mask:
+            low = mask & -mask
+            h ^= keys[low.bit_length() - 1]
+            mask ^= low
+        return h
+
+    def board(self, rows: List[int]) -> int:
+        h = 0
+        for y, mask in enumerate(rows):
+            if mask:
+                h ^= self.row(y, mask)
+        return h
+
+
+_ZOBRIST = {}
+
+
+def zobrist_for(height: int, width: int) -> Zobrist:
+    """Shared key tables, one per board size"""
+    table = _ZOBRIST.get((height, width))
+    if table is None:
+        table = _ZOBRIST[height, width] = Zobrist(height, width)
+    return table
+
+
+class EvalCache:
+    """Bounded LRU of scores keyed by board fingerprint.
+
+    Scores depend on the weights, so each bot keeps its own cache.
+    """
+
+    def __init__(self, capacity: int = 1 << 16):
+        self.capacity = capacity
+        self.entries: 'OrderedDict[int, float]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: int) -> Optional[float]:
+        score = self.entries.get(key)
+        if score is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return score
+
+    def put(self, key: int, score: float):
+        self.entries[key] = score
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'hit_rate': round(self.hit_rate, 3)}
+
+
+# ============== BOT ==============
+class TetrisAI:
+    """Placement search with weighted board features"""
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, lookahead: int = 0,
+                 beam: int = 6, cache: Optional[EvalCache] = None):
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self.lookahead = lookahead  # Preview pieces searched after the current one
+        self.beam = beam            # Best placements per ply searched further
+        self.cache = cache if cache is not None else EvalCache()
+
+    @classmethod
+    def from_file(cls, path: str) -> 'TetrisAI':
+        """Load weights saved by ``tetris_tuner.py``"""
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def evaluate(self, rows: List[int], width: int) -> float:
+        values = features(rows, width)
+        return sum(self.weights[name] * values[name] for name in FEATURES)
+
+    def best_placement(self, board) -> Optional[Placement]:
+        """The highest scoring hard-drop placement of the current piece"""
+        if board.game_over:
+            return None
+        rows = board_masks(board.grid)
+        width = board.width
+        zobrist = zobrist_for(len(rows), width)
+        candidates = self._candidates(rows, zobrist.board(rows), piece_rotations(board.current_piece),
+                                      zobrist, width)
+        if not candidates:
+            return None
+        if self.lookahead:
+            upcoming = [piece.type for piece in board.preview(self.lookahead)]
+            candidates.sort(key=itemgetter(0), reverse=True)
+            candidates = [(self._lookahead_score(placed, h, upcoming, zobrist, width),
+                           rotation, x, placed, h)
+                          for _, rotation, x, placed, h in candidates[:self.beam]]
+        score, rotation, x, _, _ = max(candidates, key=itemgetter(0))
+        return Placement(rotation, x, score)
+
+    def _candidates(self, rows: List[int], h: int, rotations: list, zobrist: Zobrist,
+                    width: int) -> List[tuple]:
+        """Every drop of a piece as (score, rotation, x, rows after, hash after)"""
+        top = stack_top(rows)
+        candidates = []
+        for rotation, shape, shape_width in rotations:
+            for x in range(width - shape_width + 1):
+                y = drop_row(rows, shape, x, top)
+                if y is None:
+                    continue
+                placed = rows[:]
+                placed_hash = h
+                for i, mask in enumerate(shape):
+                    placed[y + i] |= mask << x
+                    placed_hash ^= zobrist.row(y + i, mask << x)
+                score = self.cache.get(placed_hash)
+                if score is None:
+                    score = self.evaluate(placed, width)
+                    self.cache.put(placed_hash, score)
+                candidates.append((score, rotation, x, placed, placed_hash))
+        return candidates
+
+    def _lookahead_score(self, rows: List[int], h: int, upcoming: list, zobrist: Zobrist,
+                         width: int) -> float:
+        """Score of the board after a placement, searching the upcoming pieces"""
+        # Lines clear before the next piece drops; they still count towards the score
+        full = (1 << width) - 1
+        lines = rows.count(full)
+        if lines:
+            rows = [0] * lines + [row for row in rows if row != full]
+            h = zobrist.board(rows)
+
+        key = h ^ zobrist.pieces[upcoming[0]] ^ zobrist.depths[len(upcoming)]
+        best = self.cache.get(key)
+        if best is None:
+            candidates = self._candidates(rows, h, rotations_of(upcoming[0]), zobrist, width)
+            if not candidates:
+                best = TOP_OUT_SCORE
+            elif len(upcoming) == 1:
+                best = max(candidate[0] for candidate in candidates)
+            else:
+                candidates.sort(key=itemgetter(0), reverse=True)
+                best = max(self._lookahead_score(placed, placed_hash, upcoming[1:], zobrist, width)
+                           for _, _, _, placed, placed_hash in candidates[:self.beam])
+            self.cache.put(key, best)
+        return best + self.weights['lines'] * lines
+
+    def play(self, board) -> bool:
+        """Move the current piece to the best placement and hard-drop it"""
+        placement = self.best_placement(board)
+        if placement is None:
+            return False
+        for _ in range(placement.rotation):
+            board.rotate_piece()
+        dx = placement.x - board.current_pos.x
+        step = 1 if dx > 0 else -1
+        for _ in range(abs(dx)):
+            if not board.move_piece(step, 0):
+                break
+        board.drop_piece()
+        return True
@@ -0,0 +1,340 @@
+"""Tiled dashboard for watching many Tetris boards at once.
+
+Each board is drawn as a compact tile: two board rows per terminal line
+using half-block glyphs (``▀``/``▄`` with the upper cell as foreground and
+the lower one as background), with its name and score above it. Tiles
+share one frame buffer that remembers what is on the screen, and a tile
+is only rebuilt when its board changed, so a frame costs the boards that
+moved rather than the whole fleet.
+
+Refreshes are capped at ``max_fps`` whatever the simulation speed:
+``render`` returns straight away between frames, so the loop can tick the
+boards as fast as it likes.
+
+    python tetris_dashboard.py --boards 24                # real-time bot fleet
+    python tetris_dashboard.py --boards 48 --speed 0      # simulate flat out, refresh at 10 fps
+"""
+import argparse
+import random
+import shutil
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from instrumentation import STATS
+from terminal_io import Keyboard, Screen, TTYKeyboard, TTYScreen
+from tetris_ai import TetrisAI, tetris
+
+Colors = tetris.Colors
+GAME_CONFIG = tetris.GAME_CONFIG
+
+# ============== TILES ==============
+TILE_GAP = 1     # Blank columns between tiles
+HEADER_ROWS = 1  # Status line above the tiles
+
+
+def background_of(color: str) -> str:
+    """Background escape for a cell colour, e.g. 91 (bright red) -> 101"""
+    codes = color[2:-1].split(';')
+    code = int(codes[-1])
+    if len(codes) > 1:
+        code -= 60  # Bold colours take the plain background so they stay distinct
+    return f"\033[{code + 10}m"
+
+
+# Background twin of every cell colour, for the lower half of a glyph
+BACKGROUNDS = {color: background_of(color) for color in tetris.CELL_COLORS[1:]}
+
+
+def half_block_rows(board) -> List[str]:
+    """The board with its falling piece, two rows per line of half blocks"""
+    grid = board.grid
+    piece_cells = {}
+    if board.current_piece is not None and not board.game_over:
+        color = board.current_piece.color
+        piece_cells = {cell: color for cell in board.current_piece.get_cells(board.current_pos)}
+
+    lines = []
+    for y in range(0, board.height, 2):
+        parts = []
+        style = ''  # Each line starts after a reset
+        for x in range(board.width):
+            top = piece_cells.get((y, x)) or grid[y][x]
+            bottom = (piece_cells.get((y + 1, x)) or grid[y + 1][x]) if y + 1 < board.height else 0
+            if top and bottom:
+                cell_style, glyph = top + BACKGROUNDS[bottom], '▀'
+            elif top:
+                cell_style, glyph = top, '▀'
+            elif bottom:
+                cell_style, glyph = bottom, '▄'
+            else:
+                cell_style, glyph = '', ' '
+            if cell_style != style:
+                parts.append(Colors.RESET + cell_style)
+                style = cell_style
+            parts.append(glyph)
+        parts.append(Colors.RESET)
+        lines.append(''.join(parts))
+    return lines
+
+
+def tile_lines(name: str, board) -> List[str]:
+    """Name, score line and framed board of one tile"""
+    width = board.width
+    status = 'TOP OUT' if board.game_over else f"L{board.level}"
+    name = name[:max(0, width + 1 - len(status))]
+    label = f"{name} {status.rjust(width + 1 - len(name))}"
+    score = f"{board.score} {board.lines_cleared}L"
+    color = Colors.RED if board.game_over else Colors.BOLD
+    border = f"{Colors.WHITE}+{'-' * width}+{Colors.RESET}"
+    lines = [
+        f"{color}{label[:width + 2]}{Colors.RESET}",
+        f"{Colors.GREEN}{score[:width + 2].rjust(width + 2)}{Colors.RESET}",
+        border,
+    ]
+    lines.extend(f"{Colors.WHITE}|{Colors.RESET}{row}{Colors.WHITE}|{Colors.RESET}"
+                 for row in half_block_rows(board))
+    lines.append(border)
+    return lines
+
+
+def tile_key(name: str, board) -> tuple:
+    """Everything a tile shows; the tile is redrawn when this changes.
+
+    The grid only changes on a lock, line clear, garbage or undo, each of
+    which changes the filled cell count, the score or the falling piece.
+    """
+    piece = board.current_piece
+    return (name, id(board), board.score, board.lines_cleared, board.level, board.game_over,
+            board.filled_cells, piece.type, piece.rotation, board.current_pos.y, board.current_pos.x)
+
+
+# ============== FRAME BUFFER ==============
+class FrameBuffer:
+    """What is on the screen at each (row, column), so only changes are sent"""
+
+    def __init__(self, screen: Screen):
+        self.screen = screen
+        self.drawn: Dict[Tuple[int, int], str] = {}
+        self.writes = 0
+
+    def put(self, row: int, column: int, text: str) -> bool:
+        """Queue ``text`` at a screen position unless it is already there"""
+        key = (row, column)
+        if self.drawn.get(key) == text:
+            return False
+        self.drawn[key] = text
+        self.screen.write(f"\033[{row + 1};{column + 1}H{text}")
+        self.writes += 1
+        return True
+
+    def clear(self):
+        self.drawn.clear()
+        self.screen.clear()
+
+
+# ============== RENDERER ==============
+class DashboardRenderer:
+    """Draws many boards as tiles at a capped refresh rate"""
+
+    def __init__(self, screen: Screen, max_fps: float = 10.0, width: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.screen = screen
+        self.buffer = FrameBuffer(screen)
+        self.interval = 1 / max_fps if max_fps > 0 else 0.0
+        self.width = width or shutil.get_terminal_size((120, 40)).columns
+        self.clock = clock
+        self.next_frame = 0.0
+        self.keys: List[Optional[tuple]] = []
+        self.layout: Optional[tuple] = None
+        self.frames = 0
+        self.tiles_drawn = 0
+
+    def due(self) -> bool:
+        return self.clock() >= self.next_frame
+
+    def columns_for(self, tile_width: int) -> int:
+        return max(1, (self.width + TILE_GAP) // (tile_width + TILE_GAP))
+
+    def render(self, tiles: Sequence[Tuple[str, object]], status: str = '', force: bool = False) -> bool:
+        """Draw the tiles whose boards changed, in one write; False between frames"""
+        now = self.clock()
+        if not force and now < self.next_frame:
+            return False
+        self.next_frame = now + self.interval
+        if STATS.enabled:
+            with STATS.timer('dashboard.frame'):
+                self._render(tiles, status)
+        else:
+            self._render(tiles, status)
+        self.screen.flush()
+        return True
+
+    def _render(self, tiles: Sequence[Tuple[str, object]], status: str):
+        if not tiles:
+            return
+        board = tiles[0][1]
+        tile_width = board.width + 2
+        tile_height = (board.height + 1) // 2 + 5  # Name, score, two borders and a blank row
+        columns = self.columns_for(tile_width)
+        layout = (len(tiles), columns, tile_width, tile_height)
+        if layout != self.layout:
+            # First frame, or the fleet or terminal changed: start from a clean screen
+            self.layout = layout
+            self.keys = [None] * len(tiles)
+            self.buffer.clear()
+
+        drawn = 0
+        for index, (name, board) in enumerate(tiles):
+            key = tile_key(name, board)
+            if self.keys[index] == key:
+                continue
+            self.keys[index] = key
+            top = HEADER_ROWS + index // columns * tile_height
+            left = index % columns * (tile_width + TILE_GAP)
+            for row, line in enumerate(tile_lines(name, board)):
+                self.buffer.put(top + row, left, line)
+            drawn += 1
+
+        self.buffer.put(0, 0, f"{Colors.CYAN}{status[:self.width]}{Colors.RESET}\033[K")
+        rows = (len(tiles) + columns - 1) // columns
+        self.screen.write(f"\033[{HEADER_ROWS + rows * tile_height + 1};1H")  # Park the cursor below
+        self.frames += 1
+        self.tiles_drawn += drawn
+        if STATS.enabled:
+            STATS.incr('dashboard.tiles', drawn)
+
+    def invalidate(self):
+        """Redraw everything on the next frame"""
+        self.layout = None
+
+
+# ============== BOT FLEET ==============
+class BotFleet:
+    """Many headless boards, each played by the bot"""
+
+    def __init__(self, count: int, seed: Optional[int] = None, weights: Optional[Dict[str, float]] = None,
+                 lookahead: int = 0, bot_delay: int = 8, restart: bool = False):
+        self.rng = random.Random(seed)
+        self.bot = TetrisAI(weights, lookahead)  # One bot, so the boards share its evaluation cache
+        self.bot_delay = bot_delay  # Ticks between bot moves
+        self.restart = restart
+        self.names = [f"#{i + 1:02}" for i in range(count)]
+        self.boards = [self.new_board() for _ in range(count)]
+        self.waits = [self.rng.randrange(1, bot_delay + 1) for _ in range(count)]  # Staggered
+        self.ticks = 0
+        self.games = 0
+        self.best_score = 0
+
+    def new_board(self):
+        return tetris.GameBoard(GAME_CONFIG['BOARD_WIDTH'], GAME_CONFIG['BOARD_HEIGHT'],
+                                rng=random.Random(self.rng.getrandbits(32)))
+
+    def tick(self):
+        self.ticks += 1
+        for i, board in enumerate(self.boards):
+            if board.game_over:
+                continue
+            board.tick()
+            self.waits[i] -= 1
+            if self.waits[i] <= 0 and not board.game_over:
+                self.waits[i] = self.bot_delay
+                self.bot.play(board)
+            if board.game_over:
+                self.finish(i)
+
+    def finish(self, index: int):
+        board = self.boards[index]
+        self.games += 1
+        self.best_score = max(self.best_score, board.score)
+        if self.restart:
+            self.boards[index] = self.new_board()
+
+    @property
+    def over(self) -> bool:
+        return all(board.game_over for board in self.boards)
+
+    def tiles(self) -> List[Tuple[str, object]]:
+        return list(zip(self.names, self.boards))
+
+
+def watch(fleet: BotFleet, renderer: DashboardRenderer, keyboard: Optional[Keyboard] = None,
+          speed: float = 1.0, max_ticks: Optional[int] = None) -> int:
+    """Run the fleet until it is over, Q is pressed or ``max_ticks``; returns ticks run.
+
+    ``speed`` scales real time (2 = twice as fast); 0 runs ticks back to
+    back. Either way the screen is refreshed at the renderer's rate.
+    """
+    tick = GAME_CONFIG['TICK_SECONDS'] / speed if speed > 0 else 0.0
+    started = time.monotonic()
+    next_tick = started
+    ticks = 0
+
+    def status() -> str:
+        elapsed = max(1e-9, time.monotonic() - started)
+        return (f"{len(fleet.boards)} boards  {ticks / elapsed:,.0f} ticks/s  "
+                f"{renderer.frames / elapsed:.1f} fps  games {fleet.games}  best {fleet.best_score}  "
+                f"Q to quit")
+
+    while not fleet.over and (max_ticks is None or ticks < max_ticks):
+        now = time.monotonic()
+        steps = 0
+        while ((not tick or next_tick <= now) and steps < 20 and not fleet.over
+               and (max_ticks is None or ticks < max_ticks)):
+            fleet.tick()
+            ticks += 1
+            next_tick += tick
+            steps += 1
+            if not tick and renderer.due():
+                break
+        if tick and steps == 20:
+            next_tick = now  # Too far behind; drop the backlog
+
+        rendered = renderer.render(fleet.tiles(), status())
+        # Flat out, keys are only looked for once per frame so the simulation is not held up
+        wait = max(0.0, min(next_tick, renderer.next_frame) - time.monotonic()) if tick else 0.0
+        if keyboard is None or not (tick or rendered):
+            time.sleep(wait)
+        else:
+            try:
+                key = keyboard.read_key(wait)
+            except EOFError:
+                key = 'q'
+            if key == 'q':
+                break
+            if key == 'r':
+                renderer.invalidate()
+
+    renderer.render(fleet.tiles(), status(), force=True)
+    return ticks
+
+
+# ============== ENTRY POINT ==============
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Watch a fleet of Tetris bots")
+    parser.add_argument('--boards', type=int, default=24)
+    parser.add_argument('--fps', type=float, default=10.0, help="maximum screen refreshes per second")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="simulation speed relative to real time (0 = as fast as possible)")
+    parser.add_argument('--restart', action='store_true', help="start a new game when a board tops out")
+    parser.add_argument('--ticks', type=int, help="stop after this many ticks")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--weights', help="bot weights written by tetris_tuner.py")
+    parser.add_argument('--lookahead', type=int, default=0, help="preview pieces the bot searches ahead")
+    parser.add_argument('--bot-delay', type=int, default=8, help="ticks between bot moves")
+    args = parser.parse_args()
+
+    weights = TetrisAI.from_file(args.weights).weights if args.weights else None
+    fleet = BotFleet(args.boards, args.seed, weights, args.lookahead, args.bot_delay, args.restart)
+    renderer = DashboardRenderer(TTYScreen(), args.fps)
+    try:
+        watch(fleet, renderer, TTYKeyboard(), args.speed, args.ticks)
+    except KeyboardInterrupt:
+        pass
+    print(f"\n{fleet.games} games finished, best score {fleet.best_score}, "
+          f"{renderer.tiles_drawn} tiles drawn in {renderer.frames} frames", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
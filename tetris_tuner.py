@@ -0,0 +1,189 @@
+"""Cross-entropy tuner for the Tetris bot's evaluation weights.
+
+Each generation samples candidate weight vectors from a Gaussian, scores
+every candidate on the same set of seeded headless games, and refits the
+Gaussian to the best candidates. Games are independent tasks on a process
+pool, so throughput grows with the number of cores. The search state is
+checkpointed after every generation and per-generation fitness statistics
+are appended to a JSON lines file:
+
+    python tetris_tuner.py --generations 50 --checkpoint cem.json --stats-file cem.jsonl
+    python tetris_tuner.py --resume cem.json --generations 100
+    python tetris_versus.py --weights best_weights.json
+"""
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict, field
+from typing import Dict, List, Optional, Tuple
+
+from tetris_ai import DEFAULT_WEIGHTS, FEATURES, TetrisAI, tetris
+
+# ============== CONFIGURATION ==============
+INITIAL_STD = 1.0
+# Extra variance added each generation, shrinking over time, so the search
+# does not collapse onto an early elite (Szita & Lorincz 2006)
+NOISE_START = 0.5
+NOISE_DECAY = 0.02
+
+
+# ============== GAME EVALUATION ==============
+def play_game(task: Tuple[int, Dict[str, float], int, int]) -> Tuple[int, int, int]:
+    """Play one seeded headless game; returns (candidate, lines cleared, pieces placed)"""
+    candidate, weights, seed, max_pieces = task
+    board = tetris.GameBoard(tetris.GAME_CONFIG['BOARD_WIDTH'], tetris.GAME_CONFIG['BOARD_HEIGHT'],
+                             rng=random.Random(seed))
+    ai = TetrisAI(weights)
+    pieces = 0
+    while pieces < max_pieces and ai.play(board):
+        pieces += 1
+    return candidate, board.lines_cleared, pieces
+
+
+# ============== SEARCH STATE ==============
+@dataclass
+class Generation:
+    """Fitness statistics for one generation"""
+    generation: int
+    best: float
+    mean: float
+    median: float
+    elite_mean: float
+    seconds: float
+    pieces_per_second: float
+    best_weights: Dict[str, float]
+
+
+@dataclass
+class CrossEntropyTuner:
+    """Cross-entropy method over the bot's feature weights"""
+    population: int = 40
+    elite_fraction: float = 0.25
+    games: int = 8
+    max_pieces: int = 500
+    seed: int = 0
+    mean: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_WEIGHTS))
+    std: Dict[str, float] = field(default_factory=lambda: {name: INITIAL_STD for name in FEATURES})
+    generation: int = 0
+    best_fitness: float = -1.0
+    best_weights: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_WEIGHTS))
+    history: List[dict] = field(default_factory=list)
+
+    def sample(self) -> List[Dict[str, float]]:
+        """Candidate weight vectors for the current generation"""
+        rng = random.Random(self.seed * 1_000_003 + self.generation * 2)
+        return [{name: rng.gauss(self.mean[name], self.std[name]) for name in FEATURES}
+                for _ in range(self.population)]
+
+    def game_seeds(self) -> List[int]:
+        """Seeds shared by every candidate this generation (common random numbers)"""
+        rng = random.Random(self.seed * 1_000_003 + self.generation * 2 + 1)
+        return [rng.getrandbits(32) for _ in range(self.games)]
+
+    def step(self, pool: ProcessPoolExecutor, workers: int) -> Generation:
+        """Evaluate one generation and refit the sampling distribution"""
+        started = time.perf_counter()
+        candidates = self.sample()
+        tasks = [(i, weights, seed, self.max_pieces)
+                 for i, weights in enumerate(candidates) for seed in self.game_seeds()]
+        chunksize = max(1, len(tasks) // (workers * 4))
+
+        totals = [0] * len(candidates)
+        pieces = 0
+        for candidate, lines, placed in pool.map(play_game, tasks, chunksize=chunksize):
+            totals[candidate] += lines
+            pieces += placed
+        fitness = [total / self.games for total in totals]
+
+        ranked = sorted(range(len(candidates)), key=fitness.__getitem__, reverse=True)
+        elite = [candidates[i] for i in ranked[:max(2, int(self.population * self.elite_fraction))]]
+        noise = max(NOISE_START - NOISE_DECAY * self.generation, 0.0)
+        for name in FEATURES:
+            values = [weights[name] for weights in elite]
+            self.mean[name] = statistics.fmean(values)
+            self.std[name] = math.sqrt(statistics.pvariance(values) + noise)
+
+        top = ranked[0]
+        if fitness[top] > self.best_fitness:
+            self.best_fitness = fitness[top]
+            self.best_weights = candidates[top]
+        seconds = time.perf_counter() - started
+        record = Generation(self.generation, fitness[top], statistics.fmean(fitness),
+                            statistics.median(fitness),
+                            statistics.fmean(fitness[i] for i in ranked[:len(elite)]),
+                            seconds, pieces / seconds, candidates[top])
+        self.history.append(asdict(record))
+        self.generation += 1
+        return record
+
+    def run(self, generations: int, workers: Optional[int] = None,
+            checkpoint: Optional[str] = None, stats_file: Optional[str] = None):
+        """Run until ``generations`` have been evaluated in total"""
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while self.generation < generations:
+                record = self.step(pool, workers)
+                if checkpoint:
+                    self.save(checkpoint)
+                if stats_file:
+                    with open(stats_file, 'a') as f:
+                        f.write(json.dumps(asdict(record)) + '\n')
+                print(f"Gen {record.generation:3}  best {record.best:8.1f}  mean {record.mean:8.1f}  "
+                      f"elite {record.elite_mean:8.1f}  {record.pieces_per_second:8.0f} pieces/s",
+                      flush=True)
+
+    def save(self, path: str):
+        """Atomically write the search state"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(asdict(self), f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'CrossEntropyTuner':
+        with open(path) as f:
+            return cls(**json.load(f))
+
+
+# ============== ENTRY POINT ==============
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Tune Tetris bot weights with the cross-entropy method")
+    parser.add_argument('--generations', type=int, default=20, help="total generations to reach")
+    parser.add_argument('--population', type=int, default=40)
+    parser.add_argument('--elite', type=float, default=0.25, help="fraction of candidates kept")
+    parser.add_argument('--games', type=int, default=8, help="seeded games per candidate")
+    parser.add_argument('--max-pieces', type=int, default=500, help="pieces per game before it is stopped")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--checkpoint', help="file to checkpoint the search to")
+    parser.add_argument('--resume', help="continue from a checkpoint file")
+    parser.add_argument('--stats-file', help="append per-generation statistics as JSON lines")
+    parser.add_argument('--output', default='best_weights.json', help="where to write the best weights")
+    args = parser.parse_args()
+
+    if args.resume:
+        tuner = CrossEntropyTuner.load(args.resume)
+        checkpoint = args.checkpoint or args.resume
+    else:
+        tuner = CrossEntropyTuner(args.population, args.elite, args.games, args.max_pieces, args.seed)
+        checkpoint = args.checkpoint
+
+    try:
+        tuner.run(args.generations, args.workers, checkpoint, args.stats_file)
+    except KeyboardInterrupt:
+        print("Interrupted; the last finished generation is in the checkpoint")
+    with open(args.output, 'w') as f:
+        json.dump(tuner.best_weights, f, indent=1)
+    print(f"Best fitness {tuner.best_fitness:.1f} lines; weights written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
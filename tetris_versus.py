@@ -0,0 +1,499 @@
+"""Two-player versus Tetris with garbage lines.
+
+Two boards play side by side. Clearing lines sends garbage rows to the
+opponent; pending garbage is cancelled by your own clears first and rises
+when you lock a piece without clearing:
+
+    python tetris_versus.py                          # you against the bot
+    python tetris_versus.py --local                  # two players, one keyboard
+    python tetris_versus.py --listen 7777 --bot      # stand-in peer on a socket
+    python tetris_versus.py --connect localhost:7777 # play against it
+
+Player 1 uses A/D/W/S/Space/C (or the arrow keys), player 2 uses
+J/L/I/K/Enter/U. Over a socket each side simulates its own board and the
+peers exchange garbage and board snapshots as JSON lines.
+"""
+import argparse
+import json
+import random
+import select
+import socket
+import sys
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from game_modules import load_tetris
+from terminal_io import Keyboard, Screen, TTYKeyboard, TTYScreen
+from tetris_ai import TetrisAI
+
+tetris = load_tetris()
+Colors = tetris.Colors
+GAME_CONFIG = tetris.GAME_CONFIG
+
+# ============== GARBAGE ==============
+LINE_ATTACK = [0, 0, 1, 2, 4]          # By lines cleared
+T_SPIN_ATTACK = [0, 2, 4, 6]           # T-spin zero/single/double/triple
+COMBO_ATTACK = [0, 0, 1, 1, 1, 2, 2, 3, 3, 4, 4, 4, 5]
+PERFECT_CLEAR_ATTACK = 10
+MAX_GARBAGE_PER_LOCK = 8               # Rows that may rise after one lock
+
+
+def attack_for(event) -> int:
+    """Garbage rows sent for a lock event"""
+    if not event.lines:
+        return 0
+    lines = min(event.lines, 4)
+    if event.t_spin == 'full':
+        attack = T_SPIN_ATTACK[min(lines, 3)]
+    elif event.t_spin == 'mini':
+        attack = lines - 1
+    else:
+        attack = LINE_ATTACK[lines]
+    if event.back_to_back:
+        attack += 1
+    if event.combo > 0:
+        attack += COMBO_ATTACK[min(event.combo, len(COMBO_ATTACK) - 1)]
+    if event.perfect_clear:
+        attack += PERFECT_CLEAR_ATTACK
+    return attack
+
+
+class GarbageQueue:
+    """Incoming garbage waiting to rise, as (lines, hole column) batches"""
+
+    def __init__(self):
+        self.batches = deque()
+        self.total = 0
+
+    def push(self, lines: int, hole: int):
+        self.batches.append([lines, hole])
+        self.total += lines
+
+    def cancel(self, attack: int) -> int:
+        """Offset pending garbage with an attack; returns what is left to send"""
+        while attack and self.batches:
+            batch = self.batches[0]
+            used = min(attack, batch[0])
+            batch[0] -= used
+            attack -= used
+            self.total -= used
+            if not batch[0]:
+                self.batches.popleft()
+        return attack
+
+    def take(self, limit: int) -> List[Tuple[int, int]]:
+        """Remove up to ``limit`` rows of garbage, oldest first"""
+        taken = []
+        while limit and self.batches:
+            batch = self.batches[0]
+            lines = min(limit, batch[0])
+            taken.append((lines, batch[1]))
+            batch[0] -= lines
+            limit -= lines
+            self.total -= lines
+            if not batch[0]:
+                self.batches.popleft()
+        return taken
+
+
+# ============== PLAYERS ==============
+ACTIONS: Dict[str, Callable] = {
+    'left': lambda board: board.move_piece(-1, 0),
+    'right': lambda board: board.move_piece(1, 0),
+    'rotate': lambda board: board.rotate_piece(),
+    'down': lambda board: board.soft_drop(),
+    'drop': lambda board: board.drop_piece(),
+    'hold': lambda board: board.hold(),
+}
+PLAYER_KEYS = (
+    {'a': 'left', 'd': 'right', 'w': 'rotate', 's': 'down', ' ': 'drop', 'c': 'hold'},
+    {'j': 'left', 'l': 'right', 'i': 'rotate', 'k': 'down', 'enter': 'drop', 'u': 'hold'},
+)
+
+
+class VersusPlayer:
+    """One side of a match: a board, its incoming garbage and where its attacks go"""
+
+    def __init__(self, name: str, board, rng: random.Random, bot: Optional[TetrisAI] = None,
+                 bot_delay: int = 8):
+        self.name = name
+        self.board = board
+        self.rng = rng  # Picks garbage holes
+        self.garbage = GarbageQueue()
+        self.send_garbage: Callable[[int, int], None] = lambda lines, hole: None
+        self.lines_sent = 0
+        self.lines_received = 0
+        self.bot = bot
+        self.bot_delay = bot_delay  # Ticks between bot moves
+        self._bot_wait = bot_delay
+        board.on_lock = self.on_lock
+
+    def on_lock(self, event):
+        """Send attacks after a clear, or let pending garbage rise"""
+        attack = self.garbage.cancel(attack_for(event))
+        if attack:
+            self.lines_sent += attack
+            self.send_garbage(attack, self.rng.randrange(self.board.width))
+        elif not event.lines:
+            for lines, hole in self.garbage.take(MAX_GARBAGE_PER_LOCK):
+                self.lines_received += lines
+                if not self.board.add_garbage(lines, hole):
+                    break
+
+    def receive(self, lines: int, hole: int):
+        self.garbage.push(lines, hole)
+
+    def act(self, action: str):
+        if not self.board.game_over:
+            ACTIONS[action](self.board)
+
+    def tick(self):
+        self.board.tick()
+        if self.bot is not None and not self.board.game_over:
+            self._bot_wait -= 1
+            if self._bot_wait <= 0:
+                self._bot_wait = self.bot_delay
+                self.bot.play(self.board)
+
+    def side(self) -> Tuple[str, dict, int]:
+        """What the renderer needs for this player"""
+        return self.name, self.board.get_game_state(), self.garbage.total
+
+
+def new_board(seed: int):
+    return tetris.GameBoard(GAME_CONFIG['BOARD_WIDTH'], GAME_CONFIG['BOARD_HEIGHT'],
+                            rng=random.Random(seed))
+
+
+class VersusMatch:
+    """Two players in one process; both get the same piece sequence"""
+
+    def __init__(self, names=('Player 1', 'Player 2'), bots=(False, True), seed: Optional[int] = None,
+                 bot_delay: int = 8, weights: Optional[Dict[str, float]] = None, lookahead: int = 0):
+        seed = random.randrange(1 << 30) if seed is None else seed
+        self.players = [
+            VersusPlayer(name, new_board(seed), random.Random(seed + i),
+                         TetrisAI(weights, lookahead) if bot else None, bot_delay)
+            for i, (name, bot) in enumerate(zip(names, bots))
+        ]
+        first, second = self.players
+        first.send_garbage = second.receive
+        second.send_garbage = first.receive
+        self.ticks = 0
+
+    @property
+    def humans(self) -> List[VersusPlayer]:
+        return [player for player in self.players if player.bot is None]
+
+    def tick(self):
+        self.ticks += 1
+        for player in self.players:
+            player.tick()
+
+    @property
+    def over(self) -> bool:
+        return any(player.board.game_over for player in self.players)
+
+    def result(self) -> str:
+        """Winner's name, or 'draw'"""
+        alive = [player for player in self.players if not player.board.game_over]
+        return alive[0].name if len(alive) == 1 else 'draw'
+
+    def sides(self) -> List[Tuple[str, dict, int]]:
+        return [player.side() for player in self.players]
+
+
+# ============== NETWORK PEER ==============
+# Grid cells travel as one character each: '0' empty, then piece colours, then garbage
+PALETTE = [0] + [color for _, color in tetris.Piece.SHAPES.values()] + [Colors.GARBAGE]
+CELL_CODES = {color: str(i) for i, color in enumerate(PALETTE)}
+SNAPSHOT_TICKS = 4
+
+
+def encode_rows(board) -> List[str]:
+    """The board with its falling piece, one string per row"""
+    rows = [[CELL_CODES.get(cell, '1') for cell in row] for row in board.grid]
+    if not board.game_over:
+        code = CELL_CODES.get(board.current_piece.color, '1')
+        for y, x in board.current_piece.get_cells(board.current_pos):
+            if 0 <= y < board.height:
+                rows[y][x] = code
+    return [''.join(row) for row in rows]
+
+
+class PeerLink:
+    """Newline-delimited JSON messages over a socket, read without blocking"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buffer = b''
+        self.closed = False
+
+    def send(self, **message):
+        if self.closed:
+            return
+        try:
+            self.sock.sendall(json.dumps(message, separators=(',', ':')).encode() + b'\n')
+        except OSError:
+            self.closed = True
+
+    def poll(self) -> List[dict]:
+        """Messages that have arrived, without waiting"""
+        while not self.closed and select.select([self.sock], [], [], 0)[0]:
+            try:
+                data = self.sock.recv(65536)
+            except OSError:
+                data = b''
+            if not data:
+                self.closed = True
+                break
+            self.buffer += data
+        *lines, self.buffer = self.buffer.split(b'\n')
+        return [json.loads(line) for line in lines if line]
+
+    def close(self):
+        self.closed = True
+        self.sock.close()
+
+
+class RemoteBoard:
+    """The peer's board as last reported in its snapshots"""
+
+    def __init__(self, name: str = 'Peer'):
+        self.name = name
+        self.width = GAME_CONFIG['BOARD_WIDTH']
+        self.height = GAME_CONFIG['BOARD_HEIGHT']
+        self.grid = [[0] * self.width for _ in range(self.height)]
+        self.score = 0
+        self.lines_cleared = 0
+        self.level = 1
+        self.pending = 0
+        self.game_over = False
+
+    def update(self, message: dict):
+        self.grid = [[PALETTE[int(code)] for code in row] for row in message['rows']]
+        self.score = message['score']
+        self.lines_cleared = message['lines']
+        self.level = message['level']
+        self.pending = message['pending']
+
+    def side(self) -> Tuple[str, dict, int]:
+        state = {
+            'grid': self.grid, 'width': self.width, 'height': self.height,
+            'current_piece': None, 'current_pos': None, 'game_over': self.game_over,
+            'score': self.score, 'lines_cleared': self.lines_cleared, 'level': self.level,
+        }
+        return self.name, state, self.pending
+
+
+class NetworkMatch:
+    """Our board against a peer on the other end of a socket"""
+
+    def __init__(self, link: PeerLink, name: str = 'You', bot: bool = False,
+                 seed: Optional[int] = None, bot_delay: int = 8,
+                 weights: Optional[Dict[str, float]] = None, lookahead: int = 0):
+        seed = random.randrange(1 << 30) if seed is None else seed
+        self.link = link
+        self.player = VersusPlayer(name, new_board(seed), random.Random(seed),
+                                   TetrisAI(weights, lookahead) if bot else None, bot_delay)
+        self.player.send_garbage = lambda lines, hole: link.send(type='garbage', lines=lines, hole=hole)
+        self.remote = RemoteBoard()
+        self.ticks = 0
+        self._sent_over = False
+        link.send(type='hello', name=name)
+
+    @property
+    def humans(self) -> List[VersusPlayer]:
+        return [] if self.player.bot else [self.player]
+
+    def tick(self):
+        self.ticks += 1
+        for message in self.link.poll():
+            kind = message.get('type')
+            if kind == 'garbage':
+                self.player.receive(message['lines'], message['hole'])
+            elif kind == 'board':
+                self.remote.update(message)
+            elif kind == 'hello':
+                self.remote.name = message['name']
+            elif kind == 'over':
+                self.remote.game_over = True
+
+        self.player.tick()
+        board = self.player.board
+        if board.game_over and not self._sent_over:
+            self._sent_over = True
+            self.link.send(type='over')
+        if self.ticks % SNAPSHOT_TICKS == 0 or board.game_over:
+            self.link.send(type='board', rows=encode_rows(board), score=board.score,
+                           lines=board.lines_cleared, level=board.level,
+                           pending=self.player.garbage.total)
+
+    @property
+    def over(self) -> bool:
+        return self.player.board.game_over or self.remote.game_over or self.link.closed
+
+    def result(self) -> str:
+        if self.player.board.game_over == self.remote.game_over:
+            return 'draw' if self.remote.game_over else self.player.name  # Peer left
+        return self.remote.name if self.player.board.game_over else self.player.name
+
+    def sides(self) -> List[Tuple[str, dict, int]]:
+        return [self.player.side(), self.remote.side()]
+
+
+# ============== RENDERER ==============
+class DiffRenderer:
+    """Draws both boards side by side, rewriting only the lines that changed"""
+
+    BOARD_WIDTH = GAME_CONFIG['BOARD_WIDTH'] * 2 + 4  # Visible width of a drawn board
+
+    def __init__(self, screen: Screen):
+        self.screen = screen
+        self.previous: List[str] = []
+
+    def side_lines(self, name: str, state: dict, pending: int) -> List[str]:
+        """Header and board for one player"""
+        width = self.BOARD_WIDTH
+        info = f"Score {state['score']}  Lines {state['lines_cleared']}"
+        meter = min(pending, width - 10)
+        lines = [
+            f"  {Colors.BOLD}{name[:width - 2].ljust(width - 2)}{Colors.RESET}",
+            f"  {Colors.GREEN}{info[:width - 2].ljust(width - 2)}{Colors.RESET}",
+            f"  {Colors.RED}{'▮' * meter}{' ' * (width - 2 - meter)}{Colors.RESET}",
+        ]
+        lines.extend(tetris.GameRenderer.draw_board(state).rstrip('\n').split('\n'))
+        return lines
+
+    def frame_lines(self, sides: List[Tuple[str, dict, int]]) -> List[str]:
+        columns = [self.side_lines(*side) for side in sides]
+        return ['    '.join(parts) for parts in zip(*columns)]
+
+    def render(self, sides: List[Tuple[str, dict, int]], footer: str = ''):
+        """Send the changed lines in a single write"""
+        lines = self.frame_lines(sides)
+        if footer:
+            lines.append(footer)
+        if not self.previous:
+            self.screen.clear()
+        for row, line in enumerate(lines):
+            if row >= len(self.previous) or self.previous[row] != line:
+                self.screen.write(f"\033[{row + 1};1H{line}\033[K")
+        for row in range(len(lines), len(self.previous)):
+            self.screen.write(f"\033[{row + 1};1H\033[K")
+        self.screen.write(f"\033[{len(lines) + 1};1H")  # Park the cursor below the frame
+        self.previous = lines
+        self.screen.flush()
+
+    def invalidate(self):
+        """Redraw everything on the next frame"""
+        self.previous = []
+
+
+# ============== GAME LOOP ==============
+def play(match, screen: Optional[Screen] = None, keyboard: Optional[Keyboard] = None,
+         realtime: bool = True, max_ticks: Optional[int] = None) -> str:
+    """Run a match until one side tops out; returns the winner's name or 'draw'.
+
+    Without a keyboard nobody can type, so only bots play; ``realtime=False``
+    then runs the ticks back to back.
+    """
+    renderer = DiffRenderer(screen) if screen is not None else None
+    tick = GAME_CONFIG['TICK_SECONDS']
+    keymaps = list(zip(match.humans, PLAYER_KEYS))
+    next_tick = time.monotonic()
+
+    while not match.over and (max_ticks is None or match.ticks < max_ticks):
+        steps = 0
+        if realtime:
+            now = time.monotonic()
+            while next_tick <= now and steps < 20:
+                match.tick()
+                next_tick += tick
+                steps += 1
+            if steps == 20:
+                next_tick = now  # Too far behind; drop the backlog
+        else:
+            match.tick()
+            steps = 1
+        if steps and renderer is not None:
+            renderer.render(match.sides())
+
+        if keyboard is None:
+            if realtime:
+                time.sleep(max(0.0, next_tick - time.monotonic()))
+            continue
+        try:
+            key = keyboard.read_key(max(0.0, next_tick - time.monotonic()))
+        except EOFError:
+            key = 'q'
+        if key == 'q':
+            break
+        for player, keymap in keymaps:
+            if key in keymap:
+                player.act(keymap[key])
+
+    result = match.result()
+    if renderer is not None:
+        message = "Draw!" if result == 'draw' else f"{result} wins!"
+        renderer.render(match.sides(), f"{Colors.BRIGHT_YELLOW}{message}{Colors.RESET}")
+    return result
+
+
+def open_link(args) -> PeerLink:
+    """Listen for or connect to the peer"""
+    if args.listen:
+        with socket.create_server(('', args.listen)) as server:
+            print(f"Waiting for a peer on port {args.listen}...", file=sys.stderr)
+            sock, _ = server.accept()
+    else:
+        host, _, port = args.connect.rpartition(':')
+        sock = socket.create_connection((host or 'localhost', int(port)))
+    return PeerLink(sock)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Versus Tetris with garbage lines")
+    parser.add_argument('--local', action='store_true', help="two players on one keyboard")
+    parser.add_argument('--watch', action='store_true', help="bot against bot")
+    parser.add_argument('--listen', type=int, metavar='PORT', help="wait for a peer on PORT")
+    parser.add_argument('--connect', metavar='HOST:PORT', help="play against a listening peer")
+    parser.add_argument('--bot', action='store_true', help="let the bot play this side (headless on a socket)")
+    parser.add_argument('--name', default='Player 1')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--weights', help="bot weights written by tetris_tuner.py")
+    parser.add_argument('--lookahead', type=int, default=1, help="preview pieces the bot searches ahead")
+    args = parser.parse_args()
+    bot_options = {'weights': TetrisAI.from_file(args.weights).weights if args.weights else None,
+                   'lookahead': args.lookahead}
+
+    try:
+        if args.listen or args.connect:
+            link = open_link(args)
+            match = NetworkMatch(link, args.name, args.bot, args.seed, **bot_options)
+            if args.bot:
+                result = play(match)
+                print(f"Result: {result}", file=sys.stderr)
+            else:
+                play(match, TTYScreen(), TTYKeyboard())
+            link.close()
+            return
+
+        if args.local:
+            match = VersusMatch((args.name, 'Player 2'), (False, False), args.seed)
+        elif args.watch:
+            match = VersusMatch(('Bot 1', 'Bot 2'), (True, True), args.seed, **bot_options)
+        else:
+            match = VersusMatch((args.name, '🤖 Bot'), (False, True), args.seed, **bot_options)
+        screen = TTYScreen()
+        play(match, screen, None if args.watch else TTYKeyboard())
+        screen.flush()
+    except KeyboardInterrupt:
+        print(f"\n{Colors.YELLOW}Game interrupted. Thanks for playing!{Colors.RESET}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""Batched Tic Tac Toe environment for training learned policies.
+
+Holds N boards as two 9-bit bitboards per board (one per mark) in NumPy
+arrays, so a whole batch is stepped, scored and observed with a handful of
+array operations and no per-board Python loop. Results follow
+``TicTacToeGame``: X moves first, moves on taken squares or finished boards
+are rejected, and the winner is found by the same ``WIN_PATTERNS`` order
+as ``check_game_status``.
+
+    env = BatchTicTacToe(4096)
+    obs, legal = env.observation(), env.legal_mask()
+    result = env.step(policy(obs, legal))
+    env.reset(result.done)
+
+Requires NumPy (``pip install numpy``).
+"""
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from game_modules import load_tictactoe
+
+WIN_PATTERNS = load_tictactoe().WIN_PATTERNS
+
+# ============== ENCODING ==============
+# Winner codes; index into RESULTS for the TicTacToeGame.winner value
+ONGOING, X_WINS, O_WINS, TIE = 0, 1, 2, 3
+RESULTS = (None, 'X', 'O', 'Tie')
+MARKS = ('X', 'O')  # to_move 0 is X, 1 is O
+
+SQUARE_SHIFTS = np.arange(9, dtype=np.uint16)
+WIN_MASKS = np.array([sum(1 << i for i in pattern) for pattern in WIN_PATTERNS], dtype=np.uint16)
+FULL_BOARD = np.uint16(0x1FF)
+
+
+def unpack(bits: np.ndarray) -> np.ndarray:
+    """Bitboards of any shape to 0/1 squares with a trailing axis of 9"""
+    return (bits[..., None] >> SQUARE_SHIFTS) & 1
+
+
+@dataclass
+class StepResult:
+    """Outcome of one batched move"""
+    applied: np.ndarray  # bool (N,): False for illegal moves and finished boards
+    reward: np.ndarray   # float32 (N,): 1 where the move won the game for the mover
+    done: np.ndarray     # bool (N,)
+    winner: np.ndarray   # int8 (N,): ONGOING, X_WINS, O_WINS or TIE
+
+
+# ============== ENVIRONMENT ==============
+class BatchTicTacToe:
+    """N independent games stepped in lockstep"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.bits = np.zeros((2, size), dtype=np.uint16)  # [mark, board]
+        self.to_move = np.zeros(size, dtype=np.int8)
+        self.winner = np.zeros(size, dtype=np.int8)
+        self._index = np.arange(size)
+
+    @classmethod
+    def from_boards(cls, boards: Sequence[Sequence[str]],
+                    to_move: Optional[Sequence[str]] = None) -> 'BatchTicTacToe':
+        """Batch from ``TicTacToeGame.board`` style lists of 'X', 'O' and ' '.
+
+        The side to move defaults to X when both marks have been played
+        equally often, as in a normal game, and O otherwise.
+        """
+        squares = np.asarray(boards, dtype='<U1').reshape(-1, 9)
+        env = cls(len(squares))
+        weights = np.left_shift(1, SQUARE_SHIFTS).astype(np.uint16)
+        for mark, name in enumerate(MARKS):
+            env.bits[mark] = ((squares == name) * weights).sum(axis=1)
+        if to_move is None:
+            counts = unpack(env.bits).sum(axis=-1)
+            env.to_move[:] = counts[0] > counts[1]
+        else:
+            env.to_move[:] = np.asarray(to_move) == 'O'
+        env._update_winner()
+        return env
+
+    @property
+    def done(self) -> np.ndarray:
+        return self.winner != ONGOING
+
+    def reset(self, mask: Optional[np.ndarray] = None):
+        """Clear every board, or only the boards where ``mask`` is True"""
+        if mask is None:
+            mask = np.ones(self.size, dtype=bool)
+        self.bits[:, mask] = 0
+        self.to_move[mask] = 0
+        self.winner[mask] = ONGOING
+
+    def legal_mask(self) -> np.ndarray:
+        """bool (N, 9): empty squares on boards still in play"""
+        empty = unpack(~(self.bits[0] | self.bits[1])).astype(bool)
+        empty &= ~self.done[:, None]
+        return empty
+
+    def observation(self) -> np.ndarray:
+        """float32 (N, 2, 3, 3): the mover's marks, then the opponent's"""
+        own = self.bits[self.to_move, self._index]
+        other = self.bits[1 - self.to_move, self._index]
+        planes = unpack(np.stack([own, other], axis=1))
+        return planes.reshape(self.size, 2, 3, 3).astype(np.float32)
+
+    def step(self, actions: Sequence[int]) -> StepResult:
+        """Play one square (0-8) on every board for the side to move"""
+        actions = np.asarray(actions, dtype=np.int64)
+        in_range = (actions >= 0) & (actions < 9)
+        move_bits = np.left_shift(1, np.where(in_range, actions, 0)).astype(np.uint16)
+        occupied = self.bits[0] | self.bits[1]
+        applied = in_range & ((occupied & move_bits) == 0) & ~self.done
+
+        mover = self.to_move.copy()
+        self.bits[mover, self._index] |= np.where(applied, move_bits, 0).astype(np.uint16)
+        self._update_winner()
+        done = self.done
+        self.to_move = np.where(applied & ~done, 1 - mover, mover).astype(np.int8)
+        reward = (applied & (self.winner == mover + 1)).astype(np.float32)
+        return StepResult(applied, reward, done, self.winner.copy())
+
+    def sample_actions(self, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """A uniformly random legal square per board (0 on finished boards)"""
+        rng = rng or np.random.default_rng()
+        scores = rng.random((self.size, 9))
+        scores[~self.legal_mask()] = -1.0
+        return scores.argmax(axis=1)
+
+    def _update_winner(self):
+        """Recompute results with the first matching pattern, as check_game_status does"""
+        lines = (self.bits[:, :, None] & WIN_MASKS) == WIN_MASKS  # [mark, board, pattern]
+        hit = lines[0] | lines[1]
+        won = hit.any(axis=1)
+        first = hit.argmax(axis=1)
+        x_first = lines[0, self._index, first]
+        full = (self.bits[0] | self.bits[1]) == FULL_BOARD
+        self.winner = np.where(won, np.where(x_first, X_WINS, O_WINS),
+                               np.where(full, TIE, ONGOING)).astype(np.int8)
+
+    # ============== CONVERSION ==============
+    def boards(self) -> List[List[str]]:
+        """Boards as ``TicTacToeGame.board`` lists"""
+        x, o = unpack(self.bits).astype(bool)
+        squares = np.where(x, 'X', np.where(o, 'O', ' '))
+        return squares.tolist()
+
+    def winners(self) -> List[Optional[str]]:
+        """``TicTacToeGame.winner`` value for every board"""
+        return [RESULTS[code] for code in self.winner.tolist()]
@@ -0,0 +1,263 @@
+"""Move clocks and time controls driven by a shared timer wheel.
+
+A ``TimeControl`` describes the rules: a time bank per player (sudden
+death), an optional Fischer increment added after every move, and an
+optional hard limit per move. Specs are written like chess controls:
+
+    "300"          5 minute sudden death
+    "180+2"        3 minutes plus a 2 second increment per move
+    "move=10"      10 seconds per move, no bank
+    "60+1,move=5"  combined
+
+Each game owns a ``GameClock``. Clocks do not use threads or sleeps: the
+flag timer of the side to move sits in one ``TimerWheel`` shared by every
+game, and whoever owns the event loop calls ``wheel.advance()`` every
+tick. Without a wheel, a late move is still caught when it is made.
+"""
+import math
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+
+# ============== TIME CONTROLS ==============
+@dataclass(frozen=True)
+class TimeControl:
+    """Clock rules for one game"""
+    initial: Optional[float] = None   # time bank per player in seconds (None = no bank)
+    increment: float = 0.0            # Fischer increment added after each move
+    per_move: Optional[float] = None  # limit for a single move
+
+    @classmethod
+    def parse(cls, spec: str) -> 'TimeControl':
+        """Build a control from a spec such as ``"180+2"`` or ``"move=10"``"""
+        initial = per_move = None
+        increment = 0.0
+        try:
+            for part in spec.replace(' ', '').split(','):
+                if part.startswith('move='):
+                    per_move = float(part[5:])
+                elif '+' in part:
+                    bank, extra = part.split('+', 1)
+                    initial, increment = float(bank), float(extra)
+                elif part:
+                    initial = float(part)
+        except ValueError:
+            raise ValueError(f"invalid time control '{spec}' (expected e.g. 300, 180+2 or move=10)") from None
+        if initial is None and per_move is None:
+            raise ValueError(f"time control '{spec}' sets no limit")
+        return cls(initial, increment, per_move)
+
+    def describe(self) -> str:
+        parts = []
+        if self.initial is not None:
+            parts.append(format_seconds(self.initial) + (f" + {self.increment:g}s" if self.increment else ""))
+        if self.per_move is not None:
+            parts.append(f"{self.per_move:g}s per move")
+        return ", ".join(parts)
+
+
+def format_seconds(seconds: float) -> str:
+    """Clock display such as ``4:05`` or ``0:09.4`` under ten seconds"""
+    seconds = max(0.0, seconds)
+    if seconds < 10:
+        return f"0:{seconds:04.1f}"
+    minutes, secs = divmod(int(seconds), 60)
+    return f"{minutes}:{secs:02d}"
+
+
+# ============== TIMER WHEEL ==============
+class Timer:
+    """Handle for a scheduled callback"""
+    __slots__ = ('expires', 'callback', 'args', 'cancelled')
+
+    def __init__(self, expires: int, callback: Callable, args: tuple):
+        self.expires = expires
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """O(1); the wheel drops the timer when it reaches its slot"""
+        self.cancelled = True
+
+
+class TimerWheel:
+    """Hashed timing wheel.
+
+    Scheduling and cancelling are O(1). Each ``advance`` visits one slot per
+    elapsed tick, and a timer is only looked at when its slot comes round,
+    so clock bookkeeping does not grow with the number of idle games.
+    """
+
+    def __init__(self, tick: float = 0.1, slots: int = 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        self.tick = tick
+        self.slots: List[List[Timer]] = [[] for _ in range(slots)]
+        self.clock = clock
+        self.current = self._tick_of(clock())
+        self.pending = 0
+
+    def _tick_of(self, now: float) -> int:
+        return int(now / self.tick)
+
+    def schedule(self, delay: float, callback: Callable, *args) -> Timer:
+        """Run ``callback(*args)`` once ``delay`` seconds have passed"""
+        # Round up so a timer never fires before its deadline
+        expires = math.ceil((self.clock() + max(0.0, delay)) / self.tick)
+        if expires <= self.current:
+            expires = self.current + 1
+        timer = Timer(expires, callback, args)
+        self.slots[expires % len(self.slots)].append(timer)
+        self.pending += 1
+        return timer
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """Fire every timer that is due; returns how many fired"""
+        target = self._tick_of(self.clock() if now is None else now)
+        if target <= self.current:
+            return 0
+        if target - self.current >= len(self.slots):
+            # Fell a whole revolution behind: one pass over every slot
+            ticks = [(index, target) for index in range(len(self.slots))]
+        else:
+            ticks = [(t % len(self.slots), t) for t in range(self.current + 1, target + 1)]
+        self.current = target
+
+        fired = 0
+        for index, tick in ticks:
+            slot = self.slots[index]
+            if not slot:
+                continue
+            # Swap in a fresh list so callbacks may schedule into this slot
+            self.slots[index] = keep = []
+            for timer in slot:
+                if timer.cancelled:
+                    self.pending -= 1
+                elif timer.expires <= tick:
+                    self.pending -= 1
+                    fired += 1
+                    timer.callback(*timer.args)
+                else:
+                    keep.append(timer)  # Due in a later revolution
+        return fired
+
+
+# ============== GAME CLOCK ==============
+class GameClock:
+    """Chess-style clock for a two-player game.
+
+    ``press(next_player)`` ends the current move and starts the next
+    player's time. When the side to move runs out, the clock flags them
+    and calls every ``on_flag`` listener with their mark.
+    """
+
+    def __init__(self, control: TimeControl, wheel: Optional[TimerWheel] = None,
+                 players=('X', 'O'), clock: Optional[Callable[[], float]] = None):
+        self.control = control
+        self.wheel = wheel
+        self.clock = clock or (wheel.clock if wheel else time.monotonic)
+        self.remaining: Dict[str, Optional[float]] = {p: control.initial for p in players}
+        self.running: Optional[str] = None
+        self.turn_started = 0.0
+        self.flagged: Optional[str] = None
+        self.on_flag: List[Callable[[str], None]] = []
+        self._timer: Optional[Timer] = None
+
+    def time_left(self, player: str) -> Optional[float]:
+        """Seconds ``player`` may still use on the current move (None = unlimited)"""
+        limits = []
+        bank = self.remaining[player]
+        elapsed = self.clock() - self.turn_started if player == self.running else 0.0
+        if bank is not None:
+            limits.append(bank - elapsed)
+        if self.control.per_move is not None:
+            limits.append(self.control.per_move - elapsed)
+        return min(limits) if limits else None
+
+    def start(self, player: str):
+        """Start ``player``'s move"""
+        self._cancel_timer()
+        self.running = player
+        self.turn_started = self.clock()
+        left = self.time_left(player)
+        if self.wheel is not None and left is not None:
+            self._timer = self.wheel.schedule(left, self._expire, player)
+
+    def check(self) -> bool:
+        """Flag the side to move if its time is up; False once a player has flagged"""
+        if self.flagged is None and self.running is not None:
+            left = self.time_left(self.running)
+            if left is not None and left < 0:
+                self._flag(self.running)
+        return self.flagged is None
+
+    def press(self, next_player: Optional[str] = None) -> Optional[float]:
+        """End the running player's move and start ``next_player``'s.
+
+        Returns the time the move took, or None when the move came too late.
+        """
+        if not self.check() or self.running is None:
+            return None
+        player = self.running
+        elapsed = self.clock() - self.turn_started
+        if self.remaining[player] is not None:
+            self.remaining[player] += self.control.increment - elapsed
+        if next_player is None:
+            self.stop()
+        else:
+            self.start(next_player)
+        return elapsed
+
+    def stop(self):
+        """Stop the clock, e.g. when the game ends"""
+        self._cancel_timer()
+        if self.running is not None and self.remaining[self.running] is not None:
+            self.remaining[self.running] -= self.clock() - self.turn_started
+        self.running = None
+
+    def banks(self) -> Dict[str, Optional[float]]:
+        """Each player's remaining bank, with the running move charged so far"""
+        banks = dict(self.remaining)
+        if self.running is not None and banks[self.running] is not None:
+            banks[self.running] -= self.clock() - self.turn_started
+        return banks
+
+    def move_budget(self, player: str, moves_left: int = 4) -> Optional[float]:
+        """Thinking time an engine should use for this move (None = unlimited).
+
+        Spends an even share of the bank over the expected remaining moves
+        plus most of the increment, and keeps a margin under hard limits.
+        """
+        left = self.time_left(player)
+        if left is None:
+            return None
+        budget = left * 0.8
+        bank = self.remaining[player]
+        if bank is not None:
+            budget = min(budget, bank / max(1, moves_left) + self.control.increment * 0.8)
+        return max(0.0, budget)
+
+    def display(self, player: str) -> str:
+        left = self.time_left(player)
+        return '∞' if left is None else format_seconds(left)
+
+    def _expire(self, player: str):
+        """Wheel callback at the running player's deadline"""
+        self._timer = None
+        if self.running == player:
+            self.check()
+            if self.flagged is None:
+                # Woken a tick early; look again shortly
+                self._timer = self.wheel.schedule(max(0.0, self.time_left(player) or 0.0), self._expire, player)
+
+    def _flag(self, player: str):
+        self.flagged = player
+        self.stop()
+        for listener in list(self.on_flag):
+            listener(player)
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
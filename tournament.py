@@ -0,0 +1,425 @@
+"""Tournament runner for Tic Tac Toe bots and players.
+
+Supports round-robin, Swiss, single elimination and double elimination
+events. Games run on a process pool and the bracket is checkpointed to
+disk after every round, so an interrupted tournament can be resumed with
+``--resume``.
+
+Entrants are either a ``RobotAI`` difficulty (``easy``, ``medium``,
+``hard``, ``impossible``, ``oracle``) or a plug-in policy given as
+``package.module:function``. A plug-in is called as ``policy(game, mark)``
+and must return a board index (0-8).
+"""
+import argparse
+import importlib
+import json
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from game_modules import load_tictactoe
+
+# ============== CONFIGURATION ==============
+FORMATS = ('round-robin', 'swiss', 'single-elim', 'double-elim')
+ELIMINATION_FORMATS = ('single-elim', 'double-elim')
+POINTS = {'win': 1.0, 'draw': 0.5, 'loss': 0.0}
+BYE_POINTS = 1.0
+# Extra games played with colors swapped when an elimination game is drawn;
+# if every replay is drawn too, the better seed advances
+ELIMINATION_REPLAYS = 2
+BUILTIN_POLICIES = ('easy', 'medium', 'hard', 'impossible', 'oracle')
+
+# ============== DATA MODELS ==============
+@dataclass
+class Entrant:
+    """A tournament participant"""
+    name: str
+    policy: str
+    seed: int
+
+
+@dataclass
+class Record:
+    """Running score for one entrant"""
+    points: float = 0.0
+    wins: int = 0
+    draws: int = 0
+    losses: int = 0
+    byes: int = 0
+    games_as_x: int = 0
+    eliminated_round: Optional[int] = None
+
+
+# ============== MATCH PLAY ==============
+_policies: Dict[Tuple[str, str], Callable] = {}
+
+
+def resolve_policy(spec: str, mark: str) -> Callable:
+    """Return a ``move(game)`` callable for a policy spec playing ``mark``"""
+    key = (spec, mark)
+    if key not in _policies:
+        if spec in BUILTIN_POLICIES:
+            ai = load_tictactoe().RobotAI(spec, mark=mark, think_delay=False)
+            _policies[key] = ai.get_move
+        else:
+            module_name, _, func_name = spec.partition(':')
+            func = getattr(importlib.import_module(module_name), func_name)
+            _policies[key] = lambda game, func=func: func(game, mark)
+    return _policies[key]
+
+
+def play_game(x_policy: str, o_policy: str, seed: int) -> str:
+    """Play one headless game and return the winner ('X', 'O' or 'Tie')"""
+    random.seed(seed)
+    game = load_tictactoe().TicTacToeGame('X', 'O')
+    movers = {'X': resolve_policy(x_policy, 'X'), 'O': resolve_policy(o_policy, 'O')}
+    while not game.game_over:
+        if not game.make_move(movers[game.current_player](game)):
+            # An illegal move from a plug-in forfeits the game
+            return 'O' if game.current_player == 'X' else 'X'
+    return game.winner
+
+
+def play_pairing(task: tuple) -> tuple:
+    """Play one pairing on a worker; returns (x, o, result for x)"""
+    x, o, x_policy, o_policy, seed, decisive = task
+    winner = play_game(x_policy, o_policy, seed)
+    if winner == 'X':
+        return x, o, 'win'
+    if winner == 'O':
+        return x, o, 'loss'
+    if decisive:
+        # Replay with colors swapped until someone wins
+        for replay in range(ELIMINATION_REPLAYS):
+            winner = play_game(o_policy, x_policy, seed + replay + 1)
+            if winner == 'X':
+                return x, o, 'loss'
+            if winner == 'O':
+                return x, o, 'win'
+    return x, o, 'draw'
+
+
+# ============== TOURNAMENT ==============
+class Tournament:
+    """Schedules rounds, runs games and keeps standings"""
+
+    def __init__(self, entrants: List[Entrant], fmt: str = 'swiss',
+                 rounds: Optional[int] = None, seed: int = 0,
+                 checkpoint: Optional[str] = None, workers: Optional[int] = None):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format '{fmt}', expected one of {FORMATS}")
+        if len(entrants) < 2:
+            raise ValueError("A tournament needs at least two entrants")
+        self.entrants = entrants
+        self.format = fmt
+        self.rounds = rounds or self._default_rounds()
+        self.seed = seed
+        self.checkpoint = checkpoint
+        self.workers = workers
+        self.records = [Record() for _ in entrants]
+        self.opponents: List[List[int]] = [[] for _ in entrants]
+        # Each game is stored as [round, x, o, result for x]
+        self.games: List[list] = []
+        self.round = 0
+
+    def _default_rounds(self) -> int:
+        """Rounds needed for the chosen format"""
+        n = len(self.entrants)
+        if self.format == 'round-robin':
+            return n - 1 if n % 2 == 0 else n
+        if self.format == 'swiss':
+            return max(1, math.ceil(math.log2(n)))
+        # Elimination events run until one entrant is left
+        return 0
+
+    # ---------- pairing ----------
+    def pair_round(self) -> List[Tuple[int, Optional[int]]]:
+        """Pair the next round; a ``None`` opponent is a bye"""
+        if self.format == 'round-robin':
+            return self._pair_round_robin()
+        if self.format == 'swiss':
+            return self._pair_swiss(list(range(len(self.entrants))))
+        if self.format == 'single-elim':
+            return self._pair_bracket(self._alive(max_losses=0))
+        winners = self._alive(max_losses=0)
+        losers = self._alive(max_losses=1, min_losses=1)
+        if len(winners) + len(losers) == 2:
+            # Grand final; a second one follows if the winners-bracket player loses
+            return [self._assign_colors(*(winners + losers))]
+        return self._pair_bracket(winners) + self._pair_bracket(losers)
+
+    def _pair_round_robin(self) -> List[Tuple[int, Optional[int]]]:
+        """Circle method: entrant 0 stays fixed and the rest rotate"""
+        players: List[Optional[int]] = list(range(len(self.entrants)))
+        if len(players) % 2:
+            players.append(None)
+        n = len(players)
+        rotation = self.round % (n - 1)
+        ring = players[1:]
+        ring = ring[-rotation:] + ring[:-rotation] if rotation else ring
+        order = [players[0]] + ring
+
+        pairs = []
+        for i in range(n // 2):
+            a, b = order[i], order[n - 1 - i]
+            if a is None or b is None:
+                pairs.append((a if b is None else b, None))
+            elif (self.round + i) % 2:
+                pairs.append((b, a))
+            else:
+                pairs.append((a, b))
+        return pairs
+
+    def _pair_swiss(self, players: List[int]) -> List[Tuple[int, Optional[int]]]:
+        """Pair players on equal scores, avoiding rematches where possible"""
+        ranked = sorted(players, key=lambda i: (-self.records[i].points, self.entrants[i].seed))
+        pairs = []
+        if len(ranked) % 2:
+            # Lowest ranked player without a bye sits out
+            bye = next((i for i in reversed(ranked) if not self.records[i].byes), ranked[-1])
+            ranked.remove(bye)
+            pairs.append((bye, None))
+
+        played = [set(opps) for opps in self.opponents]
+        unpaired = ranked
+        while unpaired:
+            first = unpaired[0]
+            partner_index = 1
+            for j in range(1, len(unpaired)):
+                if unpaired[j] not in played[first]:
+                    partner_index = j
+                    break
+            second = unpaired[partner_index]
+            unpaired = unpaired[1:partner_index] + unpaired[partner_index + 1:]
+            pairs.append(self._assign_colors(first, second))
+        return pairs
+
+    def _pair_bracket(self, players: List[int]) -> List[Tuple[int, Optional[int]]]:
+        """Re-seeded knockout pairing: best remaining seed meets the worst"""
+        players = sorted(players, key=lambda i: self.entrants[i].seed)
+        pairs = []
+        if len(players) % 2:
+            pairs.append((players.pop(0), None))
+        while players:
+            pairs.append(self._assign_colors(players.pop(0), players.pop()))
+        return pairs
+
+    def _assign_colors(self, a: int, b: int) -> Tuple[int, int]:
+        """Give X to whoever has played it less"""
+        if self.records[b].games_as_x < self.records[a].games_as_x:
+            return b, a
+        return a, b
+
+    def _alive(self, max_losses: int, min_losses: int = 0) -> List[int]:
+        """Entrants still in an elimination bracket"""
+        return [i for i, rec in enumerate(self.records)
+                if rec.eliminated_round is None and min_losses <= rec.losses <= max_losses]
+
+    # ---------- running ----------
+    def is_finished(self) -> bool:
+        """Check whether the event is over"""
+        if self.format in ELIMINATION_FORMATS:
+            return len(self._alive(max_losses=1)) <= 1
+        return self.round >= self.rounds
+
+    def run(self, progress: Optional[Callable[['Tournament'], None]] = None):
+        """Play every remaining round, checkpointing after each one"""
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            while not self.is_finished():
+                self.play_round(pool)
+                self.save_checkpoint()
+                if progress:
+                    progress(self)
+
+    def play_round(self, pool: ProcessPoolExecutor):
+        """Pair, play and record a single round"""
+        pairs = self.pair_round()
+        decisive = self.format in ELIMINATION_FORMATS
+        tasks = []
+        for table, (x, o) in enumerate(pairs):
+            if o is None:
+                if not decisive:
+                    self.records[x].points += BYE_POINTS
+                self.records[x].byes += 1
+                continue
+            game_seed = hash((self.seed, self.round, table)) & 0x7FFFFFFF
+            tasks.append((x, o, self.entrants[x].policy, self.entrants[o].policy,
+                          game_seed, decisive))
+
+        workers = self.workers or os.cpu_count() or 1
+        chunksize = max(1, len(tasks) // (workers * 4))
+        for x, o, result in pool.map(play_pairing, tasks, chunksize=chunksize):
+            if decisive and result == 'draw':
+                # Still level after the replays: the better seed advances
+                result = 'win' if self.entrants[x].seed < self.entrants[o].seed else 'loss'
+            self.record_game(x, o, result)
+        self.round += 1
+
+    def record_game(self, x: int, o: int, result: str):
+        """Apply a game result to both entrants"""
+        opposite = {'win': 'loss', 'loss': 'win', 'draw': 'draw'}
+        self.games.append([self.round, x, o, result])
+        self.records[x].games_as_x += 1
+        for player, opponent, outcome in ((x, o, result), (o, x, opposite[result])):
+            rec = self.records[player]
+            rec.points += POINTS[outcome]
+            if outcome == 'win':
+                rec.wins += 1
+            elif outcome == 'draw':
+                rec.draws += 1
+            else:
+                rec.losses += 1
+            self.opponents[player].append(opponent)
+
+        if self.format in ELIMINATION_FORMATS:
+            max_losses = 1 if self.format == 'single-elim' else 2
+            for player in (x, o):
+                if self.records[player].losses >= max_losses:
+                    self.records[player].eliminated_round = self.round
+
+    # ---------- standings ----------
+    def standings(self) -> List[dict]:
+        """Rank entrants by points, then Buchholz, Sonneborn-Berger and wins"""
+        points = [rec.points for rec in self.records]
+        sonneborn = [0.0] * len(self.entrants)
+        for _, x, o, result in self.games:
+            if result == 'win':
+                sonneborn[x] += points[o]
+            elif result == 'loss':
+                sonneborn[o] += points[x]
+            else:
+                sonneborn[x] += points[o] / 2
+                sonneborn[o] += points[x] / 2
+
+        rows = []
+        for i, (entrant, rec) in enumerate(zip(self.entrants, self.records)):
+            survived = rec.eliminated_round if rec.eliminated_round is not None else self.round + 1
+            rows.append({
+                'name': entrant.name,
+                'policy': entrant.policy,
+                'points': rec.points,
+                'buchholz': sum(points[opp] for opp in self.opponents[i]),
+                'sonneborn_berger': sonneborn[i],
+                'wins': rec.wins,
+                'draws': rec.draws,
+                'losses': rec.losses,
+                'survived': survived,
+                'seed': entrant.seed,
+            })
+
+        def sort_key(row):
+            key = (-row['points'], -row['buchholz'], -row['sonneborn_berger'],
+                   -row['wins'], row['seed'])
+            if self.format in ELIMINATION_FORMATS:
+                return (-row['survived'],) + key
+            return key
+
+        rows.sort(key=sort_key)
+        for rank, row in enumerate(rows, 1):
+            row['rank'] = rank
+        return rows
+
+    # ---------- checkpoints ----------
+    def to_dict(self) -> dict:
+        """Serializable bracket state"""
+        return {
+            'format': self.format,
+            'rounds': self.rounds,
+            'seed': self.seed,
+            'round': self.round,
+            'entrants': [asdict(e) for e in self.entrants],
+            'records': [asdict(r) for r in self.records],
+            'opponents': self.opponents,
+            'games': self.games,
+        }
+
+    def save_checkpoint(self):
+        """Atomically write the bracket state to the checkpoint file"""
+        if not self.checkpoint:
+            return
+        tmp_path = self.checkpoint + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint)
+
+    @classmethod
+    def resume(cls, path: str, workers: Optional[int] = None) -> 'Tournament':
+        """Rebuild a tournament from its checkpoint file"""
+        with open(path) as f:
+            state = json.load(f)
+        tournament = cls([Entrant(**e) for e in state['entrants']], state['format'],
+                         rounds=state['rounds'], seed=state['seed'],
+                         checkpoint=path, workers=workers)
+        tournament.round = state['round']
+        tournament.records = [Record(**r) for r in state['records']]
+        tournament.opponents = state['opponents']
+        tournament.games = state['games']
+        return tournament
+
+
+# ============== ENTRY POINT ==============
+def make_entrants(count: int, policies: List[str]) -> List[Entrant]:
+    """Create ``count`` entrants cycling through the given policies"""
+    return [Entrant(f"{policies[i % len(policies)]} #{i + 1}", policies[i % len(policies)], i + 1)
+            for i in range(count)]
+
+
+def load_entrants(path: str) -> List[Entrant]:
+    """Load entrants from a JSON list of {"name", "policy"} objects"""
+    with open(path) as f:
+        data = json.load(f)
+    return [Entrant(item['name'], item['policy'], item.get('seed', i + 1))
+            for i, item in enumerate(data)]
+
+
+def print_standings(tournament: Tournament, limit: int = 20):
+    """Print the top of the standings table"""
+    print(f"{'#':>5}  {'Name':24} {'Pts':>6} {'Buch':>7} {'SB':>7}  W-D-L")
+    for row in tournament.standings()[:limit]:
+        print(f"{row['rank']:>5}  {row['name'][:24]:24} {row['points']:>6.1f} "
+              f"{row['buchholz']:>7.1f} {row['sonneborn_berger']:>7.2f}  "
+              f"{row['wins']}-{row['draws']}-{row['losses']}")
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Run a Tic Tac Toe tournament")
+    parser.add_argument('--format', choices=FORMATS, default='swiss')
+    parser.add_argument('--entrants', type=int, default=16,
+                        help="number of generated bot entrants")
+    parser.add_argument('--policies', default=','.join(BUILTIN_POLICIES),
+                        help="comma separated policies for generated entrants")
+    parser.add_argument('--entrants-file', help="JSON file with entrants")
+    parser.add_argument('--rounds', type=int, help="override the number of rounds")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--checkpoint', help="file to checkpoint bracket state to")
+    parser.add_argument('--resume', help="resume from a checkpoint file")
+    parser.add_argument('--top', type=int, default=20, help="standings rows to print")
+    args = parser.parse_args()
+
+    if args.resume:
+        tournament = Tournament.resume(args.resume, workers=args.workers)
+    else:
+        if args.entrants_file:
+            entrants = load_entrants(args.entrants_file)
+        else:
+            entrants = make_entrants(args.entrants, args.policies.split(','))
+        tournament = Tournament(entrants, args.format, rounds=args.rounds, seed=args.seed,
+                                checkpoint=args.checkpoint, workers=args.workers)
+
+    def progress(t: Tournament):
+        print(f"Round {t.round} complete ({len(t.games)} games played)")
+
+    tournament.run(progress)
+    print()
+    print_standings(tournament, args.top)
+
+
+if __name__ == '__main__':
+    main()